@@ -8,6 +8,8 @@ from __future__ import print_function
  
 import traceback, sys
 
+from .CommandSchema import CommandSchemaError
+
 class AgentConnector(object):
     """ Base Class for handling input/output for a soar agent
 
@@ -17,6 +19,9 @@ class AgentConnector(object):
     Output:
         call add_output_command to add the name of an output-link command to look for
         on_output_event will then be called if such a command is added by the agent
+        If the command was added with a CommandSchema, its arguments are decoded first and
+            on_output_event(command_name, root_id, command) is given the record
+            (or if they don't match, ^status error ^message <msg> is added to the command instead)
 
     Look at LanguageConnector for an example of an AgentConnector used in practice
     """
@@ -28,10 +33,13 @@ class AgentConnector(object):
         self.client = client
         self.connected = False
         self.output_handler_ids = { }
+        self.output_schemas = { }       # command name -> CommandSchema
 
-
-    def add_output_command(self, command_name):
-        """ Will cause the connector to handle commands with the given name on the output-link """
+    def add_output_command(self, command_name, schema=None):
+        """ Will cause the connector to handle commands with the given name on the output-link
+            If a CommandSchema is given, the command is decoded with it (see on_output_event) """
+        if schema is not None:
+            self.output_schemas[command_name] = schema
         if self.connected:
             self.output_handler_ids[command_name] = self.client.agent.AddOutputHandler(
                     command_name, AgentConnector._output_event_handler, self)
@@ -72,6 +80,7 @@ class AgentConnector(object):
         """ Override to handle output commands with the given name (added by add_output_command) 
 
         root_id is the root Identifier of the command (e.g. (<output-link> ^command_name <root_id>)
+        If the command has a CommandSchema, this is called with a third argument, the decoded record
         """
         pass
 
@@ -81,7 +90,26 @@ class AgentConnector(object):
         try:
             if wme.IsJustAdded() and wme.IsIdentifier():
                 root_id = wme.ConvertToIdentifier()
-                self.on_output_event(att_name, root_id)
+                self.client.printout_cache.clear()
+                for listener in self.client.output_listeners:
+                    listener.before_output_event(att_name, root_id, wme)
+                try:
+                    self.client.current_connector = self
+                    schema = self.output_schemas.get(att_name)
+                    if schema is None:
+                        self.on_output_event(att_name, root_id)
+                    else:
+                        try:
+                            command = schema.decode(root_id)
+                        except CommandSchemaError as e:
+                            root_id.CreateStringWME("status", "error")
+                            root_id.CreateStringWME("message", str(e))
+                        else:
+                            self.on_output_event(att_name, root_id, command)
+                finally:
+                    self.client.current_connector = None
+                    for listener in self.client.output_listeners:
+                        listener.after_output_event(att_name, root_id, wme)
         except:
             self.client.print_handler("ERROR IN OUTPUT EVENT HANDLER")
             self.client.print_handler(traceback.format_exc())
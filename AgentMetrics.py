@@ -0,0 +1,128 @@
+"""
+Defines a class that collects runtime metrics for a SoarClient
+"""
+
+from time import perf_counter
+import threading
+
+from .util.parse_soar_stats import parse_stats
+
+class AgentMetrics:
+    """ Collects metrics about a running SoarClient
+
+        The client's event handlers only update counters:
+            the time each connector takes in on_input_phase (see SoarClient._on_input_phase),
+            the time each output command handler takes, and the number/size of print messages.
+        Everything from soar itself (decisions, wm size, kernel time) comes from
+            the stats command, which sample() runs (meant to be called from a background thread, see MetricsExporter)
+
+        A client creates one of these as client.metrics when metrics_port or metrics_file is set
+    """
+    def __init__(self, client):
+        self.client = client
+        self.lock = threading.Lock()
+
+        self.num_input_phases = 0
+        self.connector_times = {}       # connector name -> [ total seconds, num calls, max seconds ]
+        self.output_times = {}          # command name -> [ total seconds, num calls, max seconds ]
+        self.num_print_messages = 0
+        self.num_print_chars = 0
+
+        self.stats = None               # SoarStats from the last sample
+        self.decision_rate = 0.0        # decisions per second between the last two samples
+        self.last_sample_time = None
+        self.output_start_times = {}    # command root symbol -> start time
+
+        client.add_print_event_handler(self._on_print)
+        client.add_output_listener(self)
+
+    def get_agent_name(self):
+        return self.client.agent_name
+
+    def add_connector_time(self, connector_name, secs):
+        """ Records how long a connector's on_input_phase took """
+        with self.lock:
+            _add_time(self.connector_times, connector_name, secs)
+
+    def sample(self):
+        """ Runs soar's stats command and updates the stats and decision rate
+            Returns the SoarStats (or None if the client has no agent) """
+        agent = self.client.agent
+        if agent is None:
+            return None
+        stats = parse_stats(agent.ExecuteCommandLine("stats"))
+        now = perf_counter()
+        with self.lock:
+            if self.stats is not None and self.stats.decisions is not None and stats.decisions is not None:
+                self.decision_rate = (stats.decisions - self.stats.decisions) / max(now - self.last_sample_time, 1e-9)
+            self.stats = stats
+            self.last_sample_time = now
+        return stats
+
+    def collect(self):
+        """ Returns a list of (metric_name, type, help, labels, value) for every metric
+            (labels is a dict, which always includes the agent name) """
+        agent = { "agent": self.get_agent_name() }
+        with self.lock:
+            metrics = [
+                ("pysoarlib_input_phases_total", "counter", "Input phases handled by the client", agent, self.num_input_phases),
+                ("pysoarlib_decision_rate", "gauge", "Decisions per second since the last sample", agent, self.decision_rate),
+                ("pysoarlib_print_messages_total", "counter", "Soar print events", agent, self.num_print_messages),
+                ("pysoarlib_print_chars_total", "counter", "Characters in soar print events", agent, self.num_print_chars),
+            ]
+            stats = self.stats
+            if stats is not None:
+                for field, name, type, help in _STATS_METRICS:
+                    value = getattr(stats, field)
+                    if value is not None:
+                        metrics.append( (name, type, help, agent, value) )
+            for times, name, label in ( (self.connector_times, "pysoarlib_connector_input_seconds", "connector"),
+                                        (self.output_times, "pysoarlib_output_handler_seconds", "command") ):
+                for key, (total, count, max_secs) in sorted(times.items()):
+                    labels = dict(agent)
+                    labels[label] = key
+                    metrics.append( (name + "_sum", "counter", "Total seconds spent", labels, total) )
+                    metrics.append( (name + "_count", "counter", "Number of calls", labels, count) )
+                    metrics.append( (name + "_max", "gauge", "Longest call in seconds", labels, max_secs) )
+        return metrics
+
+    ### Output listener methods
+
+    def before_output_event(self, command_name, root_id, wme):
+        self.output_start_times[root_id.GetIdentifierSymbol()] = perf_counter()
+
+    def after_output_event(self, command_name, root_id, wme):
+        start = self.output_start_times.pop(root_id.GetIdentifierSymbol(), None)
+        if start is not None:
+            with self.lock:
+                _add_time(self.output_times, command_name, perf_counter() - start)
+
+    ### Internal Methods
+
+    def _on_print(self, message):
+        self.num_print_messages += 1
+        self.num_print_chars += len(message)
+
+_STATS_METRICS = [
+    ("decisions", "pysoarlib_decisions_total", "counter", "Decision cycles"),
+    ("msec_per_decision", "pysoarlib_msec_per_decision", "gauge", "Mean kernel milliseconds per decision"),
+    ("elaboration_cycles", "pysoarlib_elaboration_cycles_total", "counter", "Elaboration cycles"),
+    ("production_firings", "pysoarlib_production_firings_total", "counter", "Production firings"),
+    ("wme_changes", "pysoarlib_wme_changes_total", "counter", "Working memory changes"),
+    ("wm_size", "pysoarlib_wm_size", "gauge", "Current working memory size"),
+    ("wm_mean", "pysoarlib_wm_size_mean", "gauge", "Mean working memory size"),
+    ("wm_max", "pysoarlib_wm_size_max", "gauge", "Maximum working memory size"),
+    ("kernel_time", "pysoarlib_kernel_seconds_total", "counter", "Kernel cpu seconds"),
+    ("num_productions", "pysoarlib_productions", "gauge", "Productions loaded"),
+    ("num_chunks", "pysoarlib_chunks", "gauge", "Chunks learned"),
+]
+
+def _add_time(times, key, secs):
+    entry = times.get(key)
+    if entry is None:
+        times[key] = [ secs, 1, secs ]
+        return
+    entry[0] += secs
+    entry[1] += 1
+    if secs > entry[2]:
+        entry[2] = secs
@@ -0,0 +1,174 @@
+"""
+Defines a class that decodes an output command's arguments into a typed record in one pass
+"""
+
+import dataclasses
+
+class CommandSchemaError(ValueError):
+    """ Raised when a command doesn't match its schema (the message is written to the command as ^message) """
+    pass
+
+_MISSING = object()
+_TYPE_NAMES = { "int": int, "float": float, "str": str, "bool": bool }
+
+class CommandSchema:
+    """ Describes the arguments of an output command and decodes them into a record
+
+        Decoding reads the command's child wmes once (instead of a FindByAttribute per argument)
+            and converts each one by its field type:
+                int, float (also accepts ints), str, bool (true/false),
+                'id' (the sml Identifier), or another CommandSchema (a nested structure)
+            A field type of [type] collects every value of a multi-valued attribute into a list.
+        A field named max_speed matches either ^max_speed or ^max-speed.
+        Attributes not in the schema (such as ^status) are ignored.
+        Missing or badly typed arguments raise a CommandSchemaError
+
+        The record can be a dict, a namedtuple or dataclass (fields, types, and defaults are taken from the class),
+            or a numpy array (see CommandSchema.array)
+
+        Usage:
+            MoveCommand = namedtuple("MoveCommand", [ "x", "y", "speed" ])
+            self.add_output_command("move", CommandSchema(MoveCommand, { "x": float, "y": float, "speed": float },
+                    defaults={ "speed": 1.0 }))
+            def on_output_event(self, command_name, root_id, command):
+                self.move_to(command.x, command.y, command.speed)
+    """
+    def __init__(self, record_type=dict, fields=None, defaults=None, dtype=None):
+        """ record_type - dict, a namedtuple class, a dataclass, or 'numpy'
+            fields - a dict (or list of pairs) of field name -> type,
+                optional for dataclasses and typing.NamedTuples (the annotations are used)
+            defaults - a dict of field name -> value for optional fields
+                (dataclass and namedtuple defaults are used too)
+            dtype - the numpy dtype of the array (only for record_type='numpy') """
+        self.record_type = record_type
+        self.dtype = dtype
+        self.names, self.types, self.defaults = _get_fields(record_type, fields, defaults)
+
+        # attribute -> (index, type, is_multi_valued)
+        self.index = dict()
+        for i, (name, field_type) in enumerate(zip(self.names, self.types)):
+            is_list = isinstance(field_type, list)
+            entry = (i, field_type[0] if is_list else field_type, is_list)
+            self.index[name] = entry
+            self.index[name.replace("_", "-")] = entry
+
+    @staticmethod
+    def array(attrs, dtype=float, defaults=None):
+        """ A schema that decodes the numeric arguments with the given attribute names (in order) into a numpy array
+            (e.g. CommandSchema.array([ "j" + str(i) for i in range(100) ]) for ^j0 .. ^j99) """
+        return CommandSchema("numpy", [ (attr, float) for attr in attrs ], defaults, dtype)
+
+    def decode(self, root_id):
+        """ Returns the record for the command rooted at root_id, raises CommandSchemaError if it doesn't match """
+        values = [ _MISSING ] * len(self.names)
+        index = self.index
+        for i in range(root_id.GetNumberChildren()):
+            wme = root_id.GetChild(i)
+            attr = wme.GetAttribute()
+            entry = index.get(attr)
+            if entry is None:
+                continue
+            pos, field_type, is_list = entry
+            value = _convert(wme, attr, field_type)
+            if is_list:
+                if values[pos] is _MISSING:
+                    values[pos] = [ value ]
+                else:
+                    values[pos].append(value)
+            elif values[pos] is _MISSING:
+                values[pos] = value
+            else:
+                raise CommandSchemaError("^{} has multiple values".format(attr))
+
+        for pos, value in enumerate(values):
+            if value is _MISSING:
+                name = self.names[pos]
+                if name in self.defaults:
+                    values[pos] = self.defaults[name]
+                elif isinstance(self.types[pos], list):
+                    values[pos] = []
+                else:
+                    raise CommandSchemaError("missing ^{}".format(name))
+        return self._make_record(values)
+
+    ### Internal Methods
+
+    def _make_record(self, values):
+        if self.record_type is dict:
+            return dict(zip(self.names, values))
+        if self.record_type == "numpy":
+            import numpy as np
+            return np.array(values, dtype=self.dtype if self.dtype is not None else float)
+        return self.record_type(*values)
+
+def _convert(wme, attr, field_type):
+    value_type = wme.GetValueType()
+    if field_type is float:
+        if value_type == "double":
+            return wme.ConvertToFloatElement().GetValue()
+        if value_type == "int":
+            return float(wme.ConvertToIntElement().GetValue())
+    elif field_type is int:
+        if value_type == "int":
+            return wme.ConvertToIntElement().GetValue()
+    elif field_type is str:
+        return wme.GetValueAsString()
+    elif field_type is bool:
+        value = wme.GetValueAsString()
+        if value in ("true", "false"):
+            return value == "true"
+    elif field_type == "id":
+        if wme.IsIdentifier():
+            return wme.ConvertToIdentifier()
+    elif isinstance(field_type, CommandSchema):
+        if wme.IsIdentifier():
+            try:
+                return field_type.decode(wme.ConvertToIdentifier())
+            except CommandSchemaError as e:
+                raise CommandSchemaError("^{}: {}".format(attr, e))
+    type_name = field_type if isinstance(field_type, str) else getattr(field_type, "__name__", "structure")
+    raise CommandSchemaError("^{} should be {}, not {}".format(attr, type_name, wme.GetValueAsString()))
+
+def _get_fields(record_type, fields, defaults):
+    """ Returns (names, types, defaults) for the schema """
+    all_defaults = dict()
+    annotations = dict()
+    names = None
+    if dataclasses.is_dataclass(record_type):
+        names = [ field.name for field in dataclasses.fields(record_type) ]
+        for field in dataclasses.fields(record_type):
+            annotations[field.name] = field.type
+            if field.default is not dataclasses.MISSING:
+                all_defaults[field.name] = field.default
+    elif isinstance(record_type, type) and hasattr(record_type, "_fields"):
+        names = list(record_type._fields)
+        annotations = dict(getattr(record_type, "__annotations__", {}))
+        all_defaults.update(getattr(record_type, "_field_defaults", {}))
+
+    if fields is not None:
+        field_list = list(fields.items()) if isinstance(fields, dict) else list(fields)
+        annotations.update(field_list)
+        if names is None:
+            names = [ name for name, field_type in field_list ]
+    if names is None:
+        raise ValueError("CommandSchema: fields must be given for " + str(record_type))
+    if defaults is not None:
+        all_defaults.update(defaults)
+
+    types = []
+    for name in names:
+        if name not in annotations:
+            raise ValueError("CommandSchema: no type given for field " + name)
+        types.append(_normalize_type(annotations[name]))
+    return names, types, all_defaults
+
+def _normalize_type(field_type):
+    """ Converts string and typing annotations (e.g. 'float', List[float]) to the schema's field types """
+    if isinstance(field_type, str) and field_type in _TYPE_NAMES:
+        return _TYPE_NAMES[field_type]
+    if getattr(field_type, "__origin__", None) is list:
+        args = getattr(field_type, "__args__", None) or (str, )
+        return [ _normalize_type(args[0]) ]
+    if isinstance(field_type, list):
+        return [ _normalize_type(field_type[0]) ]
+    return field_type
@@ -0,0 +1,207 @@
+"""
+Defines an AgentConnector that records everything written to the input-link
+and the output commands the agent sends to a binary episode log
+
+The log can be replayed later with a ReplayConnector
+"""
+
+import traceback
+
+import Python_sml_ClientInterface as sml
+
+from .AgentConnector import AgentConnector
+from .util.EpisodeLog import EpisodeWriter, get_wme_children, descendant_ids
+from .util.walk_identifiers import walk_identifiers
+
+class EpisodeRecorder(AgentConnector):
+    """ Records an episode log of the agent's input and output
+
+        Every working memory change made through a SoarWME (or a WMInterface built from them)
+            is recorded as it happens, and so is every identifier added with CreateIdWME
+            or removed with DestroyWME under a recorded identifier
+            (the structure already on the input-link is recorded the first time it's needed)
+        Only changes to this client's agent are recorded (see SoarClient.add_wm_listener)
+        Every output command handled by a connector is recorded along with
+            the wmes its handler added to the command (e.g. ^status complete),
+            each either as its own record (if made through a SoarWME) or in the command's response
+        An END_CYCLE record is written after each input phase
+
+        Other changes made directly through SML (e.g. CreateStringWME) are not recorded
+
+        Usage:
+            client.add_connector("recorder", EpisodeRecorder(client, "episode.bin"))
+    """
+    def __init__(self, client, filename, flush_every=1):
+        """ filename is the log file to write (overwritten if it exists)
+            flush_every - the file is flushed every flush_every cycles
+                (so a crashed run's log is readable up to then), if 0 only when disconnected """
+        AgentConnector.__init__(self, client)
+        self.filename = filename
+        self.flush_every = flush_every
+        self.fout = open(filename, "wb")
+        self.writer = EpisodeWriter(self.fout)
+
+        self.handles = {}           # SoarWME -> handle used in the log
+        self.next_handle = 0
+        self.known_ids = set()      # identifier symbols already in the log
+        self.id_parents = {}        # identifier symbol -> parent symbol (for the identifiers in the log)
+        self.wme_parents = {}       # SoarWME -> parent symbol
+        self.input_link_sym = None
+        self.command_children = {}  # command root symbol -> set of (attr, value) to leave out of its response
+                                    #   (present before its handler ran, or recorded as their own records)
+        self.run_event_callback_id = -1
+
+        self.num_cycles = 0
+        self.num_unrecorded = 0     # changes to wmes with a parent that couldn't be found
+
+    def connect(self):
+        if self.connected:
+            return
+        AgentConnector.connect(self)
+        self.client.add_wm_listener(self)
+        self.client.add_output_listener(self)
+        self.run_event_callback_id = self.client.agent.RegisterForRunEvent(
+                sml.smlEVENT_AFTER_INPUT_PHASE, EpisodeRecorder._run_event_handler, self)
+
+    def disconnect(self):
+        if not self.connected:
+            return
+        if self.run_event_callback_id != -1:
+            self.client.agent.UnregisterForRunEvent(self.run_event_callback_id)
+            self.run_event_callback_id = -1
+        self.client.remove_output_listener(self)
+        self.client.remove_wm_listener(self)
+        self.fout.flush()
+        AgentConnector.disconnect(self)
+
+    def close(self):
+        """ Stops recording and closes the log file """
+        self.disconnect()
+        self.fout.close()
+
+    def on_init_soar(self):
+        self.writer.init_soar()
+        self.handles = {}
+        self.known_ids = set()
+        self.id_parents = {}
+        self.wme_parents = {}
+        self.input_link_sym = None
+        self.command_children = {}
+
+    ### WMInterface listener methods
+
+    def wme_added(self, soar_wme, parent_id):
+        if self.input_link_sym is None:
+            self._record_input_link()
+        parent_sym = parent_id.GetIdentifierSymbol()
+        if parent_sym not in self.known_ids:
+            self.num_unrecorded += 1
+            return
+        handle = self.next_handle
+        self.next_handle += 1
+        self.handles[soar_wme] = handle
+        self.wme_parents[soar_wme] = parent_sym
+        self.writer.add(handle, parent_sym, soar_wme.att, soar_wme.val)
+        self._leave_out_of_response(parent_sym, soar_wme.att, soar_wme.val)
+
+    def wme_updated(self, soar_wme):
+        handle = self.handles.get(soar_wme)
+        if handle is None:
+            self.num_unrecorded += 1
+            return
+        self.writer.update(handle, soar_wme.val)
+        self._leave_out_of_response(self.wme_parents[soar_wme], soar_wme.att, soar_wme.val)
+
+    def wme_removed(self, soar_wme):
+        handle = self.handles.pop(soar_wme, None)
+        self.wme_parents.pop(soar_wme, None)
+        if handle is None:
+            self.num_unrecorded += 1
+            return
+        self.writer.remove(handle)
+
+    def wme_unchanged(self, soar_wme):
+        pass
+
+    def identifier_added(self, parent_id, attr, child_id):
+        if self.input_link_sym is None:
+            # The walk finds the new identifier too
+            self._record_input_link()
+            return
+        parent_sym = parent_id.GetIdentifierSymbol()
+        child_sym = child_id.GetIdentifierSymbol()
+        if parent_sym not in self.known_ids or child_sym in self.known_ids:
+            return
+        self.known_ids.add(child_sym)
+        self.id_parents[child_sym] = parent_sym
+        self.writer.identifier(parent_sym, attr, child_sym)
+        self._leave_out_of_response(parent_sym, attr, child_sym)
+
+    def identifier_removed(self, identifier):
+        id_sym = identifier.GetIdentifierSymbol()
+        # Only identifiers recorded on the input-link (not output commands)
+        if id_sym not in self.id_parents:
+            return
+        self.writer.remove_identifier(id_sym)
+
+        # Everything under the identifier is gone too (without its own records)
+        removed = set([ id_sym ])
+        for sym in descendant_ids(id_sym, self.id_parents):
+            removed.add(sym)
+        for sym in removed:
+            self.known_ids.discard(sym)
+            self.id_parents.pop(sym, None)
+        for soar_wme in [ w for w, parent_sym in self.wme_parents.items() if parent_sym in removed ]:
+            del self.wme_parents[soar_wme]
+            del self.handles[soar_wme]
+
+    ### Output listener methods
+
+    def before_output_event(self, command_name, root_id, wme):
+        root_sym = root_id.GetIdentifierSymbol()
+        children = get_wme_children(root_id)
+        self.writer.command(command_name, root_sym, children)
+        self.command_children[root_sym] = set( (attr, val) for (attr, val, is_id) in children )
+        self.known_ids.add(root_sym)
+
+    def after_output_event(self, command_name, root_id, wme):
+        root_sym = root_id.GetIdentifierSymbol()
+        before = self.command_children.pop(root_sym, set())
+        added = [ child for child in get_wme_children(root_id) if (child[0], child[1]) not in before ]
+        # Always written, it also marks the end of the changes made by the command's handler
+        self.writer.response(root_sym, added)
+
+    ### Internal Methods
+
+    @staticmethod
+    def _run_event_handler(eventID, self, agent, phase):
+        try:
+            self.writer.end_cycle(agent.GetDecisionCycleCounter())
+            self.num_cycles += 1
+            if self.flush_every > 0 and self.num_cycles % self.flush_every == 0:
+                self.fout.flush()
+        except:
+            self.client.print_handler("ERROR IN EPISODE RECORDER")
+            self.client.print_handler(traceback.format_exc())
+
+    def _record_input_link(self):
+        """ Records the input-link and every identifier already on it (parents before their children)
+            Identifiers added after this are recorded as they are created (see identifier_added) """
+        input_link = self.client.agent.GetInputLink()
+        self.input_link_sym = input_link.GetIdentifierSymbol()
+        self.writer.root(self.input_link_sym)
+        self.known_ids.add(self.input_link_sym)
+
+        for (parent_sym, attr, child) in walk_identifiers(input_link):
+            child_sym = child.GetIdentifierSymbol()
+            if child_sym not in self.known_ids:
+                self.known_ids.add(child_sym)
+                self.id_parents[child_sym] = parent_sym
+                self.writer.identifier(parent_sym, attr, child_sym)
+
+    def _leave_out_of_response(self, parent_sym, attr, value):
+        """ A wme a command's handler made that has its own record isn't also put in the command's response
+            (the replay would make it twice) """
+        response_skips = self.command_children.get(parent_sym)
+        if response_skips is not None:
+            response_skips.add( (attr, value) )
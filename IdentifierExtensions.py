@@ -1,9 +1,11 @@
 """ Defines additional helper methods for the Identifier class for accessing child values
 
 This module is not intended to be imported directly,
-Importing the pysoarlib module will cause these to be added to the Identifier class
+Using SoarClient will cause these to be added to the Identifier class (see extend_identifier_class)
 Note that the methods will use CamelCase, so get_child_str => GetChildStr
 """
+from .WMInterface import get_wm_listeners
+
 _INTEGER_VAL = "int"
 _FLOAT_VAL = "double"
 _STRING_VAL = "string"
@@ -77,3 +79,37 @@ def get_all_child_wmes(self):
     return wmes
 
 
+def create_id_wme(self, attribute):
+    """ Adds (self ^attribute <new-id>) to working memory and returns the new Identifier
+        Any wm listeners of the agent's client are told (see SoarClient.add_wm_listener) """
+    child = self._sml_create_id_wme(attribute)
+    for listener in get_wm_listeners(self):
+        listener.identifier_added(self, attribute, child)
+    return child
+
+def destroy_wme(self):
+    """ Removes the identifier (and everything under it) from working memory
+        Any wm listeners of the agent's client are told first (see SoarClient.add_wm_listener) """
+    for listener in get_wm_listeners(self):
+        listener.identifier_removed(self)
+    return self._sml_destroy_wme()
+
+
+def extend_identifier_class():
+    """ Adds the methods above to the sml Identifier class (can be called more than once)
+        Called when SoarClient is first imported, since that is when SML is loaded """
+    import Python_sml_ClientInterface as sml
+    if getattr(sml.Identifier, "GetAllChildWmes", None) is get_all_child_wmes:
+        return
+    sml.Identifier.GetChildString = get_child_str
+    sml.Identifier.GetChildInt = get_child_int
+    sml.Identifier.GetChildFloat = get_child_float
+    sml.Identifier.GetChildId = get_child_id
+    sml.Identifier.GetAllChildIds = get_all_child_ids
+    sml.Identifier.GetAllChildValues = get_all_child_values
+    sml.Identifier.GetAllChildWmes = get_all_child_wmes
+    sml.Identifier._sml_create_id_wme = sml.Identifier.CreateIdWME
+    sml.Identifier.CreateIdWME = create_id_wme
+    sml.Identifier._sml_destroy_wme = sml.Identifier.DestroyWME
+    sml.Identifier.DestroyWME = destroy_wme
+    sml.Identifier.__lt__ = lambda self, other: self.GetIdentifierSymbol() < other.GetIdentifierSymbol()
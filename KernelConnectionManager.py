@@ -0,0 +1,192 @@
+"""
+Defines a class that shares remote kernel connections between SoarClients
+and reconnects them when a kernel goes away
+"""
+
+from threading import Thread, RLock, Event
+import traceback
+
+import Python_sml_ClientInterface as sml
+
+class _KernelConnection:
+    """ A remote connection to one kernel and the clients using it """
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.kernel = None
+        self.clients = []
+        self.waiting_clients = []   # clients that still need to be given the new kernel after a reconnect
+        self.lost = False           # set by the kernel's system events (never by calling the kernel)
+        self.event_callback_ids = []
+
+class KernelConnectionManager:
+    """ Pools remote connections to soar kernels, keyed by (host, port)
+
+        Every SoarClient with remote_connection=true gets its kernel from a manager
+            (by default the shared one from KernelConnectionManager.get_default()),
+            so any number of clients in one process use a single connection per kernel.
+
+        A connection is lost when the kernel sends its BEFORE_SHUTDOWN event, or SML reports that the
+            connection was lost (AFTER_CONNECTION_LOST), so nothing else calls the kernel while the clients use it.
+        If reconnect is True, a background thread checks the connections every
+            reconnect_interval seconds. When a kernel goes away (e.g. it is restarted),
+            each client using it is disconnected, and once the kernel can be reached again
+            the clients get the new kernel + agent and re-register their (and their connectors') event handlers.
+
+        To try it locally, create a kernel in another process with
+            sml.Kernel.CreateKernelInNewThread(port) and connect with remote_host=localhost, remote_port=port
+    """
+
+    _default = None
+
+    @staticmethod
+    def get_default():
+        """ Returns the manager shared by every SoarClient that isn't given one """
+        if KernelConnectionManager._default is None:
+            KernelConnectionManager._default = KernelConnectionManager()
+        return KernelConnectionManager._default
+
+    def __init__(self, reconnect=True, reconnect_interval=1.0):
+        self.reconnect = reconnect
+        self.reconnect_interval = reconnect_interval
+        self.connections = {}       # (host, port) -> _KernelConnection
+        self.lock = RLock()
+        self.stop_event = None      # set to stop the current monitor thread
+        self.monitor_thread = None
+
+    def acquire(self, client, host=None, port=None):
+        """ Returns a kernel connected to the given host/port for the client to use,
+            creating the connection if there isn't one already
+            Raises a RuntimeError if the kernel can't be reached """
+        key = _connection_key(host, port)
+        with self.lock:
+            connection = self.connections.get(key)
+            if connection is None:
+                connection = _KernelConnection(key[0], key[1])
+                self._connect(connection)
+                if connection.kernel is None:
+                    raise RuntimeError("Could not connect to a soar kernel at {}:{}".format(key[0], key[1]))
+                self.connections[key] = connection
+            if client not in connection.clients:
+                connection.clients.append(client)
+            self._start_monitor()
+            return connection.kernel
+
+    def release(self, client):
+        """ Stops the client from using its connection, the connection is closed once no clients are left """
+        with self.lock:
+            for key, connection in list(self.connections.items()):
+                if client not in connection.clients:
+                    continue
+                connection.clients.remove(client)
+                if client in connection.waiting_clients:
+                    connection.waiting_clients.remove(client)
+                if len(connection.clients) == 0:
+                    self._close(connection)
+                    del self.connections[key]
+            if len(self.connections) == 0:
+                self._stop_monitor()
+
+    def get_agent(self, kernel, agent_name=None):
+        """ Returns the agent with the given name on the kernel (or the first agent if agent_name is None)
+            Returns None if there is no such agent """
+        if agent_name is None:
+            if kernel.GetNumberAgents() == 0:
+                return None
+            return kernel.GetAgentByIndex(0)
+        return kernel.GetAgent(agent_name)
+
+    def is_connection_lost(self, connection):
+        """ Returns True if the kernel for the connection can no longer be reached
+            (this only checks the flag set by the kernel's events, the kernel itself isn't called,
+            since SML doesn't allow calls from this thread while the clients are using the connection) """
+        return connection.lost
+
+    def close_all(self):
+        """ Closes every connection and stops the reconnect thread """
+        with self.lock:
+            for connection in self.connections.values():
+                self._close(connection)
+            self.connections = {}
+            self._stop_monitor()
+
+    ### Internal Methods
+
+    def _connect(self, connection):
+        """ Tries to create the kernel for the connection (leaves it as None on failure) """
+        kernel = sml.Kernel.CreateRemoteConnection(True, connection.host, connection.port)
+        if kernel is None or kernel.HadError():
+            # Retried every reconnect_interval while the kernel is down, so don't leak the failed ones
+            if kernel is not None:
+                kernel.Shutdown()
+            connection.kernel = None
+            return
+        connection.kernel = kernel
+        connection.lost = False
+        connection.event_callback_ids = [ kernel.RegisterForSystemEvent(event_id, KernelConnectionManager._lost_handler, connection)
+                for event_id in (sml.smlEVENT_BEFORE_SHUTDOWN, sml.smlEVENT_AFTER_CONNECTION_LOST) ]
+
+    def _close(self, connection):
+        if connection.kernel is None:
+            return
+        if not connection.lost:
+            for callback_id in connection.event_callback_ids:
+                connection.kernel.UnregisterForSystemEvent(callback_id)
+        connection.event_callback_ids = []
+        connection.kernel.Shutdown()
+        connection.kernel = None
+
+    @staticmethod
+    def _lost_handler(eventID, connection, kernel):
+        connection.lost = True
+
+    def _start_monitor(self):
+        if not self.reconnect or self.monitor_thread is not None:
+            return
+        self.stop_event = Event()
+        self.monitor_thread = Thread(target=self._monitor, args=(self.stop_event,), name="KernelConnectionManager")
+        self.monitor_thread.daemon = True
+        self.monitor_thread.start()
+
+    def _stop_monitor(self):
+        if self.monitor_thread is None:
+            return
+        self.stop_event.set()
+        self.stop_event = None
+        self.monitor_thread = None
+
+    def _monitor(self, stop_event):
+        while not stop_event.wait(self.reconnect_interval):
+            with self.lock:
+                if stop_event.is_set():
+                    return
+                for connection in list(self.connections.values()):
+                    try:
+                        self._check_connection(connection)
+                    except:
+                        for client in connection.clients:
+                            client.print_handler("ERROR IN KERNEL RECONNECT")
+                            client.print_handler(traceback.format_exc())
+
+    def _check_connection(self, connection):
+        if connection.kernel is not None and not self.is_connection_lost(connection):
+            # A client's agent might not have been created yet on a restarted kernel
+            connection.waiting_clients = [ client for client in connection.waiting_clients
+                    if not client._on_reconnected(connection.kernel) ]
+            return
+
+        if connection.kernel is not None:
+            for client in connection.clients:
+                client._on_connection_lost()
+            connection.kernel.Shutdown()
+            connection.kernel = None
+            connection.event_callback_ids = []
+
+        self._connect(connection)
+        if connection.kernel is not None:
+            connection.waiting_clients = [ client for client in connection.clients
+                    if not client._on_reconnected(connection.kernel) ]
+
+def _connection_key(host, port):
+    return (host if host is not None else "localhost",
+            int(port) if port is not None else sml.Kernel.kDefaultSMLPort)
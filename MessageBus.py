@@ -0,0 +1,89 @@
+"""
+Defines a class that routes messages between the agents of several SoarClients in one process
+"""
+
+from collections import namedtuple
+from threading import Lock
+
+# payload is a tree of python values (see util.read_wm_tree), read once from the sender and shared by all recipients
+Message = namedtuple("Message", [ "id", "sender", "topic", "payload" ])
+
+class MessageBus:
+    """ Routes messages between agents in the same process (see MessageBusConnector)
+
+        A message goes to:
+            the agents it names (to), otherwise
+            the agents subscribed to its topic (except the sender), otherwise
+            the agents in the sender's route (see add_route)
+        Messages are queued on each recipient's connector and added to its input-link together
+            at its next input phase, so each agent can run on its own thread
+
+        Usage:
+            bus = MessageBus()
+            bus.add_route("scout", [ "leader" ])
+            scout.add_connector("messages", MessageBusConnector(scout, bus))
+            leader.add_connector("messages", MessageBusConnector(leader, bus, topics=[ "alerts" ]))
+    """
+    def __init__(self):
+        self.lock = Lock()
+        self.connectors = {}        # agent name -> MessageBusConnector
+        self.topics = {}            # topic -> set of agent names
+        self.routes = {}            # sender name -> list of recipient names
+        self.next_id = 1
+        self.num_sent = 0
+        self.num_delivered = 0
+        self.num_dropped = 0        # deliveries to agents that are not on the bus
+
+    def register(self, name, connector):
+        """ Adds the connector as the recipient for messages to the given agent name """
+        with self.lock:
+            self.connectors[name] = connector
+
+    def unregister(self, name):
+        with self.lock:
+            self.connectors.pop(name, None)
+
+    def subscribe(self, name, topic):
+        """ The agent will receive messages sent to the topic """
+        with self.lock:
+            self.topics.setdefault(topic, set()).add(name)
+
+    def unsubscribe(self, name, topic):
+        with self.lock:
+            self.topics.get(topic, set()).discard(name)
+
+    def add_route(self, sender, recipients):
+        """ Messages from sender that have no recipients or topic go to the given agents """
+        with self.lock:
+            self.routes[sender] = list(recipients)
+
+    def send(self, sender, payload, to=None, topic=None):
+        """ Queues a message for its recipients, returns (Message, number of agents it was queued for) """
+        with self.lock:
+            if to:
+                recipients = to
+            elif topic is not None:
+                recipients = [ name for name in self.topics.get(topic, ()) if name != sender ]
+            else:
+                recipients = self.routes.get(sender, ())
+
+            message = Message(self.next_id, sender, topic, payload)
+            self.next_id += 1
+            self.num_sent += 1
+            num_queued = 0
+            for name in recipients:
+                connector = self.connectors.get(name)
+                if connector is None:
+                    self.num_dropped += 1
+                    continue
+                connector.pending_messages.append(message)
+                num_queued += 1
+            self.num_delivered += num_queued
+            return message, num_queued
+
+    def take_pending(self, connector):
+        """ Returns and clears the messages queued for the connector """
+        with self.lock:
+            messages = connector.pending_messages
+            connector.pending_messages = []
+            return messages
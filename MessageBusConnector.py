@@ -0,0 +1,135 @@
+"""
+Defines an AgentConnector that sends and receives messages through a MessageBus
+"""
+
+from .AgentConnector import AgentConnector
+from .util.wm_tree import read_wm_tree, add_tree_to_wm
+
+class MessageBusConnector(AgentConnector):
+    """ Connects an agent to a MessageBus
+
+        The agent sends a message with the output command:
+            (<out> ^send-message <m>)
+            (<m> ^to <agent-name>      # optional, can have several
+                 ^topic <topic>        # optional, otherwise the bus routes it by sender
+                 ^payload <p>)         # any structure, it is read once and shared by every recipient
+        When it is sent, (<m> ^status complete ^id <id>) is added, or (<m> ^status error ^message <msg>) if it had no recipients
+
+        Received messages are added to the input-link (all the messages of a cycle at once):
+            (<il> ^messages <ms>)
+            (<ms> ^message <msg>)
+            (<msg> ^id <id> ^from <sender> ^topic <topic> ^payload <p>)   # topic only if it had one
+
+        A message stays on the input-link until the agent consumes it:
+            (<out> ^consume-message <c>) (<c> ^id <id>)
+        which removes it at the next input phase
+    """
+    def __init__(self, client, bus, name=None, topics=()):
+        """ bus - the MessageBus to send and receive messages through
+            name - the name other agents send to (defaults to the client's agent_name)
+            topics - the topics the agent receives messages for """
+        AgentConnector.__init__(self, client)
+        self.bus = bus
+        self.name = name if name is not None else client.agent_name
+        self.topics = list(topics)
+        self.pending_messages = []      # filled by the bus
+
+        self.messages_id = None
+        self.message_ids = {}           # message id -> Identifier on the input-link
+        self.consumed = []              # message ids to remove at the next input phase
+        self.num_received = 0
+        self.num_sent = 0
+
+        self.add_output_command("send-message")
+        self.add_output_command("consume-message")
+
+    def connect(self):
+        if self.connected:
+            return
+        self.bus.register(self.name, self)
+        for topic in self.topics:
+            self.bus.subscribe(self.name, topic)
+        AgentConnector.connect(self)
+
+    def disconnect(self):
+        if not self.connected:
+            return
+        self.bus.unregister(self.name)
+        for topic in self.topics:
+            self.bus.unsubscribe(self.name, topic)
+        self._remove_from_wm()
+        AgentConnector.disconnect(self)
+
+    def send(self, payload, to=None, topic=None):
+        """ Sends a message from python on behalf of this agent (see MessageBus.send) """
+        self.num_sent += 1
+        return self.bus.send(self.name, payload, to, topic)
+
+    def consume(self, message_id):
+        """ Removes the message from the input-link at the next input phase """
+        self.consumed.append(message_id)
+
+    def on_init_soar(self):
+        self._remove_from_wm()
+
+    def on_input_phase(self, input_link):
+        for message_id in self.consumed:
+            msg_id = self.message_ids.pop(message_id, None)
+            if msg_id is not None:
+                msg_id.DestroyWME()
+        self.consumed = []
+
+        messages = self.bus.take_pending(self)
+        if len(messages) == 0:
+            return
+        if self.messages_id is None:
+            self.messages_id = input_link.CreateIdWME("messages")
+        for message in messages:
+            msg_id = self.messages_id.CreateIdWME("message")
+            msg_id.CreateIntWME("id", message.id)
+            msg_id.CreateStringWME("from", message.sender)
+            if message.topic is not None:
+                msg_id.CreateStringWME("topic", message.topic)
+            if message.payload is not None:
+                add_tree_to_wm(msg_id, "payload", message.payload)
+            self.message_ids[message.id] = msg_id
+        self.num_received += len(messages)
+
+    def on_output_event(self, command_name, root_id):
+        if command_name == "send-message":
+            self.process_send_message_command(root_id)
+        elif command_name == "consume-message":
+            self.process_consume_message_command(root_id)
+
+    def process_send_message_command(self, root_id):
+        to = root_id.GetAllChildValues("to")
+        topic = root_id.GetChildString("topic")
+        payload_id = root_id.GetChildId("payload")
+        if payload_id is not None:
+            payload = read_wm_tree(payload_id)
+        else:
+            payload = root_id.GetChildString("payload")
+
+        message, num_queued = self.send(payload, to, topic)
+        if num_queued == 0:
+            root_id.CreateStringWME("status", "error")
+            root_id.CreateStringWME("message", "no recipients")
+        else:
+            root_id.CreateStringWME("status", "complete")
+            root_id.CreateIntWME("id", message.id)
+
+    def _remove_from_wm(self):
+        """ Removes ^messages (and every message under it) from the input-link """
+        if self.messages_id is not None:
+            self.messages_id.DestroyWME()
+        self.messages_id = None
+        self.message_ids = {}
+        self.consumed = []
+
+    def process_consume_message_command(self, root_id):
+        message_id = root_id.GetChildInt("id")
+        if message_id is None or message_id not in self.message_ids:
+            root_id.CreateStringWME("status", "error")
+            return
+        self.consume(message_id)
+        root_id.CreateStringWME("status", "complete")
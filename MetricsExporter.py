@@ -0,0 +1,154 @@
+"""
+Defines a class that publishes AgentMetrics in the Prometheus text format,
+over a local http endpoint and/or to a file
+"""
+
+from http.server import HTTPServer, BaseHTTPRequestHandler
+import os
+from threading import Thread, Event, Lock
+import traceback
+
+class MetricsExporter:
+    """ Periodically samples a set of AgentMetrics on a background thread and publishes them
+
+        Every interval seconds the exporter runs each AgentMetrics.sample() (the soar stats command)
+            and renders all the metrics in the Prometheus text format, with an agent label on each.
+        If port is given, the text is served at http://127.0.0.1:port/metrics
+        If filename is given, the file is rewritten with the text after every sample
+
+        Sampling and serving never happen on the kernel thread.
+        Clients with the same port/filename share one exporter (see MetricsExporter.get_shared),
+            so a process running several agents has one endpoint with a series per agent
+    """
+
+    _shared = {}
+    _shared_lock = Lock()
+
+    @staticmethod
+    def get_shared(port=None, filename=None, interval=5.0):
+        """ Returns the exporter for the given port and filename, creating it if needed """
+        key = (port, filename)
+        with MetricsExporter._shared_lock:
+            exporter = MetricsExporter._shared.get(key)
+            if exporter is None:
+                exporter = MetricsExporter(port, filename, interval)
+                MetricsExporter._shared[key] = exporter
+            return exporter
+
+    def __init__(self, port=None, filename=None, interval=5.0):
+        self.port = port
+        self.filename = filename
+        self.interval = float(interval)
+        self.metrics = []           # AgentMetrics being exported
+        self.lock = Lock()
+        self.text = ""              # the latest rendering of the metrics
+
+        self.stop_event = None
+        self.sample_thread = None
+        self.server = None
+
+    def add(self, agent_metrics):
+        """ Starts exporting the given AgentMetrics (starts the exporter if it wasn't running)
+            The client can't use kernel_thread=current, since its kernel would be called from the sample thread """
+        if agent_metrics.client.kernel_thread == "current":
+            raise ValueError("MetricsExporter: can't sample agent {} from a background thread (kernel_thread=current)".format(
+                agent_metrics.get_agent_name()))
+        with self.lock:
+            self.metrics.append(agent_metrics)
+            if self.sample_thread is None:
+                try:
+                    self._start()
+                except:
+                    self.metrics.remove(agent_metrics)
+                    raise
+
+    def remove(self, agent_metrics):
+        """ Stops exporting the given AgentMetrics (stops the exporter if none are left) """
+        with self.lock:
+            self.metrics = [ m for m in self.metrics if m is not agent_metrics ]
+            if len(self.metrics) == 0:
+                self._stop()
+
+    def sample(self):
+        """ Samples every AgentMetrics, renders the text, and writes the file """
+        with self.lock:
+            metrics = list(self.metrics)
+        samples = []
+        for agent_metrics in metrics:
+            try:
+                agent_metrics.sample()
+            except:
+                agent_metrics.client.print_handler("ERROR SAMPLING METRICS")
+                agent_metrics.client.print_handler(traceback.format_exc())
+            samples.extend(agent_metrics.collect())
+        self.text = format_prometheus(samples)
+
+        if self.filename is not None:
+            tmp_filename = self.filename + ".tmp"
+            with open(tmp_filename, "w") as fout:
+                fout.write(self.text)
+            os.replace(tmp_filename, self.filename)
+        return self.text
+
+    ### Internal Methods
+
+    def _start(self):
+        # Binds the port first, so nothing is left running if it fails
+        if self.port is not None:
+            self.server = HTTPServer(("127.0.0.1", int(self.port)), _MetricsHandler)
+            self.server.exporter = self
+            server_thread = Thread(target=self.server.serve_forever, name="MetricsExporter-http")
+            server_thread.daemon = True
+            server_thread.start()
+
+        self.stop_event = Event()
+        self.sample_thread = Thread(target=self._sample_loop, args=(self.stop_event,), name="MetricsExporter")
+        self.sample_thread.daemon = True
+        self.sample_thread.start()
+
+    def _stop(self):
+        if self.sample_thread is None:
+            return
+        self.stop_event.set()
+        self.stop_event = None
+        self.sample_thread = None
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def _sample_loop(self, stop_event):
+        while not stop_event.wait(self.interval):
+            self.sample()
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        data = self.server.exporter.text.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+def format_prometheus(samples):
+    """ Returns the Prometheus text format for a list of (metric_name, type, help, labels, value)
+        (samples of the same metric are grouped under one HELP/TYPE header) """
+    by_name = dict()
+    for sample in samples:
+        by_name.setdefault(sample[0], []).append(sample)
+
+    lines = []
+    for name, metric_samples in by_name.items():
+        lines.append("# HELP {} {}".format(name, metric_samples[0][2]))
+        lines.append("# TYPE {} {}".format(name, metric_samples[0][1]))
+        for (name, type, help, labels, value) in metric_samples:
+            label_str = ",".join('{}="{}"'.format(key, _escape_label(str(val))) for key, val in labels.items())
+            lines.append("{}{{{}}} {}".format(name, label_str, value))
+    lines.append("")
+    return "\n".join(lines)
+
+def _escape_label(value):
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
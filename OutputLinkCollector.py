@@ -0,0 +1,119 @@
+"""
+Defines an AgentConnector that removes finished commands from the output-link
+"""
+
+import traceback
+
+import Python_sml_ClientInterface as sml
+
+from .AgentConnector import AgentConnector
+
+class OutputLinkCollector(AgentConnector):
+    """ Removes commands handled by the client's connectors from the output-link once they are finished
+
+        Every command handled by a connector is tracked (through an output listener).
+        Once it has a ^status, it is removed gc_cycles decision cycles later
+            with the wm remove command (by the timetag of the (<output-link> ^command <id>) wme),
+            so agents don't need their own rules to clean up the output-link.
+
+        It also keeps count of the commands that are still outstanding (handled but with no status),
+            and warns through the print_handler each time the output-link doubles in size past warn_size
+
+        A client creates one (as the connector 'output_gc') when output_gc_cycles is set
+    """
+    def __init__(self, client, gc_cycles=1, warn_size=100):
+        AgentConnector.__init__(self, client)
+        self.gc_cycles = int(gc_cycles)
+        self.warn_size = warn_size
+        self.next_warn_size = warn_size
+        self.run_event_callback_id = -1
+
+        self.cycle = 0
+        self.commands = {}              # timetag -> cycle the command finished (None if it has no status yet)
+        self.num_handled = 0
+        self.num_removed = 0
+        self.num_errors = 0
+
+    def connect(self):
+        if self.connected:
+            return
+        AgentConnector.connect(self)
+        self.client.add_output_listener(self)
+        self.run_event_callback_id = self.client.agent.RegisterForRunEvent(
+                sml.smlEVENT_AFTER_OUTPUT_PHASE, OutputLinkCollector._run_event_handler, self)
+
+    def disconnect(self):
+        if not self.connected:
+            return
+        self.client.remove_output_listener(self)
+        if self.run_event_callback_id != -1:
+            self.client.agent.UnregisterForRunEvent(self.run_event_callback_id)
+            self.run_event_callback_id = -1
+        AgentConnector.disconnect(self)
+
+    def num_outstanding(self):
+        """ The number of handled commands that don't have a status yet """
+        return sum(1 for finished in self.commands.values() if finished is None)
+
+    def on_init_soar(self):
+        self.commands = {}
+        self.next_warn_size = self.warn_size
+
+    ### Output listener methods
+
+    def before_output_event(self, command_name, root_id, wme):
+        pass
+
+    def after_output_event(self, command_name, root_id, wme):
+        self.commands[wme.GetTimeTag()] = None
+        self.num_handled += 1
+
+    ### Internal Methods
+
+    @staticmethod
+    def _run_event_handler(eventID, self, agent, phase):
+        # After the output phase, the client's copy of the output-link is up to date
+        try:
+            self.collect()
+        except:
+            self.client.print_handler("ERROR IN OUTPUT LINK COLLECTOR")
+            self.client.print_handler(traceback.format_exc())
+
+    def collect(self):
+        """ Removes the finished commands that are due, and checks the size of the output-link """
+        self.cycle += 1
+        agent = self.client.agent
+        output_link = agent.GetOutputLink()
+        if output_link is None:
+            return
+        size = output_link.GetNumberChildren()
+
+        # Only look at commands still on the output-link (the agent may have removed some itself)
+        commands = {}
+        to_remove = []
+        for index in range(size):
+            wme = output_link.GetChild(index)
+            timetag = wme.GetTimeTag()
+            if timetag not in self.commands:
+                continue
+            finished = self.commands[timetag]
+            if finished is None and wme.ConvertToIdentifier().FindByAttribute("status", 0) is not None:
+                finished = self.cycle
+            if finished is not None and self.cycle - finished >= self.gc_cycles:
+                to_remove.append(timetag)
+            else:
+                commands[timetag] = finished
+        self.commands = commands
+
+        for timetag in to_remove:
+            agent.ExecuteCommandLine("wm remove " + str(timetag))
+            if agent.GetLastCommandLineResult():
+                self.num_removed += 1
+            else:
+                self.num_errors += 1
+
+        if self.warn_size is not None:
+            if size >= self.next_warn_size:
+                self.client.print_handler("WARNING: the output-link has {} wmes ({} handled commands have no status)".format(
+                    size, self.num_outstanding()))
+                self.next_warn_size *= 2
@@ -0,0 +1,184 @@
+"""
+Defines a class that finds the productions whose firings or match cost grew between run windows
+"""
+
+from collections import namedtuple
+import os
+import re
+import time
+
+from .util.parse_soar_stats import parse_stats, parse_production_counts
+
+ProductionSnapshot = namedtuple("ProductionSnapshot", [
+    "cycle",            # decision cycle the snapshot was taken at
+    "time",             # perf_counter time the snapshot was taken at
+    "stats",            # SoarStats
+    "firings",          # dict of production name -> firing count (firing-counts)
+    "tokens",           # dict of production name -> rete tokens (memories), None if not included
+])
+
+ProfileWindow = namedtuple("ProfileWindow", [
+    "start_cycle",
+    "decisions",        # decision cycles run in the window
+    "wall_ms",
+    "kernel_ms",        # kernel cpu time used in the window (None if soar's timers are off)
+    "total_firings",
+    "firings",          # dict of production name -> firings in the window
+    "tokens",           # dict of production name -> rete tokens at the end of the window (None if not included)
+])
+
+ProductionDelta = namedtuple("ProductionDelta", [
+    "name",
+    "firings_per_decision",             # in the later window
+    "baseline_firings_per_decision",    # in the earlier window
+    "tokens",                           # rete tokens at the end of the later window (None if not included)
+    "tokens_delta",                     # change since the end of the earlier window (None if not included)
+    "source",                           # the file the production was loaded from (None if not tracked)
+])
+
+_SP_PATTERN = re.compile(r"\bsp\s*[{\"]\s*([^\s\"}]+)")
+
+class ProductionProfiler:
+    """ Snapshots per-production firing counts (and rete token counts) around a window of decision cycles,
+            to find the productions responsible when decision cycles get slower (e.g. after changing the rules)
+
+        Soar has no per-production timers, so the match cost of a production is measured by the number of
+            tokens it has in the rete (the memories command), and each window also records the kernel time
+            from stats (if soar's timers are on)
+
+        Usage:
+            profiler = ProductionProfiler(client, track_sources=True)
+            baseline = profiler.profile(decisions=1000)
+            ... (change something)
+            window = profiler.profile(decisions=1000)
+            print(profiler.report(baseline, window))
+    """
+    def __init__(self, client, memories=True, track_sources=False):
+        """ memories - if True, also snapshots the rete tokens of each production (the memories command)
+            track_sources - if True, each production is reported with the file it was sourced from
+                (uses the files in client.source_report) """
+        self.client = client
+        self.include_memories = memories
+        self.track_sources = track_sources
+        self.sources = None             # production name -> filename (built the first time it's needed)
+        self.start_snapshot = None
+
+    def snapshot(self):
+        """ Returns a ProductionSnapshot of the agent's current counts """
+        agent = self.client.agent
+        firings = parse_production_counts(agent.ExecuteCommandLine("firing-counts"))
+        tokens = None
+        if self.include_memories:
+            tokens = parse_production_counts(agent.ExecuteCommandLine("memories"))
+        return ProductionSnapshot(cycle=agent.GetDecisionCycleCounter(), time=time.perf_counter(),
+                stats=parse_stats(agent.ExecuteCommandLine("stats")), firings=firings, tokens=tokens)
+
+    def begin(self):
+        """ Starts a window (takes the snapshot it is measured from) """
+        self.start_snapshot = self.snapshot()
+        return self.start_snapshot
+
+    def end(self):
+        """ Ends the window started by begin() and returns it as a ProfileWindow """
+        if self.start_snapshot is None:
+            raise RuntimeError("ProductionProfiler: end() called without begin()")
+        window = make_window(self.start_snapshot, self.snapshot())
+        self.start_snapshot = None
+        return window
+
+    def profile(self, decisions=None, wall_ms=None, until=None):
+        """ Runs the agent with client.run_for (same arguments) and returns the ProfileWindow of the run """
+        self.begin()
+        self.client.run_for(decisions, wall_ms, until)
+        return self.end()
+
+    def compare(self, baseline, window, by="firings", n=20):
+        """ Returns the n productions whose firings per decision (by='firings') or rete tokens (by='tokens')
+                grew the most from the baseline window to the later window, as a list of ProductionDelta """
+        if by not in ("firings", "tokens"):
+            raise ValueError("ProductionProfiler: compare by firings or tokens, not " + str(by))
+        if by == "tokens" and (window.tokens is None or baseline.tokens is None):
+            raise ValueError("ProductionProfiler: the windows don't include tokens (memories=False)")
+        sources = self.get_sources() if self.track_sources else {}
+        decisions = float(max(window.decisions, 1))
+        baseline_decisions = float(max(baseline.decisions, 1))
+
+        deltas = []
+        names = set(window.firings) | set(baseline.firings)
+        if window.tokens is not None:
+            names.update(window.tokens)
+        for name in names:
+            rate = window.firings.get(name, 0) / decisions
+            baseline_rate = baseline.firings.get(name, 0) / baseline_decisions
+            tokens = tokens_delta = None
+            if window.tokens is not None and baseline.tokens is not None:
+                tokens = window.tokens.get(name, 0)
+                tokens_delta = tokens - baseline.tokens.get(name, 0)
+            deltas.append(ProductionDelta(name, rate, baseline_rate, tokens, tokens_delta, sources.get(name)))
+
+        if by == "firings":
+            key = lambda d: d.firings_per_decision - d.baseline_firings_per_decision
+        else:
+            key = lambda d: d.tokens_delta
+        deltas.sort(key=key, reverse=True)
+        return [ d for d in deltas[:n] if key(d) > 0 ]
+
+    def report(self, baseline, window, n=10):
+        """ Returns a printable summary of the two windows and the productions that grew the most """
+        lines = [ "{:20s} {:>10s} {:>12s} {:>18s}".format("", "decisions", "kernel ms", "firings/decision") ]
+        for label, w in (("baseline", baseline), ("window", window)):
+            kernel_ms = "-" if w.kernel_ms is None else "{:.1f}".format(w.kernel_ms)
+            lines.append("{:20s} {:10d} {:>12s} {:18.2f}".format(label, w.decisions, kernel_ms,
+                w.total_firings / float(max(w.decisions, 1))))
+
+        bys = [ "firings" ]
+        if window.tokens is not None and baseline.tokens is not None:
+            bys.append("tokens")
+        for by in bys:
+            lines.append("")
+            lines.append("{:50s} {:>14s} {:>14s} {:>10s} {:>10s}".format("top growth by " + by,
+                "firings/dc", "baseline", "tokens", "+tokens"))
+            for d in self.compare(baseline, window, by, n):
+                lines.append("{:50s} {:14.3f} {:14.3f} {:>10s} {:>10s}".format(d.name,
+                    d.firings_per_decision, d.baseline_firings_per_decision,
+                    "-" if d.tokens is None else str(d.tokens), "-" if d.tokens_delta is None else "{:+d}".format(d.tokens_delta)))
+                if d.source is not None:
+                    lines.append("    " + d.source)
+        return "\n".join(lines)
+
+    def get_sources(self):
+        """ Returns a dict of production name -> the file it was sourced from
+            (from client.source_report, reading the files if the report only has their production counts) """
+        if self.sources is None:
+            self.sources = dict()
+            report = getattr(self.client, "source_report", None)
+            if report is not None:
+                for f in report.files:
+                    names = f.productions if f.productions is not None else find_productions(f.filename)
+                    # A later file that redefines a production replaces it, as in soar
+                    for name in names:
+                        self.sources[name] = f.filename
+        return self.sources
+
+def make_window(start, end):
+    """ Returns the ProfileWindow between two ProductionSnapshots """
+    firings = dict()
+    for name, count in end.firings.items():
+        before = start.firings.get(name, 0)
+        # Counts go back to 0 when a production is re-sourced (or on init-soar)
+        delta = count - before if count >= before else count
+        if delta > 0:
+            firings[name] = delta
+    kernel_ms = None
+    if start.stats.kernel_time is not None and end.stats.kernel_time is not None:
+        kernel_ms = (end.stats.kernel_time - start.stats.kernel_time) * 1000.0
+    return ProfileWindow(start_cycle=start.cycle, decisions=end.cycle - start.cycle,
+            wall_ms=(end.time - start.time) * 1000.0, kernel_ms=kernel_ms,
+            total_firings=sum(firings.values()), firings=firings, tokens=end.tokens)
+
+def find_productions(filename):
+    """ Returns the names of the productions defined in a soar file (an empty list if it can't be read) """
+    if not os.path.isfile(filename):
+        return []
+    with open(filename, "r") as fin:
+        return _SP_PATTERN.findall(fin.read())
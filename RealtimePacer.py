@@ -0,0 +1,162 @@
+"""
+Defines a class that runs a SoarClient's agent at a fixed rate of decision cycles
+"""
+
+from collections import deque, namedtuple
+import math
+from threading import Thread, Event
+import time
+from time import perf_counter
+import traceback
+
+PacerStats = namedtuple("PacerStats", [
+    "cycles",           # decision cycles run by the pacer
+    "overruns",         # cycles that took longer than the period
+    "skipped",          # ticks that were dropped to get back on schedule
+    "latency_mean_ms",  # time to run one decision cycle
+    "latency_max_ms",
+    "jitter_mean_ms",   # how late each cycle started relative to its scheduled time
+    "jitter_max_ms",
+    "jitter_std_ms",
+])
+
+class RealtimePacer:
+    """ Runs the client's agent one decision cycle at a time at a fixed rate (e.g. 20 Hz)
+
+        Ticks are scheduled on the monotonic clock at start + n * period,
+            so the rate doesn't drift with the time spent running each cycle.
+        Each tick runs agent.RunSelf(1) directly (no command line parsing).
+
+        When a cycle takes longer than the period (an overrun), the late ticks are either:
+            catchup - run back to back until the pacer is on schedule again
+                      (at most max_catchup ticks behind, older ticks are skipped)
+            skip - dropped, and the pacer waits for the next future tick
+
+        The latency (time to run the cycle) and jitter (how late the cycle started)
+            of the last history cycles are kept for stats()
+
+        A client creates one as client.pacer when realtime_hz is set, and start()/stop() use it.
+        While it runs, a TimeConnector uses the pacer's clock (clock_ms) so times on the input-link
+            advance in exact steps of the period
+    """
+    def __init__(self, client, hz, overrun="catchup", max_catchup=5, history=1000):
+        if overrun not in ("catchup", "skip"):
+            raise ValueError("RealtimePacer: overrun must be catchup or skip, not " + str(overrun))
+        self.client = client
+        self.hz = float(hz)
+        self.period = 1.0 / self.hz
+        self.overrun = overrun
+        self.max_catchup = int(max_catchup)
+
+        self.latencies = deque(maxlen=int(history))
+        self.jitters = deque(maxlen=int(history))
+        self.reset_stats()
+
+        self.start_time = None          # perf_counter time of the first tick
+        self.start_wall_ms = None       # unix time (ms) of the first tick
+        self.scheduled_time = None      # perf_counter time the current tick was scheduled for
+        self.stop_event = None
+        self.thread = None
+
+    def reset_stats(self):
+        """ Clears the latency/jitter history and the counts """
+        self.num_cycles = 0
+        self.num_overruns = 0
+        self.num_skipped = 0
+        self.latencies.clear()
+        self.jitters.clear()
+
+    def is_running(self):
+        return self.stop_event is not None
+
+    def start(self):
+        """ Starts running the agent on a new thread (non-blocking) """
+        if self.stop_event is not None:
+            return
+        self.stop_event = Event()
+        self.thread = Thread(target=self._run_thread, args=(self.stop_event,), name="RealtimePacer")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        """ Stops running after the current cycle (non-blocking) """
+        if self.stop_event is None:
+            return
+        self.stop_event.set()
+        self.stop_event = None
+        self.thread = None
+
+    def run(self, num_cycles=None, stop_event=None):
+        """ Runs the agent in this thread (blocking) for num_cycles cycles or until stop_event is set """
+        stop_event = stop_event if stop_event is not None else Event()
+        agent = self.client.agent
+        period = self.period
+        self.start_time = perf_counter()
+        self.start_wall_ms = time.time() * 1000.0
+        next_time = self.start_time
+        cycles = 0
+
+        while not stop_event.is_set() and (num_cycles is None or cycles < num_cycles):
+            now = perf_counter()
+            if now < next_time:
+                # Event.wait uses the monotonic clock, and wakes up early if stopped
+                if stop_event.wait(next_time - now):
+                    break
+                now = perf_counter()
+
+            self.scheduled_time = next_time
+            self.client.run_start_time = now
+            agent.RunSelf(1)
+            end = perf_counter()
+            self.client.run_start_time = None
+
+            self.latencies.append(end - now)
+            self.jitters.append(now - next_time)
+            self.num_cycles += 1
+            cycles += 1
+
+            if end - now > period:
+                self.num_overruns += 1
+
+            next_time += period
+            if end > next_time:
+                behind = int((end - next_time) / period)
+                if self.overrun == "skip":
+                    behind += 1
+                else:
+                    behind -= self.max_catchup
+                if behind > 0:
+                    self.num_skipped += behind
+                    next_time += behind * period
+
+    def clock_ms(self):
+        """ The unix time (ms) the current tick was scheduled for
+            (or the current time if the pacer hasn't run yet) """
+        if self.scheduled_time is None:
+            return time.time() * 1000.0
+        return self.start_wall_ms + (self.scheduled_time - self.start_time) * 1000.0
+
+    def stats(self):
+        """ Returns a PacerStats summarizing the recent cycles """
+        latencies = list(self.latencies)
+        jitters = list(self.jitters)
+        n = max(len(jitters), 1)
+        jitter_mean = sum(jitters) / n
+        jitter_var = sum((j - jitter_mean) ** 2 for j in jitters) / n
+        return PacerStats(cycles=self.num_cycles, overruns=self.num_overruns, skipped=self.num_skipped,
+                latency_mean_ms=sum(latencies) * 1000.0 / n, latency_max_ms=max(latencies, default=0.0) * 1000.0,
+                jitter_mean_ms=jitter_mean * 1000.0, jitter_max_ms=max(jitters, default=0.0) * 1000.0,
+                jitter_std_ms=math.sqrt(jitter_var) * 1000.0)
+
+    ### Internal Methods
+
+    def _run_thread(self, stop_event):
+        try:
+            self.run(stop_event=stop_event)
+        except:
+            self.client.print_handler("ERROR IN REALTIME PACER")
+            self.client.print_handler(traceback.format_exc())
+        if self.stop_event is stop_event:
+            self.stop_event = None
+            self.thread = None
+        self.client.is_running = False
@@ -0,0 +1,187 @@
+"""
+Defines an AgentConnector that drives an agent from an episode log written by an EpisodeRecorder
+"""
+
+from .AgentConnector import AgentConnector
+from .SoarWME import SoarWME
+from .util.EpisodeLog import EpisodeLog, get_wme_children, split_cycle, descendant_ids, \
+        ROOT_RECORD, ID_RECORD, ADD_RECORD, UPDATE_RECORD, REMOVE_RECORD, ID_REMOVE_RECORD, INIT_RECORD
+
+class ReplayConnector(AgentConnector):
+    """ Replays the input-link changes in an episode log, one recorded cycle per input phase
+
+        This replaces the connectors that created the input (no live environment is needed),
+        so the agent can be run as fast as the kernel allows.
+
+        When the agent sends an output command that was in the recording,
+            the changes the original handler made (e.g. adding ^status complete) are made again.
+        If check_outputs is True, each output command is also compared with the recording
+            and any differences are printed and counted
+
+        Usage:
+            client.add_connector("replay", ReplayConnector(client, "episode.bin"))
+            client.execute_command("run")
+    """
+    def __init__(self, client, filename, check_outputs=True, stop_at_end=True):
+        """ filename is an episode log written by EpisodeRecorder
+            check_outputs - if True, compares the agent's output commands with the recording
+            stop_at_end - if True, stops the agent once every cycle in the log has been replayed """
+        AgentConnector.__init__(self, client)
+        self.log = EpisodeLog(filename)
+        self.check_outputs = check_outputs
+        self.stop_at_end = stop_at_end
+
+        for command_name in self.log.command_names:
+            self.add_output_command(command_name)
+
+        self.cycle_index = 0        # index of the next cycle in the log to replay
+        self.expected = []          # recorded commands for the next output phase (see split_cycle)
+        self.input_link = None
+        self._reset_wm_maps()
+
+        self.num_matches = 0        # output commands that matched the recording
+        self.num_mismatches = 0     # output commands that were recorded with different children
+        self.num_missing = 0        # recorded output commands the agent didn't send
+        self.num_unexpected = 0     # output commands the agent sent that weren't recorded
+
+    def is_finished(self):
+        """ Returns True if every cycle in the log has been replayed """
+        return self.cycle_index >= len(self.log)
+
+    def close(self):
+        """ Closes the log file """
+        self.log.close()
+
+    def on_init_soar(self):
+        self._clear_wm()
+
+    def on_input_phase(self, input_link):
+        for command in self.expected:
+            self.num_missing += 1
+            self._report("Missing output command " + command[0][1])
+        self.expected = []
+
+        if self.is_finished():
+            if self.stop_at_end:
+                self.client.stop()
+            return
+
+        self.input_link = input_link
+        commands, inputs = split_cycle(self.log.get_cycle(self.cycle_index))
+        for record in inputs:
+            self._apply_record(record)
+        self.cycle_index += 1
+
+        # The commands recorded at the start of the next cycle were sent after this input phase
+        if not self.is_finished():
+            self.expected = split_cycle(self.log.get_cycle(self.cycle_index))[0]
+
+    def on_output_event(self, command_name, root_id):
+        for i, command in enumerate(self.expected):
+            if command[0][1] == command_name:
+                break
+        else:
+            self.num_unexpected += 1
+            self._report("Unexpected output command " + command_name)
+            return
+        command_record, handler_records, response_record = self.expected.pop(i)
+
+        if self.check_outputs:
+            recorded = _child_summary(command_record[3])
+            actual = _child_summary(get_wme_children(root_id))
+            if recorded == actual:
+                self.num_matches += 1
+            else:
+                self.num_mismatches += 1
+                self._report("Output command {} differs from the recording: expected {}, got {}".format(
+                    command_name, recorded, actual))
+
+        # Changes the handler made under the recorded command go on the live one
+        self.ids[command_record[2]] = root_id
+        for record in handler_records:
+            self._apply_record(record)
+        for (attr, value, is_id) in response_record[2]:
+            if is_id:
+                root_id.CreateIdWME(attr)
+            elif isinstance(value, int):
+                root_id.CreateIntWME(attr, value)
+            elif isinstance(value, float):
+                root_id.CreateFloatWME(attr, value)
+            else:
+                root_id.CreateStringWME(attr, value)
+
+    ### Internal Methods
+
+    def _reset_wm_maps(self):
+        self.ids = {}               # recorded identifier symbol -> live Identifier
+        self.created_ids = []       # Identifiers created by the replay, in the order created
+        self.wmes = {}              # handle -> SoarWME
+        self.id_parents = {}        # recorded identifier symbol -> recorded parent symbol
+        self.wme_parents = {}       # handle -> recorded parent symbol
+
+    def _apply_record(self, record):
+        record_type = record[0]
+        if record_type == ADD_RECORD:
+            parent = self.ids.get(record[2])
+            if parent is not None:
+                wme = SoarWME(record[3], record[4])
+                wme.add_to_wm(parent)
+                self.wmes[record[1]] = wme
+                self.wme_parents[record[1]] = record[2]
+        elif record_type == UPDATE_RECORD:
+            wme = self.wmes.get(record[1])
+            if wme is not None:
+                wme.set_value(record[2])
+                wme.update_wm()
+        elif record_type == REMOVE_RECORD:
+            wme = self.wmes.pop(record[1], None)
+            self.wme_parents.pop(record[1], None)
+            if wme is not None:
+                wme.remove_from_wm()
+        elif record_type == ID_RECORD:
+            parent = self.ids.get(record[1])
+            if parent is not None:
+                child = parent.CreateIdWME(record[2])
+                self.ids[record[3]] = child
+                self.id_parents[record[3]] = record[1]
+                self.created_ids.append(child)
+        elif record_type == ID_REMOVE_RECORD:
+            self._remove_identifier(record[1])
+        elif record_type == ROOT_RECORD:
+            self.ids[record[1]] = self.input_link
+        elif record_type == INIT_RECORD:
+            self._clear_wm()
+
+    def _remove_identifier(self, id_sym):
+        """ Destroys a recorded identifier, forgetting the identifiers and wmes under it """
+        live_id = self.ids.get(id_sym)
+        removed = set([ id_sym ])
+        removed.update(descendant_ids(id_sym, self.id_parents))
+        for handle in [ h for h, parent in self.wme_parents.items() if parent in removed ]:
+            wme = self.wmes.pop(handle)
+            del self.wme_parents[handle]
+            # Its wme is destroyed along with the identifier
+            wme.wme = None
+            wme.added = False
+        removed_ids = [ self.ids.pop(sym) for sym in removed if sym in self.ids ]
+        for sym in removed:
+            self.id_parents.pop(sym, None)
+        self.created_ids = [ id for id in self.created_ids if not any(id is r for r in removed_ids) ]
+        if live_id is not None:
+            live_id.DestroyWME()
+
+    def _clear_wm(self):
+        """ Removes everything the replay added to working memory """
+        for wme in self.wmes.values():
+            wme.remove_from_wm()
+        for id in reversed(self.created_ids):
+            id.DestroyWME()
+        self._reset_wm_maps()
+
+    def _report(self, message):
+        if self.check_outputs:
+            self.client.print_handler("REPLAY (cycle {}): {}".format(self.cycle_index, message))
+
+def _child_summary(children):
+    """ A sorted list of the children for comparison (identifier values are compared by attribute only) """
+    return sorted( (attr, "<id>" if is_id else str(value)) for (attr, value, is_id) in children )
@@ -0,0 +1,86 @@
+"""
+Defines a class that watches running SoarClients and reports the ones that exceed a time budget
+"""
+
+from threading import Thread, Event, Lock
+from time import perf_counter
+
+class RunWatchdog:
+    """ Checks a set of SoarClients on a background thread and reports any run that lasts longer than its budget
+
+        A run is a call to client.run_for or client.start (see client.run_start_time).
+        Each run that goes over budget is reported once: it is appended to watchdog.overruns
+            as (agent_name, elapsed_ms, budget_ms), printed through the client's print_handler,
+            and passed to on_overrun(client, elapsed_ms) if given.
+        If stop_agents is True, the agent is also stopped (agent.StopSelf)
+
+        Usage:
+            watchdog = RunWatchdog(budget_ms=200)
+            watchdog.watch(client)
+            client.run_for(wall_ms=150)
+    """
+    def __init__(self, budget_ms, interval_ms=10, stop_agents=False, on_overrun=None):
+        self.budget_ms = float(budget_ms)
+        self.interval = interval_ms / 1000.0
+        self.stop_agents = stop_agents
+        self.on_overrun = on_overrun
+        self.overruns = []
+        self.lock = Lock()
+        self.clients = {}           # client -> [ budget_ms, start time of the last reported run ]
+
+        self.stop_event = None
+        self.thread = None
+
+    def watch(self, client, budget_ms=None):
+        """ Starts watching the client (starts the watchdog thread if it wasn't running)
+            budget_ms overrides the watchdog's budget for this client
+            With stop_agents, the client can't use kernel_thread=current (its kernel can't be called from the watchdog thread) """
+        if self.stop_agents and client.kernel_thread == "current":
+            raise ValueError("RunWatchdog: can't stop agent {} from the watchdog thread (kernel_thread=current)".format(
+                client.agent_name))
+        with self.lock:
+            self.clients[client] = [ self.budget_ms if budget_ms is None else float(budget_ms), None ]
+            if self.thread is None:
+                self.stop_event = Event()
+                self.thread = Thread(target=self._watch_loop, args=(self.stop_event,), name="RunWatchdog")
+                self.thread.daemon = True
+                self.thread.start()
+
+    def unwatch(self, client):
+        """ Stops watching the client (stops the watchdog thread if none are left) """
+        with self.lock:
+            self.clients.pop(client, None)
+            if len(self.clients) == 0 and self.thread is not None:
+                self.stop_event.set()
+                self.stop_event = None
+                self.thread = None
+
+    def check(self):
+        """ Checks every client once, reporting new overruns. Returns the list of (client, elapsed_ms) reported """
+        now = perf_counter()
+        reported = []
+        with self.lock:
+            for client, entry in self.clients.items():
+                start = client.run_start_time
+                if start is None or start == entry[1]:
+                    continue
+                elapsed_ms = (now - start) * 1000.0
+                if elapsed_ms > entry[0]:
+                    entry[1] = start
+                    self.overruns.append( (client.agent_name, elapsed_ms, entry[0]) )
+                    reported.append( (client, elapsed_ms, entry[0]) )
+
+        for client, elapsed_ms, budget_ms in reported:
+            client.print_handler("RunWatchdog: agent {} has run for {:.1f} ms (budget {:.1f} ms)".format(
+                client.agent_name, elapsed_ms, budget_ms))
+            if self.stop_agents and client.agent is not None:
+                client.agent.StopSelf()
+            if self.on_overrun is not None:
+                self.on_overrun(client, elapsed_ms)
+        return [ (client, elapsed_ms) for client, elapsed_ms, budget_ms in reported ]
+
+    ### Internal Methods
+
+    def _watch_loop(self, stop_event):
+        while not stop_event.wait(self.interval):
+            self.check()
@@ -0,0 +1,265 @@
+"""
+Defines a class that bulk loads semantic memory from python data, JSON, or CSV files
+"""
+
+from collections import namedtuple
+import csv
+from decimal import Decimal
+import json
+import math
+import re
+from time import perf_counter
+
+# Progress of one load (one call to load, load_json, load_csv, or load_clauses)
+LoadProgress = namedtuple("LoadProgress", [
+    "clauses",          # number of (@lti ^attr value ...) clauses sent so far
+    "chunks",           # number of smem --add commands sent so far
+    "errors",           # number of smem --add commands that failed
+    "elapsed",          # seconds since the load started
+    "rate",             # clauses per second
+])
+
+class SMemLoader:
+    """ Loads nodes and edges into semantic memory through chunked smem --add commands
+
+        A node is (node_id, attrs), where attrs is a dict of attribute -> constant value (or a list of values)
+        An edge is (src_id, attr, dst_id), linking two nodes
+        Node ids can be any hashable value, they are mapped to LTIs as they are first seen,
+            so edges can refer to nodes added in other chunks (or not added at all).
+            The LTIs start after the largest one already in smem (unless first_lti is given),
+            so a load appended to an existing database doesn't merge with the LTIs already in it
+
+        The clauses are generated lazily and joined into one smem --add command every chunk_size clauses,
+            so the whole load is never held in memory as a string.
+        After every chunk, progress(LoadProgress) is called (if given).
+        The result of each failed command is kept in loader.error_messages (up to max_error_messages)
+
+        Usage:
+            loader = SMemLoader(client, chunk_size=500)
+            loader.load(nodes=[ ("dog", { "name": "dog", "legs": 4 }), ("cat", { "name": "cat" }) ],
+                        edges=[ ("dog", "chases", "cat") ])
+            loader.load_json("animals.jsonl")
+            loader.lti_of("dog")  # -> "@1" (in an empty smem)
+    """
+    def __init__(self, client, chunk_size=500, database=None, append=True, first_lti=None,
+            progress=None, max_error_messages=10):
+        """ client - the SoarClient whose agent gets the knowledge
+            chunk_size - the number of clauses sent in each smem --add command
+            database - if given, smem uses this file as its database instead of memory (see set_database)
+            append - if False (and database is given) the database file is cleared first
+            first_lti - the number of the first LTI assigned to a node id
+                (by default, one more than the largest LTI in smem when the first one is assigned)
+            progress - a function taking a LoadProgress, called after every chunk """
+        self.client = client
+        self.chunk_size = int(chunk_size)
+        self.progress = progress
+        self.max_error_messages = max_error_messages
+
+        self.ltis = dict()              # node id -> lti number
+        self.next_lti = None if first_lti is None else int(first_lti)
+        self.num_clauses = 0
+        self.num_chunks = 0
+        self.num_errors = 0
+        self.error_messages = []
+        self.start_time = None
+        self.load_start_counts = (0, 0, 0)
+
+        if database is not None:
+            self.set_database(database, append)
+
+    def set_database(self, filename, append=True):
+        """ Switches smem to a file-backed database (this reinitializes smem, so do it before loading) """
+        self._execute("smem --set database file")
+        self._execute("smem --set path " + filename)
+        self._execute("smem --set append " + ("on" if append else "off"))
+        self._execute("smem --init")
+
+    def lti_of(self, node_id):
+        """ Returns the LTI (e.g. '@12') the node id is loaded as, assigning a new one if needed """
+        lti = self.ltis.get(node_id)
+        if lti is None:
+            if self.next_lti is None:
+                self.next_lti = self.find_max_lti() + 1
+            lti = self.next_lti
+            self.next_lti += 1
+            self.ltis[node_id] = lti
+        return "@" + str(lti)
+
+    def find_max_lti(self):
+        """ Returns the number of the largest LTI in smem (0 if smem is empty)
+            (reads the smem --print output, so it takes time proportional to the size of smem) """
+        printout = self.client.agent.ExecuteCommandLine("smem --print")
+        # A |string| containing @<n> can only make this larger, which is still safe
+        return max([ int(num) for num in _LTI_PATTERN.findall(printout) ] + [ 0 ])
+
+    def load(self, nodes=(), edges=()):
+        """ Loads the given iterables of nodes and edges (see the class description)
+            Returns a LoadProgress for the whole load """
+        return self.load_clauses(self._clauses(nodes, edges))
+
+    def load_json(self, filename):
+        """ Loads a JSON or JSON Lines (.jsonl) file
+
+            .json: { "nodes": [ { "id": id, attr: value, ... }, ... ], "edges": [ [ src, attr, dst ], ... ] }
+            .jsonl: one object per line, either a node { "id": id, attr: value, ... }
+                    or an edge { "src": src, "attr": attr, "dst": dst } (read one line at a time)
+        """
+        if filename.endswith(".jsonl"):
+            return self.load_clauses(self._jsonl_clauses(filename))
+        with open(filename, "r") as fin:
+            data = json.load(fin)
+        nodes = ( (node["id"], _node_attrs(node)) for node in data.get("nodes", []) )
+        return self.load(nodes, data.get("edges", []))
+
+    def load_csv(self, nodes_filename=None, edges_filename=None, parse_numbers=True):
+        """ Loads CSV files, one row at a time
+
+            nodes_filename: a header row starting with id, then one row per node (empty cells are skipped)
+            edges_filename: rows of src,attr,dst (a header row starting with src is skipped)
+            parse_numbers: if True, cells that look like numbers are loaded as ints/floats
+        """
+        clauses = []
+        if nodes_filename is not None:
+            clauses.append(self._csv_node_clauses(nodes_filename, parse_numbers))
+        if edges_filename is not None:
+            clauses.append(self._csv_edge_clauses(edges_filename))
+        return self.load_clauses(clause for source in clauses for clause in source)
+
+    def load_clauses(self, clauses):
+        """ Sends an iterable of clause strings (e.g. '(@1 ^name dog)') in chunks
+            Returns a LoadProgress for the whole load """
+        self.start_time = perf_counter()
+        self.load_start_counts = (self.num_clauses, self.num_chunks, self.num_errors)
+        chunk = []
+        for clause in clauses:
+            chunk.append(clause)
+            if len(chunk) >= self.chunk_size:
+                self._send_chunk(chunk)
+                chunk = []
+        if len(chunk) > 0:
+            self._send_chunk(chunk)
+
+        return self._get_progress()
+
+    ### Internal Methods
+
+    def _send_chunk(self, chunk):
+        result = self._execute("smem --add {\n" + "\n".join(chunk) + "\n}")
+        self.num_chunks += 1
+        self.num_clauses += len(chunk)
+        if result is not None:
+            self.num_errors += 1
+            if len(self.error_messages) < self.max_error_messages:
+                self.error_messages.append(result)
+
+        if self.progress is not None:
+            self.progress(self._get_progress())
+
+    def _get_progress(self):
+        """ Returns the LoadProgress of the current load """
+        elapsed = perf_counter() - self.start_time
+        start_clauses, start_chunks, start_errors = self.load_start_counts
+        num_clauses = self.num_clauses - start_clauses
+        return LoadProgress(num_clauses, self.num_chunks - start_chunks, self.num_errors - start_errors,
+                elapsed, num_clauses / max(elapsed, 1e-9))
+
+    def _execute(self, cmd):
+        """ Runs the command, returns None if it succeeded or the result if it failed """
+        agent = self.client.agent
+        result = agent.ExecuteCommandLine(cmd)
+        return None if agent.GetLastCommandLineResult() else result
+
+    def _clauses(self, nodes, edges):
+        for node_id, attrs in nodes:
+            clause = self._node_clause(node_id, attrs)
+            if clause is not None:
+                yield clause
+        for src, attr, dst in edges:
+            yield "({} ^{} {})".format(self.lti_of(src), format_smem_value(attr), self.lti_of(dst))
+
+    def _node_clause(self, node_id, attrs):
+        parts = [ "(", self.lti_of(node_id) ]
+        for attr, value in attrs.items():
+            attr = format_smem_value(attr)
+            for val in (value if isinstance(value, (list, tuple)) else (value,)):
+                if val is None:
+                    continue
+                parts.append(" ^" + attr + " " + format_smem_value(val))
+        if len(parts) == 2:
+            return None
+        parts.append(")")
+        return "".join(parts)
+
+    def _jsonl_clauses(self, filename):
+        with open(filename, "r") as fin:
+            for line in fin:
+                line = line.strip()
+                if len(line) == 0:
+                    continue
+                obj = json.loads(line)
+                if "id" in obj:
+                    clause = self._node_clause(obj["id"], _node_attrs(obj))
+                    if clause is not None:
+                        yield clause
+                else:
+                    yield "({} ^{} {})".format(self.lti_of(obj["src"]), format_smem_value(obj["attr"]), self.lti_of(obj["dst"]))
+
+    def _csv_node_clauses(self, filename, parse_numbers):
+        with open(filename, "r", newline="") as fin:
+            reader = csv.reader(fin)
+            header = next(reader, None)
+            if header is None:
+                return
+            attrs = header[1:]
+            for row in reader:
+                if len(row) == 0:
+                    continue
+                values = dict( (attr, _parse_cell(cell, parse_numbers)) for attr, cell in zip(attrs, row[1:]) if cell != "" )
+                clause = self._node_clause(row[0], values)
+                if clause is not None:
+                    yield clause
+
+    def _csv_edge_clauses(self, filename):
+        with open(filename, "r", newline="") as fin:
+            for row in csv.reader(fin):
+                if len(row) < 3 or row[0] == "src":
+                    continue
+                yield "({} ^{} {})".format(self.lti_of(row[0]), format_smem_value(row[1]), self.lti_of(row[2]))
+
+_LTI_PATTERN = re.compile(r"@(\d+)")
+_PLAIN_SYMBOL = re.compile(r"^[a-zA-Z][a-zA-Z0-9\-_*]*$")
+_IDENTIFIER_LIKE = re.compile(r"^[a-zA-Z][0-9]+$")
+
+def format_smem_value(value):
+    """ Returns the value as a soar constant: numbers as is, strings quoted with |'s unless they are plain symbols
+        (strings that look like identifiers, e.g. s1, are quoted too)
+        Floats are written in fixed-point (soar doesn't read 1e-05 as a float), inf and nan raise a ValueError """
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, float):
+        if not math.isfinite(value):
+            raise ValueError("Soar has no constant for the float " + repr(value))
+        # repr's shortest digits, without an exponent (and always with a . so it stays a float)
+        text = format(Decimal(repr(value)), "f")
+        return text if "." in text else text + ".0"
+    value = str(value)
+    if _PLAIN_SYMBOL.match(value) and not _IDENTIFIER_LIKE.match(value):
+        return value
+    return "|" + value.replace("\\", "\\\\").replace("|", "\\|") + "|"
+
+def _node_attrs(obj):
+    return dict( (key, val) for key, val in obj.items() if key != "id" )
+
+def _parse_cell(cell, parse_numbers):
+    if not parse_numbers:
+        return cell
+    try:
+        return int(cell)
+    except ValueError:
+        pass
+    try:
+        return float(cell)
+    except ValueError:
+        return cell
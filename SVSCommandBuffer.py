@@ -0,0 +1,131 @@
+"""
+This module defines a class that collects SVS commands over a cycle and sends them all at once
+"""
+from .SVSCommands import SVSCommands
+
+class _PoseChange:
+    """ A pending change command for one object, later transforms replace earlier ones """
+    __slots__ = ("obj_id", "pos", "rot", "scl")
+
+    def __init__(self, obj_id):
+        self.obj_id = obj_id
+        self.pos = None
+        self.rot = None
+        self.scl = None
+
+    def to_str(self):
+        cmd = "change " + self.obj_id
+        if self.pos is not None: cmd += " p " + _transform_str(self.pos)
+        if self.rot is not None: cmd += " r " + _transform_str(self.rot)
+        if self.scl is not None: cmd += " s " + _transform_str(self.scl)
+        return cmd
+
+class SVSCommandBuffer:
+    """ Collects SVS commands (e.g. during the input phase) so they can be sent in a single SendSVSCommands call
+
+        Successive pos/rot/scale changes to the same object are merged into one change command,
+        and changes to an object that is deleted in the same batch are dropped.
+        All other commands are sent as given, in order.
+
+        A SoarClient has one of these (client.svs_buffer) which it flushes after each input phase
+    """
+    def __init__(self):
+        self.commands = []          # command strings and _PoseChanges, in the order given
+        self.pending_changes = {}   # obj_id -> _PoseChange in commands that can still be merged into
+
+        self.num_received = 0       # number of commands given to the buffer
+        self.num_sent = 0           # number of commands sent after merging
+        self.num_coalesced = 0      # number of change commands merged into an earlier one
+        self.num_dropped = 0        # number of change commands dropped because the object was deleted
+        self.num_flushes = 0
+
+    def has_commands(self):
+        """ Returns True if there are commands waiting to be sent """
+        return len(self.commands) > 0
+
+    def change(self, obj_id, pos=None, rot=None, scl=None):
+        """ Queues a change to the given object's transforms (each a list of 3 numbers) """
+        self.num_received += 1
+        change = self.pending_changes.get(obj_id)
+        if change is None:
+            change = _PoseChange(obj_id)
+            self.pending_changes[obj_id] = change
+            self.commands.append(change)
+        else:
+            self.num_coalesced += 1
+        if pos is not None: change.pos = pos
+        if rot is not None: change.rot = rot
+        if scl is not None: change.scl = scl
+
+    def change_pos(self, obj_id, pos):
+        """ Queues a change to the position of an svs object """
+        self.change(obj_id, pos=pos)
+
+    def change_rot(self, obj_id, rot):
+        """ Queues a change to the rotation of an svs object """
+        self.change(obj_id, rot=rot)
+
+    def change_scl(self, obj_id, scl):
+        """ Queues a change to the scale of an svs object """
+        self.change(obj_id, scl=scl)
+
+    def delete(self, obj_id):
+        """ Queues deleting an object, dropping any changes to it queued in this batch """
+        self.add_command(SVSCommands.delete(obj_id))
+
+    def add_command(self, cmd):
+        """ Queues an svs command string (such as those made by SVSCommands)
+            change and delete commands are merged/dropped just like the methods above """
+        words = cmd.split()
+        if len(words) == 0:
+            return
+        if words[0] == "change" and _is_transform_change(words):
+            transforms = dict( (words[i], words[i+1:i+4]) for i in range(2, len(words), 4) )
+            self.change(words[1], transforms.get("p"), transforms.get("r"), transforms.get("s"))
+            return
+
+        self.num_received += 1
+        if words[0] == "delete" and len(words) > 1:
+            change = self.pending_changes.pop(words[1], None)
+            if change is not None:
+                # Left in the list but skipped when flushing
+                change.obj_id = None
+                self.num_dropped += 1
+        self.commands.append(cmd)
+
+    def add_commands(self, cmds):
+        """ Queues each of the given svs command strings """
+        for cmd in cmds:
+            self.add_command(cmd)
+
+    def flush(self):
+        """ Returns all queued commands as a single string (one per line) and clears the buffer
+            Returns None if there are no commands """
+        cmds = [ (cmd if isinstance(cmd, str) else cmd.to_str()) for cmd in self.commands
+                if isinstance(cmd, str) or cmd.obj_id is not None ]
+        self.commands = []
+        self.pending_changes = {}
+        if len(cmds) == 0:
+            return None
+        self.num_sent += len(cmds)
+        self.num_flushes += 1
+        return "\n".join(cmds)
+
+    def clear(self):
+        """ Discards all queued commands """
+        self.commands = []
+        self.pending_changes = {}
+
+def _is_transform_change(words):
+    """ Returns True if the split command is of the form change <id> (p|r|s x y z)+ """
+    if len(words) < 6 or (len(words) - 2) % 4 != 0:
+        return False
+    return all(words[i] in ("p", "r", "s") for i in range(2, len(words), 4))
+
+def _transform_str(transform):
+    if isinstance(transform, str):
+        return transform
+    if isinstance(transform[0], str):
+        # Already formatted (e.g. from a parsed command string)
+        return " ".join(transform)
+    return SVSCommands.pos_to_str(transform)
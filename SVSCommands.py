@@ -1,12 +1,23 @@
 """
 This module defines a set of methods that generate SVS string commands 
 """
+import math
+
+_BBOX_VERTS = "0.5 0.5 0.5 0.5 0.5 -0.5 0.5 -0.5 0.5 0.5 -0.5 -0.5 -0.5 0.5 0.5 -0.5 0.5 -0.5 -0.5 -0.5 0.5 -0.5 -0.5 -0.5"
+
 class SVSCommands:
     """ Contains static methods that generate SVS string commands
 
     These can then be passed to agent.SendSVSCommands
     Note that all transforms (pos, rot, scale) should be lists of 3 floats
+
+    Geometry (vertex sets) can be registered by name with register_geometry,
+    it is formatted once and then reused by add_object/add_objects ('box' is always registered)
     """
+
+    # name -> vertex string
+    geometries = { "box": _BBOX_VERTS }
+
     @staticmethod
     def pos_to_str(pos):
         """ Returns a string of 3 space-separated position values """
@@ -28,7 +39,35 @@ class SVSCommands:
 
         It is of unit size centered at the origin
         """
-        return "0.5 0.5 0.5 0.5 0.5 -0.5 0.5 -0.5 0.5 0.5 -0.5 -0.5 -0.5 0.5 0.5 -0.5 0.5 -0.5 -0.5 -0.5 0.5 -0.5 -0.5 -0.5"
+        return _BBOX_VERTS
+
+    @staticmethod
+    def cylinder_verts(num_sides=8, radius=0.5, height=1.0):
+        """ Returns a list of vertices (2*num_sides points) forming a cylinder along the z axis centered at the origin """
+        verts = []
+        for i in range(num_sides):
+            angle = 2 * math.pi * i / num_sides
+            x, y = radius * math.cos(angle), radius * math.sin(angle)
+            verts.append( (x, y, height/2) )
+            verts.append( (x, y, -height/2) )
+        return verts
+
+    @staticmethod
+    def register_geometry(name, verts):
+        """ Registers a vertex set under the given name so it can be used by add_object/add_objects
+
+        verts can be a list of points [ (x, y, z), ... ], a flat list of numbers, or an already formatted string
+        It is only formatted once (here)
+        """
+        if not isinstance(verts, str):
+            nums = [ n for v in verts for n in v ] if len(verts) > 0 and hasattr(verts[0], "__len__") else verts
+            verts = " ".join("{:f}".format(n) for n in nums)
+        SVSCommands.geometries[name] = verts
+
+    @staticmethod
+    def get_geometry(name):
+        """ Returns the vertex string registered with the given name (raises KeyError if there is none) """
+        return SVSCommands.geometries[name]
 
     @staticmethod
     def add_node(node_id, pos=None, rot=None, scl=None, parent="world"):
@@ -48,6 +87,33 @@ class SVSCommands:
         if scl: cmd += " s {:s}".format(SVSCommands.scl_to_str(scl))
         return cmd
     
+    @staticmethod
+    def add_object(obj_id, geometry="box", pos=None, rot=None, scl=None, parent="world"):
+        """ Returns an SVS command for adding an object with the registered geometry of the given name """
+        cmd = "add {:s} {:s} v {:s}".format(obj_id, parent, SVSCommands.geometries[geometry])
+        if pos: cmd += " p {:s}".format(SVSCommands.pos_to_str(pos))
+        if rot: cmd += " r {:s}".format(SVSCommands.rot_to_str(rot))
+        if scl: cmd += " s {:s}".format(SVSCommands.scl_to_str(scl))
+        return cmd
+
+    @staticmethod
+    def add_objects(obj_ids, geometry="box", positions=None, rotations=None, scales=None, parent="world"):
+        """ Returns the SVS commands (one per line in a single string) for adding many objects
+            with the same registered geometry
+
+            positions, rotations, and scales are lists (or N x 3 arrays) with one transform per object
+        """
+        template = "add %s " + (parent + " v " + SVSCommands.geometries[geometry]).replace("%", "%%")
+        columns = [ obj_ids ]
+        for cmd, transforms in (("p", positions), ("r", rotations), ("s", scales)):
+            if transforms is not None:
+                template += " " + cmd + " %f %f %f"
+                columns.append(transforms.tolist() if hasattr(transforms, "tolist") else transforms)
+
+        if len(columns) == 1:
+            return "\n".join(template % obj_id for obj_id in obj_ids)
+        return "\n".join(template % ((row[0], ) + tuple(n for t in row[1:] for n in t)) for row in zip(*columns))
+
     @staticmethod
     def change_pos(obj_id, pos):
         """ Returns an SVS command for changing the position of an svs object """
@@ -0,0 +1,244 @@
+"""
+This module defines a python-side mirror of an SVS scene graph,
+which only sends commands for things that actually changed
+
+Requires numpy
+"""
+import numpy as np
+
+from .SVSCommands import SVSCommands
+from .SVSCommandBuffer import SVSCommandBuffer
+
+_TRANSFORM_CMDS = ("p", "r", "s")
+
+class SVSScene:
+    """ Mirrors the nodes in an SVS scene (ids, parents, poses, tags, and geometry)
+
+        Changes are given to the scene instead of being sent directly,
+        and it only queues svs commands for objects that differ from what was last sent.
+        Poses can be updated in bulk with numpy arrays, and are compared in one vectorized pass
+        using per-component tolerances.
+
+        Commands are queued on an SVSCommandBuffer, give it client.svs_buffer
+        to have them sent automatically after each input phase
+    """
+    def __init__(self, buffer=None, pos_tol=1e-4, rot_tol=1e-4, scl_tol=1e-4):
+        """ buffer is the SVSCommandBuffer to queue commands on (if None, creates a new one)
+            pos_tol, rot_tol, scl_tol are the amount a component must change by before it is sent
+                (either a single number or a list of 3, one for each of x, y, z) """
+        self.buffer = buffer if buffer is not None else SVSCommandBuffer()
+        self.tolerance = np.concatenate([ np.broadcast_to(np.asarray(tol, dtype=float), (3,))
+            for tol in (pos_tol, rot_tol, scl_tol) ])
+
+        self.ids = []               # row -> obj_id
+        self.rows = {}              # obj_id -> row in poses
+        self.poses = np.zeros((16, 9))   # each row is [ pos, rot, scl ] as last sent
+        self.parents = {}           # obj_id -> parent id
+        self.children = {}          # parent id -> set of child ids
+        self.geometry = {}          # obj_id -> vertex string (None for nodes without geometry)
+        self.tags = {}              # obj_id -> { tag_name: tag_value }
+
+        self.num_skipped = 0        # number of object updates that did not need a command
+
+    def has_object(self, obj_id):
+        """ Returns True if the scene contains the given object """
+        return obj_id in self.rows
+
+    def get_pose(self, obj_id):
+        """ Returns (pos, rot, scl) for the given object as last sent to svs """
+        pose = self.poses[self.rows[obj_id]]
+        return (pose[0:3].copy(), pose[3:6].copy(), pose[6:9].copy())
+
+    def add_node(self, node_id, pos=None, rot=None, scl=None, parent="world"):
+        """ Adds a graph node without geometry (if it already exists, only changes to it are sent) """
+        self._add(node_id, parent, None, pos, rot, scl)
+
+    def add_box(self, obj_id, pos=None, rot=None, scl=None, parent="world"):
+        """ Adds a bounding box object (if it already exists, only changes to it are sent) """
+        self._add(obj_id, parent, SVSCommands.bbox_verts(), pos, rot, scl)
+
+    def add_object(self, obj_id, geometry="box", pos=None, rot=None, scl=None, parent="world"):
+        """ Adds an object using geometry registered with SVSCommands.register_geometry
+            (if it already exists, only changes to it are sent) """
+        self._add(obj_id, parent, SVSCommands.get_geometry(geometry), pos, rot, scl)
+
+    def add_objects(self, obj_ids, geometry="box", positions=None, rotations=None, scales=None, parent="world"):
+        """ Adds many objects with the same registered geometry (transforms are N x 3 arrays or None)
+            The commands for new objects are built in a single SVSCommands.add_objects call """
+        verts = SVSCommands.get_geometry(geometry)
+        n = len(obj_ids)
+        poses = np.zeros((n, 9))
+        poses[:, 6:9] = 1.0
+        for i, transform in enumerate((positions, rotations, scales)):
+            if transform is not None:
+                poses[:, 3*i:3*i+3] = np.asarray(transform, dtype=float).reshape(-1, 3)
+
+        new_objs = [ i for i, obj_id in enumerate(obj_ids) if obj_id not in self.rows ]
+        new_ids = [ obj_ids[i] for i in new_objs ]
+        if len(new_objs) < n:
+            for i, obj_id in enumerate(obj_ids):
+                if obj_id in self.rows:
+                    self._add(obj_id, parent, verts, *[ (None if t is None else poses[i, 3*j:3*j+3]) 
+                            for j, t in enumerate((positions, rotations, scales)) ])
+        if len(new_ids) == 0:
+            return
+
+        new_poses = poses[new_objs]
+        self.buffer.add_command(SVSCommands.add_objects(new_ids, geometry,
+                *[ (None if t is None else new_poses[:, 3*j:3*j+3]) for j, t in enumerate((positions, rotations, scales)) ],
+                parent=parent))
+
+        first_row = len(self.ids)
+        while first_row + len(new_ids) > len(self.poses):
+            self.poses = np.concatenate([ self.poses, np.zeros(self.poses.shape) ])
+        self.poses[first_row:first_row+len(new_ids)] = new_poses
+        children = self.children.setdefault(parent, set())
+        for i, obj_id in enumerate(new_ids):
+            self.ids.append(obj_id)
+            self.rows[obj_id] = first_row + i
+            self.parents[obj_id] = parent
+            self.geometry[obj_id] = verts
+            children.add(obj_id)
+
+    def delete(self, obj_id):
+        """ Deletes the object (and its descendants) from the scene, does nothing if it isn't there """
+        if obj_id not in self.rows:
+            self.num_skipped += 1
+            return
+        self.buffer.delete(obj_id)
+
+        # SVS also deletes the descendants
+        self.children[self.parents[obj_id]].discard(obj_id)
+        removed = [ obj_id ]
+        while len(removed) > 0:
+            rem_id = removed.pop()
+            removed.extend(self.children.pop(rem_id, ()))
+            self._remove_row(rem_id)
+            del self.parents[rem_id]
+            del self.geometry[rem_id]
+            self.tags.pop(rem_id, None)
+
+    def change_pos(self, obj_id, pos):
+        """ Changes the position of an object if it differs from the last one sent """
+        self.update_poses([ obj_id ], pos=[ pos ])
+
+    def change_rot(self, obj_id, rot):
+        """ Changes the rotation of an object if it differs from the last one sent """
+        self.update_poses([ obj_id ], rot=[ rot ])
+
+    def change_scl(self, obj_id, scl):
+        """ Changes the scale of an object if it differs from the last one sent """
+        self.update_poses([ obj_id ], scl=[ scl ])
+
+    def update_poses(self, obj_ids, pos=None, rot=None, scl=None):
+        """ Updates the poses of many objects at once, only sending commands for the ones that changed
+
+        :param obj_ids: A list of N object ids (all must already be in the scene)
+        :param pos: An N x 3 array of positions (or None to leave them unchanged)
+        :param rot: An N x 3 array of rotations (or None)
+        :param scl: An N x 3 array of scales (or None)
+        """
+        if len(obj_ids) == 0:
+            return
+        rows = np.fromiter((self.rows[obj_id] for obj_id in obj_ids), dtype=np.intp, count=len(obj_ids))
+        new_poses = self.poses[rows]
+        for i, transform in enumerate((pos, rot, scl)):
+            if transform is not None:
+                new_poses[:, 3*i:3*i+3] = np.asarray(transform, dtype=float).reshape(-1, 3)
+
+        # Which transforms (N x 3) of which objects changed by more than the tolerance
+        changed = (np.abs(new_poses - self.poses[rows]) > self.tolerance).reshape(-1, 3, 3).any(axis=2)
+        changed_objs = np.flatnonzero(changed.any(axis=1))
+        self.num_skipped += len(obj_ids) - len(changed_objs)
+        if len(changed_objs) == 0:
+            return
+
+        # Only transforms that were sent are saved, so small drifts add up until they pass the tolerance
+        mask = np.repeat(changed[changed_objs], 3, axis=1)
+        changed_rows = rows[changed_objs]
+        self.poses[changed_rows] = np.where(mask, new_poses[changed_objs], self.poses[changed_rows])
+
+        strs = np.char.mod("%f", new_poses[changed_objs])
+        for i, obj in enumerate(changed_objs):
+            transforms = [ " ".join(strs[i, 3*t:3*t+3]) if changed[obj, t] else None for t in range(3) ]
+            self.buffer.change(obj_ids[obj], *transforms)
+
+    def add_tag(self, obj_id, tag_name, tag_value):
+        """ Sets a tag on the object (^name value), only sending a command if it is new or different """
+        self.set_tag(obj_id, tag_name, tag_value)
+
+    def change_tag(self, obj_id, tag_name, tag_value):
+        """ Sets a tag on the object (^name value), only sending a command if it is new or different """
+        self.set_tag(obj_id, tag_name, tag_value)
+
+    def set_tag(self, obj_id, tag_name, tag_value):
+        """ Sets a tag on the object (^name value), only sending a command if it is new or different """
+        tags = self.tags.setdefault(obj_id, {})
+        cur_value = tags.get(tag_name)
+        if cur_value == tag_value:
+            self.num_skipped += 1
+            return
+        if cur_value is None:
+            self.buffer.add_command(SVSCommands.add_tag(obj_id, tag_name, tag_value))
+        else:
+            self.buffer.add_command(SVSCommands.change_tag(obj_id, tag_name, tag_value))
+        tags[tag_name] = tag_value
+
+    def delete_tag(self, obj_id, tag_name):
+        """ Deletes a tag from the object, if it has it """
+        tags = self.tags.get(obj_id, {})
+        if tag_name not in tags:
+            self.num_skipped += 1
+            return
+        self.buffer.add_command(SVSCommands.delete_tag(obj_id, tag_name))
+        del tags[tag_name]
+
+    def clear(self):
+        """ Forgets everything in the mirror (without sending any commands), e.g. after init-soar """
+        self.ids = []
+        self.rows = {}
+        self.parents = {}
+        self.children = {}
+        self.geometry = {}
+        self.tags = {}
+
+    ### Internal Methods
+
+    def _add(self, obj_id, parent, verts, pos, rot, scl):
+        if obj_id in self.rows:
+            if self.parents[obj_id] == parent and self.geometry[obj_id] == verts:
+                # Already exists, just send any changes to the pose
+                self.update_poses([ obj_id ], pos=(None if pos is None else [ pos ]),
+                        rot=(None if rot is None else [ rot ]), scl=(None if scl is None else [ scl ]))
+                return
+            self.delete(obj_id)
+
+        cmd = "add " + obj_id + " " + parent
+        if verts is not None:
+            cmd += " v " + verts
+
+        pose = np.array([ 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 1.0, 1.0, 1.0 ])
+        for i, transform in enumerate((pos, rot, scl)):
+            if transform is not None:
+                pose[3*i:3*i+3] = transform
+                cmd += " " + _TRANSFORM_CMDS[i] + " " + SVSCommands.pos_to_str(pose[3*i:3*i+3])
+        self.buffer.add_command(cmd)
+
+        row = len(self.ids)
+        if row == len(self.poses):
+            self.poses = np.concatenate([ self.poses, np.zeros(self.poses.shape) ])
+        self.poses[row] = pose
+        self.ids.append(obj_id)
+        self.rows[obj_id] = row
+        self.parents[obj_id] = parent
+        self.children.setdefault(parent, set()).add(obj_id)
+        self.geometry[obj_id] = verts
+
+    def _remove_row(self, obj_id):
+        """ Removes the object's row by moving the last row into its place """
+        row = self.rows.pop(obj_id)
+        last_id = self.ids.pop()
+        if last_id != obj_id:
+            self.poses[row] = self.poses[len(self.ids)]
+            self.ids[row] = last_id
+            self.rows[last_id] = row
@@ -0,0 +1,138 @@
+"""
+Defines an AgentConnector that puts frames from a shared memory region (written by another process) on the input-link
+"""
+
+import time
+
+from .AgentConnector import AgentConnector
+from .SoarWME import SoarWME
+from .util.shared_frame import SharedFrameReader
+
+class SharedMemoryConnector(AgentConnector):
+    """ Reads the latest frame from a shared memory region each input phase and puts it on the input-link
+
+        The region has a FrameLayout and is written by a SharedMemoryFeed (e.g. in a simulator process),
+            which publishes frames without locks (see util.shared_frame).
+        The values are read straight out of the shared region (nothing is unpickled or copied as bytes),
+            only when a new frame has been published, and only changed values are updated in working memory.
+
+        The input-link will look like (for a layout [ ("x", "d"), ("ranges", "f", 3) ]):
+            (<il> ^sensors <s>)
+            (<s> ^frame <n> ^x <x> ^ranges <r>)
+            (<r> ^v0 <r0> ^v1 <r1> ^v2 <r2>)
+
+        Stats: num_frames (frames put on the input-link), num_skipped_frames (published but never read),
+            num_failed_reads (no consistent frame after max_retries), and last_latency_ms
+            (from when the frame was published to when it was put on the input-link)
+
+        Usage:
+            layout = FrameLayout([ ("x", "d"), ("y", "d"), ("ranges", "f", 360) ])
+            client.add_connector("sensors", SharedMemoryConnector(client, layout, name="robot-sensors"))
+    """
+    def __init__(self, client, layout, name=None, filename=None, root_name="sensors", max_retries=100):
+        """ layout - the FrameLayout of the region
+            name - the name of the multiprocessing SharedMemory block (or filename for a memory-mapped file)
+            root_name - the attribute of the identifier on the input-link """
+        AgentConnector.__init__(self, client)
+        self.layout = layout
+        self.reader = SharedFrameReader(layout, name, filename)
+        self.root_name = root_name
+        self.max_retries = max_retries
+
+        self.root_id = None
+        self.array_ids = []
+        self.frame_wme = SoarWME("frame", 0)
+        self.wmes = []              # for each field, a SoarWME (or a list of them for an array)
+        for (field_name, fmt, count, offset) in layout.fields:
+            # The wme type (int or float) is fixed when it is created, so start with the right one
+            zero = 0.0 if fmt in "efd" else 0
+            if count == 1:
+                self.wmes.append(SoarWME(field_name, zero))
+            else:
+                self.wmes.append([ SoarWME("v" + str(i), zero) for i in range(count) ])
+        self.values = None
+
+        self.last_frame = None
+        self.num_frames = 0
+        self.num_skipped_frames = 0
+        self.num_failed_reads = 0
+        self.last_latency_ms = None
+
+    def close(self):
+        """ Releases the shared memory region """
+        self.reader.close()
+
+    def on_init_soar(self):
+        self._remove_from_wm()
+        self.last_frame = None
+
+    def on_input_phase(self, input_link):
+        frame = self.reader.frame_number()
+        if frame == 0 or frame == self.last_frame:
+            return
+
+        result = self.reader.read(self._read_values, self.max_retries)
+        if result is None:
+            self.num_failed_reads += 1
+            return
+        frame, publish_time = result
+        if self.last_frame is not None and frame > self.last_frame + 1:
+            self.num_skipped_frames += frame - self.last_frame - 1
+        self.last_frame = frame
+
+        self.frame_wme.set_value(frame)
+        for wme, value in zip(self.wmes, self.values):
+            if isinstance(wme, list):
+                for item_wme, item in zip(wme, value):
+                    item_wme.set_value(item)
+            else:
+                wme.set_value(value)
+
+        if self.root_id is None:
+            self._add_to_wm(input_link)
+        else:
+            self._update_wm()
+        self.num_frames += 1
+        self.last_latency_ms = (time.monotonic_ns() - publish_time) / 1e6
+
+    ### Internal methods
+
+    def _read_values(self, views):
+        # Called by the reader, views are memoryviews into the shared region
+        self.values = [ view[0] if count == 1 else view.tolist()
+                for view, (name, fmt, count, offset) in zip(views, self.layout.fields) ]
+
+    def _add_to_wm(self, parent_id):
+        self.root_id = parent_id.CreateIdWME(self.root_name)
+        self.frame_wme.add_to_wm(self.root_id)
+        self.array_ids = []
+        for wme, (field_name, fmt, count, offset) in zip(self.wmes, self.layout.fields):
+            if isinstance(wme, list):
+                array_id = self.root_id.CreateIdWME(field_name)
+                self.array_ids.append(array_id)
+                for item_wme in wme:
+                    item_wme.add_to_wm(array_id)
+            else:
+                wme.add_to_wm(self.root_id)
+
+    def _update_wm(self):
+        self.frame_wme.update_wm()
+        for wme in self.wmes:
+            if isinstance(wme, list):
+                for item_wme in wme:
+                    item_wme.update_wm()
+            else:
+                wme.update_wm()
+
+    def _remove_from_wm(self):
+        if self.root_id is None:
+            return
+        self.frame_wme.remove_from_wm()
+        for wme in self.wmes:
+            for item_wme in (wme if isinstance(wme, list) else (wme, )):
+                item_wme.remove_from_wm()
+        for array_id in self.array_ids:
+            array_id.DestroyWME()
+        self.array_ids = []
+        self.root_id.DestroyWME()
+        self.root_id = None
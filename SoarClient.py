@@ -1,12 +1,31 @@
 from __future__ import print_function
 
+from collections import namedtuple
 from threading import Thread
+import re
 import traceback
-from time import sleep
+from time import sleep, perf_counter
 
 import Python_sml_ClientInterface as sml
+from .IdentifierExtensions import extend_identifier_class
 from .SoarWME import SoarWME
+from .WMInterface import set_listening_client
 from .TimeConnector import TimeConnector
+from .SVSCommandBuffer import SVSCommandBuffer
+from .KernelConnectionManager import KernelConnectionManager
+from .AgentMetrics import AgentMetrics
+from .MetricsExporter import MetricsExporter
+from .RealtimePacer import RealtimePacer
+from .OutputLinkCollector import OutputLinkCollector
+from .util.PrintoutCache import PrintoutCache
+from .util.parse_source_output import parse_source_output
+from .util.source_report import SourceReport, source_by_file, iter_lines
+
+# Add the helper methods to sml.Identifier now that SML is loaded
+extend_identifier_class()
+
+# The result of SoarClient.run_for, reason is one of decisions|wall_time|until|stopped
+RunSummary = namedtuple("RunSummary", [ "decisions", "elapsed_ms", "reason" ])
 
 class SoarClient():
     """ A wrapper class for creating and using a soar SML Agent """
@@ -21,6 +40,7 @@ class SoarClient():
 
         agent_name = [string] (default=soaragent)
             Name to give the SML Agent when it is created
+            (With a remote connection, the name of the agent to use, if not given uses the first agent)
 
         agent_source = [filename] (default=None)
             Soar file to source when the agent is created
@@ -31,6 +51,11 @@ class SoarClient():
         source_output = full|summary|none (default=summary)
             Determines how much output is printed when sourcing files
 
+        source_by_file = true|false (default=false)
+            If false, agent_source is sourced with a single source command (client.source_report has the production count of each file).
+            If true, it is sourced one file at a time (following its source commands),
+            so client.source_report also has the time, productions, and warnings of each file
+
         watch_level = [int] (default=1)
             The watch level to use (controls amount of info printed, 0=none, 5=all)
 
@@ -43,6 +68,15 @@ class SoarClient():
         write_to_stdout = true|false (default=false)
             If true, will print all soar output to the given print_handler (default is python print)
 
+        print_sample_every = [int] (default=1)
+            Only every Nth soar print message is handled (printed, logged, and passed to print event handlers)
+
+        print_filter = [regex] (default=None)
+            If given, only soar print messages matching this pattern are handled
+
+        Note: The print event is only registered with the kernel while something consumes it
+            (write_to_stdout, enable_log, or a print event handler), so otherwise printing costs nothing
+
         enable_log = true|false
             If true, will write all soar output to a file given by log_filename
 
@@ -52,9 +86,47 @@ class SoarClient():
         remote_connection = true|false (default=false)
             If true, will connect to a remote kernel instead of creating a new one
 
+        remote_host = [string] (default=localhost)
+            The host of the kernel to connect to when using a remote connection
+
+        remote_port = [int] (default=12121, the sml default port)
+            The port of the kernel to connect to when using a remote connection
+
+        kernel_thread = new|current (default=new)
+            new: the kernel runs in its own thread (CreateKernelInNewThread)
+            current: the kernel runs in whichever thread calls it (CreateKernelInCurrentThread),
+                so step/run_for and every event handler run on the caller's thread with no thread handoff
+                (a spawned debugger is only serviced while the agent is running)
+                start() still runs the agent on a thread it spawns, so don't call step/run_for until it stops.
+                Nothing else may call the kernel from another thread, so the metrics settings
+                (sampled on a background thread) can't be used with it, use a StatsSampler instead
+
+        connection_manager = [KernelConnectionManager] (kwarg only)
+            The manager that remote connections are shared through and reconnected by
+            (defaults to KernelConnectionManager.get_default())
+
         use_time_connector = true|false (default=false)
             If true, will create a TimeConnector to add time info the the input-link
             See the Readme or TimeConnector.py for additional settings to control its behavior
+
+        output_gc_cycles = [int] (default=None)
+            If given, commands handled by a connector are removed from the output-link
+            this many decision cycles after they get a ^status (see OutputLinkCollector)
+
+        metrics_port = [int] (default=None)
+            If given, serves the client's metrics in the Prometheus text format at http://127.0.0.1:port/metrics
+
+        metrics_file = [filename] (default=None)
+            If given, periodically writes the client's metrics (Prometheus text format) to the file
+
+        metrics_interval = [float] (default=5.0)
+            How often (in seconds) the metrics are sampled from soar's stats and published
+
+        realtime_hz = [float] (default=None)
+            If given, start() runs the agent at this many decision cycles per second (see RealtimePacer)
+
+        realtime_overrun = catchup|skip (default=catchup)
+            When a cycle takes longer than the period, whether to run the late cycles back to back or skip them
         
         Note: Still need to call connect() to register event handlers
         """
@@ -63,8 +135,13 @@ class SoarClient():
         if print_handler == None:
             self.print_handler = print
         self.print_event_handlers = []
+        self.output_listeners = []
+        self.wm_listeners = []
 
         self.connectors = {}
+        self.current_connector = None   # the connector whose input/output handler is running
+        self.printout_cache = PrintoutCache(self)
+        self.svs_buffer = SVSCommandBuffer()
 
         # Gather settings, filling in defaults as needed
         self.kwarg_keys = set(kwargs.keys())
@@ -76,21 +153,47 @@ class SoarClient():
         self.connected = False
         self.is_running = False
         self.queue_stop = False
+        self.run_start_time = None      # perf_counter time the current run started (None if not running)
+        self.run_limits = None          # (deadline, until) for the current run_for
+        self.run_stop_reason = None
+        self.pacer = None
+        if self.realtime_hz is not None:
+            self.pacer = RealtimePacer(self, float(self.realtime_hz), self.realtime_overrun)
 
         self.run_event_callback_id = -1
         self.print_event_callback_id = -1
+        self.print_event_count = 0
         self.init_agent_callback_id = -1
+        self.source_report = None       # SourceReport of sourcing agent_source (see util.source_report)
 
         if self.remote_connection:
-            self.kernel = sml.Kernel.CreateRemoteConnection()
+            self.kernel = self.connection_manager.acquire(self, self.remote_host, self.remote_port)
         else:
-            self.kernel = sml.Kernel.CreateKernelInNewThread()
+            if self.kernel_thread == "current":
+                self.kernel = sml.Kernel.CreateKernelInCurrentThread(True)
+            else:
+                self.kernel = sml.Kernel.CreateKernelInNewThread()
             self.kernel.SetAutoCommit(False)
 
         if self.use_time_connector:
             self.add_connector("time", TimeConnector(self, **self.settings))
+        if self.output_gc_cycles is not None:
+            self.add_connector("output_gc", OutputLinkCollector(self, int(self.output_gc_cycles)))
         self._create_soar_agent()
 
+        self.metrics = None
+        self.metrics_exporter = None
+        if self.metrics_port is not None or self.metrics_file is not None:
+            self.metrics = AgentMetrics(self)
+            exporter = MetricsExporter.get_shared(self.metrics_port, self.metrics_file, self.metrics_interval)
+            try:
+                exporter.add(self.metrics)
+            except:
+                # e.g. the port is in use, so don't leave the agent and kernel behind
+                self.kill()
+                raise
+            self.metrics_exporter = exporter
+
     def add_connector(self, name, connector):
         """ Adds an AgentConnector to the agent """
         self.connectors[name] = connector
@@ -107,25 +210,130 @@ class SoarClient():
         """ calls the given handler during each soar print event, 
             where handler is a method taking a single string argument """
         self.print_event_handlers.append(handler)
+        self._update_print_event_registration()
+
+    def remove_print_event_handler(self, handler):
+        """ Removes a handler added by add_print_event_handler """
+        self.print_event_handlers = [ h for h in self.print_event_handlers if h is not handler ]
+        self._update_print_event_registration()
+
+    def set_write_to_stdout(self, write_to_stdout):
+        """ Turns printing soar output to the print_handler on or off """
+        self.write_to_stdout = write_to_stdout
+        self._update_print_event_registration()
+
+    def add_output_listener(self, listener):
+        """ Adds a listener that is notified around every output command handled by a connector
+
+            listener should have the methods before_output_event(command_name, root_id, wme)
+            and after_output_event(command_name, root_id, wme) """
+        self.output_listeners.append(listener)
+
+    def remove_output_listener(self, listener):
+        """ Removes a listener added by add_output_listener """
+        self.output_listeners = [ l for l in self.output_listeners if l is not listener ]
+
+    def add_wm_listener(self, listener):
+        """ Adds a listener that is notified of every change made to this agent's working memory
+                through a SoarWME, and of every identifier added with CreateIdWME or removed with DestroyWME
+
+            listener should have the methods wme_added(soar_wme, parent_id), wme_updated(soar_wme),
+                wme_removed(soar_wme), wme_unchanged(soar_wme) (set_value was given the value it already had),
+                identifier_added(parent_id, attr, child_id), and identifier_removed(identifier) """
+        self.wm_listeners = self.wm_listeners + [ listener ]
+        self._update_wm_listener_registration()
+
+    def remove_wm_listener(self, listener):
+        """ Removes a listener added by add_wm_listener """
+        self.wm_listeners = [ l for l in self.wm_listeners if l is not listener ]
+        self._update_wm_listener_registration()
 
     def start(self):
-        """ Will start the agent (uses another thread, so non-blocking) """
+        """ Will start the agent (uses another thread, so non-blocking, even with kernel_thread=current)
+            If realtime_hz is set, the agent runs at that rate (see RealtimePacer) """
         if self.is_running:
             return
 
         self.is_running = True
+        if self.pacer is not None:
+            self.pacer.start()
+            return
         thread = Thread(target = SoarClient._run_thread, args = (self, ))
         thread.start()
 
+    def run_for(self, decisions=None, wall_ms=None, until=None):
+        """ Runs the agent in this thread (blocking) until one of the given limits is reached,
+            and returns a RunSummary(decisions, elapsed_ms, reason)
+
+        :param decisions: The maximum number of decision cycles to run
+        :param wall_ms: The maximum wall-clock time to run, checked after every phase
+        :param until: A function taking the client, checked after every output phase,
+            the agent stops once it returns True (e.g. when a command is on the output-link)
+
+        The agent is stopped through the kernel (StopSelf), so it stops at the end of the current phase
+        If no limits are given, runs until the agent stops itself (or stop() is called)
+        """
+        if self.is_running:
+            raise RuntimeError("The agent is already running")
+
+        callback_id = -1
+        if wall_ms is not None or until is not None:
+            deadline = None if wall_ms is None else perf_counter() + wall_ms / 1000.0
+            self.run_limits = (deadline, until)
+            callback_id = self.agent.RegisterForRunEvent(
+                    sml.smlEVENT_AFTER_PHASE_EXECUTED, SoarClient._run_limit_handler, self)
+
+        self.is_running = True
+        self.run_stop_reason = None
+        start_dc = self.agent.GetDecisionCycleCounter()
+        self.run_start_time = perf_counter()
+        try:
+            if decisions is not None:
+                self.agent.RunSelf(int(decisions))
+            else:
+                self.agent.RunSelfForever()
+        finally:
+            elapsed_ms = (perf_counter() - self.run_start_time) * 1000.0
+            self.run_start_time = None
+            self.is_running = False
+            self.run_limits = None
+            if callback_id != -1:
+                self.agent.UnregisterForRunEvent(callback_id)
+
+        num_decisions = self.agent.GetDecisionCycleCounter() - start_dc
+        reason = self.run_stop_reason
+        if reason is None:
+            reason = "decisions" if decisions is not None and num_decisions >= decisions else "stopped"
+        return RunSummary(num_decisions, elapsed_ms, reason)
+
+    def step(self, num_decisions=1):
+        """ Runs the agent for the given number of decision cycles in this thread (blocking)
+            (With kernel_thread=current this has no thread handoffs, see also run_for) """
+        if self.is_running:
+            raise RuntimeError("The agent is already running")
+        self.is_running = True
+        self.run_start_time = perf_counter()
+        try:
+            self.agent.RunSelf(num_decisions)
+        finally:
+            self.run_start_time = None
+            self.is_running = False
+
     def stop(self):
         """ Tell the running thread to stop
         
         Note: Non-blocking, agent may run for a bit after this call finishes"""
+        if self.pacer is not None and self.pacer.is_running():
+            self.pacer.stop()
+            return
         self.queue_stop = True
 
     def execute_command(self, cmd, print_res=False):
         """ Execute a soar command and return result, 
             write output to print_handler if print_res is True """
+        if cmd.split(None, 1)[:1] not in (["p"], ["print"]):
+            # The command might change working memory
+            self.printout_cache.clear()
         result = self.agent.ExecuteCommandLine(cmd).strip()
         if print_res:
             self.print_handler(cmd)
@@ -140,9 +348,6 @@ class SoarClient():
         self.run_event_callback_id = self.agent.RegisterForRunEvent(
             sml.smlEVENT_BEFORE_INPUT_PHASE, SoarClient._run_event_handler, self)
 
-        self.print_event_callback_id = self.agent.RegisterForPrintEvent(
-                sml.smlEVENT_PRINT, SoarClient._print_event_handler, self)
-
         self.init_agent_callback_id = self.kernel.RegisterForAgentEvent(
                 sml.smlEVENT_BEFORE_AGENT_REINITIALIZED, SoarClient._init_agent_handler, self)
 
@@ -150,6 +355,7 @@ class SoarClient():
             connector.connect()
 
         self.connected = True
+        self._update_print_event_registration()
 
         if self.start_running:
             self.start()
@@ -166,6 +372,7 @@ class SoarClient():
         if self.print_event_callback_id != -1:
             self.agent.UnregisterForPrintEvent(self.print_event_callback_id)
             self.print_event_callback_id = -1
+        self.print_event_count = 0
 
         if self.init_agent_callback_id != -1:
             self.kernel.UnregisterForAgentEvent(self.init_agent_callback_id)
@@ -184,8 +391,17 @@ class SoarClient():
 
     def kill(self):
         """ Will destroy the current agent + kernel, cleans up everything """
+        if self.pacer is not None:
+            self.pacer.stop()
+        if self.metrics_exporter is not None:
+            self.metrics_exporter.remove(self.metrics)
+            self.metrics_exporter = None
         self._destroy_soar_agent()
-        self.kernel.Shutdown()
+        if self.remote_connection:
+            # Other clients may be sharing the connection
+            self.connection_manager.release(self)
+        else:
+            self.kernel.Shutdown()
         self.kernel = None
 
 #### Internal Methods
@@ -218,14 +434,37 @@ class SoarClient():
         self.smem_source = self.settings.get("smem_source", None)
 
         self.source_output = self.settings.get("source_output", "summary")
+        self.source_by_file = self._parse_bool_setting("source_by_file", False)
         self.watch_level = int(self.settings.get("watch_level", 1))
         self.remote_connection = self._parse_bool_setting("remote_connection", False)
+        self.remote_host = self.settings.get("remote_host", None)
+        self.remote_port = self.settings.get("remote_port", None)
+        self.kernel_thread = self.settings.get("kernel_thread", "new")
+        if self.kernel_thread not in ("new", "current"):
+            raise ValueError("SoarClient: kernel_thread must be new or current, not " + str(self.kernel_thread))
+        self.remote_agent_name = self.settings.get("agent_name", None)
+        self.connection_manager = self.settings.get("connection_manager", None)
+        if self.remote_connection and self.connection_manager is None:
+            self.connection_manager = KernelConnectionManager.get_default()
         self.spawn_debugger = self._parse_bool_setting("spawn_debugger", False)
         self.start_running = self._parse_bool_setting("start_running", False)
         self.write_to_stdout = self._parse_bool_setting("write_to_stdout", False)
         self.enable_log = self._parse_bool_setting("enable_log", False)
         self.log_filename = self.settings.get("log_filename", "agent-log.txt")
         self.use_time_connector = self._parse_bool_setting("use_time_connector", False)
+        self.output_gc_cycles = self.settings.get("output_gc_cycles", None)
+        self.metrics_port = self.settings.get("metrics_port", None)
+        self.metrics_file = self.settings.get("metrics_file", None)
+        self.metrics_interval = float(self.settings.get("metrics_interval", 5.0))
+        if self.kernel_thread == "current" and (self.metrics_port is not None or self.metrics_file is not None):
+            raise ValueError("SoarClient: metrics_port/metrics_file sample soar on a background thread, " +
+                    "so they can't be used with kernel_thread=current (use a StatsSampler)")
+        self.print_sample_every = int(self.settings.get("print_sample_every", 1))
+        self.print_filter = self.settings.get("print_filter", None)
+        if isinstance(self.print_filter, str):
+            self.print_filter = re.compile(self.print_filter)
+        self.realtime_hz = self.settings.get("realtime_hz", None)
+        self.realtime_overrun = self.settings.get("realtime_overrun", "catchup")
 
     def _parse_bool_setting(self, name, default):
         if name not in self.settings:
@@ -236,7 +475,9 @@ class SoarClient():
         return val
 
     def _run_thread(self):
+        self.run_start_time = perf_counter()
         self.agent.ExecuteCommandLine("run")
+        self.run_start_time = None
         self.is_running = False
 
     def _create_soar_agent(self):
@@ -248,7 +489,9 @@ class SoarClient():
                 self.print_handler("ERROR: Cannot open log file " + self.log_filename)
 
         if self.remote_connection:
-            self.agent = self.kernel.GetAgentByIndex(0)
+            self.agent = self.connection_manager.get_agent(self.kernel, self.remote_agent_name)
+            if self.agent is None:
+                raise RuntimeError("No agent named {} on the remote kernel".format(self.remote_agent_name))
         else:
             self.agent = self.kernel.CreateAgent(self.agent_name)
             self._source_agent()
@@ -259,6 +502,7 @@ class SoarClient():
         self.agent.ExecuteCommandLine("w " + str(self.watch_level))
 
     def _source_agent(self):
+        self.source_report = None
         self.agent.ExecuteCommandLine("smem --set database memory")
         self.agent.ExecuteCommandLine("epmem --set database memory")
 
@@ -274,44 +518,90 @@ class SoarClient():
         if self.agent_source != None:
             if self.source_output != "none":
                 self.print_handler("--------- SOURCING PRODUCTIONS ------------")
-            result = self.agent.ExecuteCommandLine("source " + self.agent_source + " -v")
-            if self.source_output == "full":
-                self.print_handler(result)
-            elif self.source_output == "summary":
-                self._summarize_source(result)
+            if self.source_by_file:
+                self._source_agent_by_file()
+            else:
+                # -a lists each file sourced (used to find which file a production came from, see ProductionProfiler)
+                start = perf_counter()
+                result = self.agent.ExecuteCommandLine("source " + self.agent_source + " -v -a")
+                self.source_report = SourceReport.from_summary(parse_source_output(result), (perf_counter() - start) * 1000.0)
+                if self.source_output == "full":
+                    self.print_handler(result)
+                elif self.source_output == "summary":
+                    self._summarize_source(result)
         else:
             self.print_handler("agent_source not specified, no rules are being sourced")
 
+    def _source_agent_by_file(self):
+        """ Sources agent_source one file at a time (source_by_file = true), printing each command's output as it comes """
+        on_output = None
+        if self.source_output == "full":
+            on_output = lambda filename, output: self.print_handler(output)
+        elif self.source_output == "summary":
+            on_output = lambda filename, output: self._summarize_source(output)
+        report = source_by_file(self.agent, self.agent_source, on_output)
+        self.source_report = report
+
+        if self.source_output == "full":
+            self.print_handler(report.format())
+        elif self.source_output == "summary":
+            self.print_handler("Total: {} productions sourced. {} productions excised. ({} files in {:.1f} ms)".format(
+                report.num_productions, report.num_excised, len(report.files), report.time_ms))
+        if report.error is not None:
+            self.print_handler("ERROR: Sourcing stopped at " + report.error)
+
     # Prints a summary of the smem source command instead of every line (source_output = summary)
     def _summarize_smem_source(self, printout):
-        summary = []
         n_added = 0
-        for line in printout.split('\n'):
+        for line in iter_lines(printout):
             if line == "Knowledge added to semantic memory.":
                 n_added += 1
-            else:
-                summary.append(line)
-        self.print_handler('\n'.join(summary))
+            elif len(line) > 0:
+                self.print_handler(line)
         self.print_handler("Knowledge added to semantic memory. [" + str(n_added) + " times]")
 
     # Prints a summary of the agent source command instead of every line (source_output = summary)
+    #   (goes through the output a line at a time, printing the lines that are kept as it finds them)
     def _summarize_source(self, printout):
-        summary = []
-        for line in printout.split('\n'):
+        for line in iter_lines(printout):
             if line.startswith("Sourcing"):
                 continue
             if line.startswith("warnings is now"):
                 continue
+            # The per-file counts from source -a (the total is still printed)
+            if line.endswith("sourced.") and not line.startswith("Total:"):
+                continue
             # Line is only * or # characters
             if all(c in "#* " for c in line):
                 continue
-            summary.append(line)
-        self.print_handler('\n'.join(summary))
+            self.print_handler(line)
 
     def _on_init_soar(self):
+        self.printout_cache.clear()
+        self.svs_buffer.clear()
         for connector in self.connectors.values():
             connector.on_init_soar()
 
+    def _on_connection_lost(self):
+        """ Called by the KernelConnectionManager when the remote kernel can no longer be reached """
+        self.reconnect_handlers = self.connected
+        self.is_running = False
+        self._on_init_soar()
+        self.disconnect()
+        self.agent = None
+
+    def _on_reconnected(self, kernel):
+        """ Called by the KernelConnectionManager once the remote kernel can be reached again
+            Returns False if the agent isn't on the kernel yet """
+        self.kernel = kernel
+        self.agent = self.connection_manager.get_agent(kernel, self.remote_agent_name)
+        if self.agent is None:
+            return False
+        self.agent.ExecuteCommandLine("w " + str(self.watch_level))
+        if self.reconnect_handlers:
+            self.connect()
+        return True
+
     def _destroy_soar_agent(self):
         self.stop()
         while self.is_running:
@@ -320,6 +610,7 @@ class SoarClient():
         self.disconnect()
         if self.spawn_debugger:
             self.agent.KillDebugger()
+        set_listening_client(self.agent, None)
         if not self.remote_connection:
             self.kernel.DestroyAgent(self.agent)
         self.agent = None
@@ -340,15 +631,48 @@ class SoarClient():
         if eventID == sml.smlEVENT_BEFORE_INPUT_PHASE:
             self._on_input_phase(agent.GetInputLink())
 
+    @staticmethod
+    def _run_limit_handler(eventID, self, agent, phase):
+        try:
+            if self.run_limits is None or self.run_stop_reason is not None:
+                return
+            deadline, until = self.run_limits
+            if deadline is not None and perf_counter() >= deadline:
+                self.run_stop_reason = "wall_time"
+            elif until is not None and phase == sml.sml_OUTPUT_PHASE and until(self):
+                self.run_stop_reason = "until"
+            else:
+                return
+            self.agent.StopSelf()
+        except:
+            self.print_handler("ERROR IN RUN LIMIT HANDLER")
+            self.print_handler(traceback.format_exc())
+
     def _on_input_phase(self, input_link):
         try:
+            self.printout_cache.clear()
             if self.queue_stop:
                 self.agent.StopSelf()
                 self.queue_stop = False
 
 
-            for connector in self.connectors.values():
-                connector.on_input_phase(input_link)
+            if self.metrics is None:
+                for connector in self.connectors.values():
+                    self.current_connector = connector
+                    connector.on_input_phase(input_link)
+            else:
+                self.metrics.num_input_phases += 1
+                for name, connector in self.connectors.items():
+                    self.current_connector = connector
+                    start = perf_counter()
+                    connector.on_input_phase(input_link)
+                    self.metrics.add_connector_time(name, perf_counter() - start)
+            self.current_connector = None
+
+            if self.svs_buffer.has_commands():
+                svs_commands = self.svs_buffer.flush()
+                if svs_commands is not None:
+                    self.agent.SendSVSCommands(svs_commands)
 
             if self.agent.IsCommitRequired():
                 self.agent.Commit()
@@ -357,9 +681,32 @@ class SoarClient():
             self.print_handler(traceback.format_exc())
 
 
+    def _update_wm_listener_registration(self):
+        """ Only routes this agent's wm changes to the client while it has wm listeners """
+        if self.agent is not None:
+            set_listening_client(self.agent, self if len(self.wm_listeners) > 0 else None)
+
+    def _update_print_event_registration(self):
+        """ Registers for the print event if connected and anything uses the messages, otherwise unregisters """
+        needed = self.connected and (self.write_to_stdout or self.log_writer is not None or len(self.print_event_handlers) > 0)
+        if needed and self.print_event_callback_id == -1:
+            self.print_event_callback_id = self.agent.RegisterForPrintEvent(
+                    sml.smlEVENT_PRINT, SoarClient._print_event_handler, self)
+        elif not needed and self.print_event_callback_id != -1:
+            self.agent.UnregisterForPrintEvent(self.print_event_callback_id)
+            self.print_event_callback_id = -1
+
     @staticmethod
     def _print_event_handler(eventID, self, agent, message):
         try:
+            # Sampling and filtering happen before anything else touches the message
+            if self.print_sample_every > 1:
+                self.print_event_count += 1
+                if self.print_event_count % self.print_sample_every != 0:
+                    return
+            if self.print_filter is not None and self.print_filter.search(message) is None:
+                return
+
             if self.write_to_stdout:
                 message = message.strip()
                 self.print_handler(message)
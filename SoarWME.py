@@ -3,7 +3,7 @@ This module defines a utility class called SoarWME
 which wraps SML code for adding/removing Soar Working Memory Elements (WME)
 """
 
-from .WMInterface import WMInterface
+from .WMInterface import WMInterface, get_wm_listeners
 
 class SoarWME(WMInterface):
     """ Wrapper for a single Soar Working Memory Element with a primitive value
@@ -54,6 +54,9 @@ class SoarWME(WMInterface):
         if self.val != newval:
             self.val = newval
             self.changed = True
+        elif self.wme is not None:
+            for listener in get_wm_listeners(self.wme):
+                listener.wme_unchanged(self)
     
     def __str__(self):
         return str(self.val)
@@ -73,15 +76,21 @@ class SoarWME(WMInterface):
     def _add_to_wm_impl(self, parent_id):
         """ Creates a wme in soar's working memory rooted at the given parent_id """
         self.wme = self.create_wme(parent_id, self.att, self.val)
+        for listener in get_wm_listeners(parent_id):
+            listener.wme_added(self, parent_id)
 
     def _update_wm_impl(self):
         """ If the value has changed, will update soar's working memory with the new value """
         if self.changed:
             self.wme.Update(self.val)
             self.changed = False
+            for listener in get_wm_listeners(self.wme):
+                listener.wme_updated(self)
 
     def _remove_from_wm_impl(self):
         """ Will remove the wme from soar's working memory """
+        for listener in get_wm_listeners(self.wme):
+            listener.wme_removed(self)
         self.wme.DestroyWME()
         self.wme = None
 
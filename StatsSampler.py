@@ -0,0 +1,93 @@
+"""
+Defines an AgentConnector that periodically records soar's statistics while the agent runs
+"""
+
+from collections import deque, namedtuple
+import json
+import time
+
+from .AgentConnector import AgentConnector
+from .util.parse_soar_stats import parse_stats, parse_memory_stats, parse_smem_stats, parse_epmem_stats
+
+StatsSample = namedtuple("StatsSample", [
+    "cycle",            # decision cycle the sample was taken at
+    "time",             # unix time the sample was taken at
+    "stats",            # SoarStats
+    "memory_pools",     # list of MemoryPool (None if memory stats are off)
+    "smem",             # SMemStats (None if smem stats are off)
+    "epmem",            # EpMemStats (None if epmem stats are off)
+])
+
+class StatsSampler(AgentConnector):
+    """ Samples soar's stats every N decision cycles without stopping the agent
+
+        Each sample is a StatsSample with the parsed output of stats (and optionally stats -m,
+            smem --stats/--timers, and epmem --stats/--timers).
+        The most recent samples are kept in a ring buffer (sampler.samples),
+            and if a filename is given every sample is also appended to it as a line of JSON
+
+        Usage:
+            sampler = StatsSampler(client, every=1000, memory=True, filename="stats.jsonl")
+            client.add_connector("stats", sampler)
+    """
+    def __init__(self, client, every=100, history=1000, filename=None, memory=True, smem=False, epmem=False, timers=False):
+        """ every - the number of decision cycles between samples
+            history - the number of samples kept in memory
+            filename - if given, each sample is appended to this file as json
+            memory - if True, includes the memory pools (stats -m)
+            smem/epmem - if True, includes the smem/epmem stats
+            timers - if True, also includes the smem/epmem timers (the timers must be enabled in soar) """
+        AgentConnector.__init__(self, client)
+        self.every = int(every)
+        self.samples = deque(maxlen=int(history))
+        self.filename = filename
+        self.include_memory = memory
+        self.include_smem = smem
+        self.include_epmem = epmem
+        self.include_timers = timers
+        self.cycles_since_sample = 0
+
+    def latest(self):
+        """ Returns the most recent StatsSample (or None) """
+        return self.samples[-1] if len(self.samples) > 0 else None
+
+    def on_input_phase(self, input_link):
+        self.cycles_since_sample += 1
+        if self.cycles_since_sample >= self.every:
+            self.cycles_since_sample = 0
+            self.sample()
+
+    def sample(self):
+        """ Takes a sample now, adding it to samples (and the file) and returning it """
+        agent = self.client.agent
+        memory_pools = smem = epmem = None
+        if self.include_memory:
+            memory_pools = parse_memory_stats(agent.ExecuteCommandLine("stats -m"))
+        if self.include_smem:
+            smem = parse_smem_stats(agent.ExecuteCommandLine("smem --stats"),
+                    agent.ExecuteCommandLine("smem --timers") if self.include_timers else None)
+        if self.include_epmem:
+            epmem = parse_epmem_stats(agent.ExecuteCommandLine("epmem --stats"),
+                    agent.ExecuteCommandLine("epmem --timers") if self.include_timers else None)
+        sample = StatsSample(cycle=agent.GetDecisionCycleCounter(), time=time.time(),
+                stats=parse_stats(agent.ExecuteCommandLine("stats")),
+                memory_pools=memory_pools, smem=smem, epmem=epmem)
+
+        self.samples.append(sample)
+        if self.filename is not None:
+            with open(self.filename, "a") as fout:
+                fout.write(json.dumps(sample_to_dict(sample)))
+                fout.write("\n")
+        return sample
+
+def sample_to_dict(sample):
+    """ Returns the StatsSample as a json-friendly dict (memory pools are given as { name: total_bytes }) """
+    return {
+        "cycle": sample.cycle,
+        "time": sample.time,
+        "stats": sample.stats._asdict(),
+        "memory_pools": None if sample.memory_pools is None else
+            dict( (pool.name, pool.total_bytes) for pool in sample.memory_pools ),
+        "smem": None if sample.smem is None else sample.smem._asdict(),
+        "epmem": None if sample.epmem is None else sample.epmem._asdict(),
+    }
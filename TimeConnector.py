@@ -1,10 +1,15 @@
 
+from collections import namedtuple
 import time
 import datetime
 current_time_ms = lambda: int(round(time.time() * 1000))
 
 from .AgentConnector import AgentConnector
 from .SoarWME import SoarWME
+from .CommandSchema import CommandSchema, CommandSchemaError
+
+SetTimeCommand = namedtuple("SetTimeCommand", [ "hour", "minute", "second" ])
+SET_TIME_SCHEMA = CommandSchema(SetTimeCommand, { "hour": int, "minute": int, "second": int }, defaults={ "minute": 0, "second": 0 })
 
 class TimeConnector(AgentConnector):
     """ An agent connector that will maintain time info on the input-link 
@@ -33,6 +38,9 @@ class TimeConnector(AgentConnector):
             clock_step_ms: int [default=5000]
                 If using the simulated clock, this is the number of milliseconds it will increase every DC
 
+        If the client is running with a RealtimePacer (realtime_hz), the elapsed time and real-time clock
+            use the time each cycle was scheduled for, so they advance in exact steps of the period
+
     """
     def __init__(self, client, clock_include_ms=True, sim_clock=False, clock_step_ms=50, **kwargs):
         """ Initializes the connector with the time info
@@ -54,7 +62,7 @@ class TimeConnector(AgentConnector):
         self.steps = SoarWME("steps", 0)     # number of decision cycles the agent has taken
 
         # Output Link Command: (<out> ^set-time <st>) (<st> ^hour <h> ^minute <min> ^second <sec>)
-        self.add_output_command("set-time")
+        self.add_output_command("set-time", SET_TIME_SCHEMA)
 
         # Clock info, hour minute second millisecond
         self.clock_id = None
@@ -81,14 +89,24 @@ class TimeConnector(AgentConnector):
                 # Hours
                 self.clock_info[0] = self.clock_info[0] % 24
 
-    def update_clock(self):
-        """ Updates the clock with the real time """
-        localtime = time.localtime()
+    def update_clock(self, now_ms=None):
+        """ Updates the clock with the real time (or the given unix time in ms) """
+        if now_ms is None:
+            now_ms = current_time_ms()
+        localtime = time.localtime(now_ms // 1000)
         self.clock_info[0] = localtime.tm_hour
         self.clock_info[1] = localtime.tm_min
         self.clock_info[2] = localtime.tm_sec
-        self.clock_info[3] = current_time_ms() % 1000
-        self.clock_info[4] = int(time.time())
+        self.clock_info[3] = now_ms % 1000
+        self.clock_info[4] = now_ms // 1000
+
+    def get_time_ms(self):
+        """ Returns the current unix time in ms, 
+            if the client is running with a RealtimePacer this is the time the current cycle was scheduled for """
+        pacer = getattr(self.client, "pacer", None)
+        if pacer is not None and pacer.is_running():
+            return int(round(pacer.clock_ms()))
+        return current_time_ms()
 
     def reset_time(self):
         """ Resets the time info """
@@ -115,15 +133,16 @@ class TimeConnector(AgentConnector):
 
     def on_input_phase(self, input_link):
         # Update the global timers (time since agent start)
-        self.milsecs.set_value(int(current_time_ms() - self.start_time))
-        self.seconds.set_value(int((current_time_ms() - self.start_time)/1000))
+        now_ms = self.get_time_ms()
+        self.milsecs.set_value(int(now_ms - self.start_time))
+        self.seconds.set_value(int((now_ms - self.start_time)/1000))
         self.steps.set_value(self.steps.get_value() + 1)
 
         # Update the clock, either real-time or simulated
         if self.sim_clock:
             self.advance_clock(self.clock_step_ms)
         else:
-            self.update_clock()
+            self.update_clock(now_ms)
 
         # Update working memory
         if self.time_id is None:
@@ -131,15 +150,21 @@ class TimeConnector(AgentConnector):
         else:
             self._update_wm()
 
-    def on_output_event(self, command_name, root_id):
+    def on_output_event(self, command_name, root_id, command=None):
         if command_name == "set-time":
-            self.process_set_time_command(root_id)
+            self.process_set_time_command(root_id, command)
     
-    def process_set_time_command(self, time_id):
-        h = time_id.GetChildInt('hour')
-        m = time_id.GetChildInt('minute')
-        s = time_id.GetChildInt('second')
-        self.set_time(h, m, s)
+    def process_set_time_command(self, time_id, command=None):
+        """ Sets the clock from a set-time command, command is the SetTimeCommand
+            (if not given, it is decoded from time_id with SET_TIME_SCHEMA) """
+        if command is None:
+            try:
+                command = SET_TIME_SCHEMA.decode(time_id)
+            except CommandSchemaError as e:
+                time_id.CreateStringWME('status', 'error')
+                time_id.CreateStringWME('message', str(e))
+                return
+        self.set_time(command.hour, command.minute, command.second)
         time_id.CreateStringWME('status', 'complete')
 
     ### Internal methods
@@ -0,0 +1,182 @@
+"""
+Defines a class that counts how often each connector and input-link path changes working memory
+"""
+
+import traceback
+
+import Python_sml_ClientInterface as sml
+
+from .AgentConnector import AgentConnector
+from .util.walk_identifiers import walk_identifiers
+
+ADDS = 0
+UPDATES = 1
+REMOVES = 2
+NOOPS = 3
+
+class WMChurnTracker(AgentConnector):
+    """ Counts the working memory changes made through SoarWME's, to find inputs that cause needless rematching
+
+        Every add, update, remove, and no-op set_value (setting the value it already had)
+            is counted by connector (the one whose handler was running, see client.current_connector)
+            and by attribute path (e.g. 'time.clock.second', relative to the input-link).
+        Counts are kept both for the last decision cycle and cumulatively.
+        Only the client's own agent is tracked (it is a wm listener of the client, see SoarClient.add_wm_listener),
+            and identifiers removed with DestroyWME are counted as removes of their path.
+        A cycle is everything from the end of one input phase to the end of the next.
+
+        Usage:
+            tracker = WMChurnTracker(client)
+            client.add_connector("churn", tracker)
+            ... run the agent ...
+            print(tracker.report())
+    """
+    def __init__(self, client):
+        AgentConnector.__init__(self, client)
+        self.run_event_callback_id = -1
+        self.reset()
+
+    def reset(self):
+        """ Clears all the counts """
+        self.paths = {}                 # SoarWME -> attribute path
+        self.id_paths = {}              # identifier symbol -> path
+        self.cycle_counts = {}          # (connector name, path) -> [ adds, updates, removes, noops ] for the current cycle
+        self.last_cycle_counts = {}     # the cycle_counts of the last complete cycle
+        self.total_counts = {}          # (connector name, path) -> [ adds, updates, removes, noops ] since the start
+        self.num_cycles = 0
+
+    def connect(self):
+        if self.connected:
+            return
+        AgentConnector.connect(self)
+        self.client.add_wm_listener(self)
+        self.run_event_callback_id = self.client.agent.RegisterForRunEvent(
+                sml.smlEVENT_AFTER_INPUT_PHASE, WMChurnTracker._run_event_handler, self)
+
+    def disconnect(self):
+        if not self.connected:
+            return
+        self.client.remove_wm_listener(self)
+        if self.run_event_callback_id != -1:
+            self.client.agent.UnregisterForRunEvent(self.run_event_callback_id)
+            self.run_event_callback_id = -1
+        AgentConnector.disconnect(self)
+
+    def on_init_soar(self):
+        # Identifier symbols can be reused after an init-soar
+        self.paths = {}
+        self.id_paths = {}
+
+    def top_churners(self, n=10, by="path", last_cycle=False):
+        """ Returns the n entries with the most changes (adds + updates + removes)
+
+        :param by: 'path', 'connector', or 'both' (group the counts by path, connector, or (connector, path))
+        :param last_cycle: If True, uses the counts from the last cycle instead of the totals
+        Returns a list of (key, [ adds, updates, removes, noops ]) sorted from most changes to least
+        """
+        counts = self.last_cycle_counts if last_cycle else self.total_counts
+        grouped = dict()
+        for (connector, path), key_counts in counts.items():
+            key = path if by == "path" else (connector if by == "connector" else (connector, path))
+            group = grouped.get(key)
+            if group is None:
+                grouped[key] = list(key_counts)
+            else:
+                for i in range(4):
+                    group[i] += key_counts[i]
+        entries = sorted(grouped.items(), key=lambda entry: entry[1][ADDS] + entry[1][UPDATES] + entry[1][REMOVES], reverse=True)
+        return entries[:n]
+
+    def report(self, n=10):
+        """ Returns a printable table of the top churners by connector and by path """
+        cycles = max(self.num_cycles, 1)
+        lines = [ "WM churn over {} cycles (per cycle averages)".format(self.num_cycles) ]
+        for by in ("connector", "path"):
+            lines.append("{:40s} {:>10s} {:>10s} {:>10s} {:>10s}".format("by " + by, "adds", "updates", "removes", "no-ops"))
+            for key, counts in self.top_churners(n, by):
+                lines.append("{:40s} {:10.2f} {:10.2f} {:10.2f} {:10.2f}".format(str(key), *[ c / float(cycles) for c in counts ]))
+        return "\n".join(lines)
+
+    ### WMInterface listener methods
+
+    def wme_added(self, soar_wme, parent_id):
+        parent_path = self._get_id_path(parent_id.GetIdentifierSymbol())
+        path = soar_wme.att if parent_path == "" else parent_path + "." + soar_wme.att
+        self.paths[soar_wme] = path
+        self._count(path, ADDS)
+
+    def wme_updated(self, soar_wme):
+        self._count(self._get_path(soar_wme), UPDATES)
+
+    def wme_removed(self, soar_wme):
+        self._count(self.paths.pop(soar_wme, None) or ("?." + soar_wme.att), REMOVES)
+
+    def wme_unchanged(self, soar_wme):
+        self._count(self._get_path(soar_wme), NOOPS)
+
+    def identifier_added(self, parent_id, attr, child_id):
+        # Saves walking the input-link for the path later
+        parent_path = self.id_paths.get(parent_id.GetIdentifierSymbol())
+        if parent_path is not None and parent_path != "?":
+            self.id_paths[child_id.GetIdentifierSymbol()] = attr if parent_path == "" else parent_path + "." + attr
+
+    def identifier_removed(self, identifier):
+        path = self.id_paths.pop(identifier.GetIdentifierSymbol(), None)
+        if path is None:
+            return
+        self._count(path, REMOVES)
+        # The symbols under it may be reused for other structures
+        prefix = path + "."
+        self.id_paths = dict( (sym, p) for sym, p in self.id_paths.items() if not p.startswith(prefix) )
+
+    ### Internal Methods
+
+    @staticmethod
+    def _run_event_handler(eventID, self, agent, phase):
+        try:
+            for key, counts in self.cycle_counts.items():
+                total = self.total_counts.get(key)
+                if total is None:
+                    self.total_counts[key] = list(counts)
+                else:
+                    for i in range(4):
+                        total[i] += counts[i]
+            self.last_cycle_counts = self.cycle_counts
+            self.cycle_counts = {}
+            self.num_cycles += 1
+        except:
+            self.client.print_handler("ERROR IN WM CHURN TRACKER")
+            self.client.print_handler(traceback.format_exc())
+
+    def _count(self, path, index):
+        key = (self._get_connector_name(), path)
+        counts = self.cycle_counts.get(key)
+        if counts is None:
+            counts = [ 0, 0, 0, 0 ]
+            self.cycle_counts[key] = counts
+        counts[index] += 1
+
+    def _get_connector_name(self):
+        connector = self.client.current_connector
+        if connector is None:
+            return None
+        for name, client_connector in self.client.connectors.items():
+            if client_connector is connector:
+                return name
+        return type(connector).__name__
+
+    def _get_path(self, soar_wme):
+        path = self.paths.get(soar_wme)
+        return path if path is not None else "?." + soar_wme.att
+
+    def _get_id_path(self, id_sym):
+        """ Returns the path of the identifier from the input-link (or '?' if it isn't on the input-link) """
+        path = self.id_paths.get(id_sym)
+        if path is not None:
+            return path
+        input_link = self.client.agent.GetInputLink()
+        self.id_paths = { input_link.GetIdentifierSymbol(): "" }
+        for (parent_sym, attr, child) in walk_identifiers(input_link):
+            parent_path = self.id_paths[parent_sym]
+            self.id_paths[child.GetIdentifierSymbol()] = attr if parent_path == "" else parent_path + "." + attr
+        return self.id_paths.setdefault(id_sym, "?")
@@ -3,6 +3,8 @@ This module defines a utility interface called WMInterface
 which defines a standard interface for adding and removing things from working memory
 """
 
+import weakref
+
 class WMInterface(object):
     """ An interface standardizing how to add/remove items from working memory """
 
@@ -51,3 +53,28 @@ class WMInterface(object):
         """ Method to implement in derived class - remove from working memory """
         pass
 
+
+# The clients that have wm listeners (see SoarClient.add_wm_listener), by the address of their sml Agent,
+#   so a wme can find the listeners of the agent it belongs to (and only those)
+_listening_clients = weakref.WeakValueDictionary()
+
+def set_listening_client(agent, client):
+    """ Sends the changes to the agent's working memory to client.wm_listeners (or stops if client is None) """
+    key = _agent_key(agent)
+    if client is None:
+        _listening_clients.pop(key, None)
+    else:
+        _listening_clients[key] = client
+
+def get_wm_listeners(element):
+    """ Returns the wm listeners of the client whose agent the sml wme or Identifier belongs to
+        (an empty tuple if that client has none) """
+    if len(_listening_clients) == 0 or element is None:
+        return ()
+    client = _listening_clients.get(_agent_key(element.GetAgent()))
+    return client.wm_listeners if client is not None else ()
+
+def _agent_key(agent):
+    # SML returns a new python object for the same Agent each time, so they are compared by address
+    this = getattr(agent, "this", None)
+    return int(this) if this is not None else id(agent)
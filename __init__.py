@@ -3,34 +3,64 @@
 Depends on the Python_sml_ClientInterface, so make sure that SOAR_HOME is on the PYTHONPATH
 
 SoarClient and AgentConnector are used to create an agent
+CommandSchema decodes an output command's arguments into a typed record
 WMInterface is a standardized interface for adding/removing structures from working memory
 SoarWME is a wrapper for creating working memory elements
 SVSCommands will generate svs command strings for some common use cases
+SVSCommandBuffer collects svs commands over a cycle and sends them together
+SMemLoader bulk loads semantic memory from python data, JSON, or CSV files
+RealtimePacer runs the agent at a fixed rate of decision cycles
+RunWatchdog reports agents whose runs go over a time budget (see SoarClient.run_for)
+KernelConnectionManager shares (and reconnects) remote kernel connections between clients
+AgentMetrics and MetricsExporter publish runtime metrics in the Prometheus text format
+StatsSampler records soar's stats every N decision cycles
+ProductionProfiler finds the productions whose firings or match cost grew between run windows
+WMChurnTracker counts the working memory changes made by each connector and input-link path
+OutputLinkCollector removes finished commands from the output-link
+SharedMemoryConnector puts frames from a shared memory region (written by another process) on the input-link
+MessageBus and MessageBusConnector pass messages between agents in the same process
+EpisodeRecorder and ReplayConnector record the agent's input/output to a log and replay it
 
 Also adds helper methods to the Identifier class to access children more easily
 (See IdentifierExtensions)
 
+Submodules are only imported when one of their names is first used,
+so SML is not loaded until a class that needs it (like SoarClient) is used
+and pysoarlib.util can be used without SML installed
 """
-import Python_sml_ClientInterface as sml
 
-__all__ = ["WMInterface", "SoarWME", "SVSCommands", "AgentConnector", "SoarClient", "TimeConnector"]
-
-# Extend the sml Identifier class definition with additional utility methods
-from .IdentifierExtensions import *
-sml.Identifier.GetChildString = get_child_str
-sml.Identifier.GetChildInt = get_child_int
-sml.Identifier.GetChildFloat = get_child_float
-sml.Identifier.GetChildId = get_child_id
-sml.Identifier.GetAllChildIds = get_all_child_ids
-sml.Identifier.GetAllChildValues = get_all_child_values
-sml.Identifier.GetAllChildWmes = get_all_child_wmes
-sml.Identifier.__lt__ = lambda self, other: self.GetIdentifierSymbol() < other.GetIdentifierSymbol()
-
-from .WMInterface import WMInterface
-from .SoarWME import SoarWME
-from .SVSCommands import SVSCommands
-from .AgentConnector import AgentConnector
-from .SoarClient import SoarClient
-from .TimeConnector import TimeConnector
+__all__ = ["WMInterface", "SoarWME", "SVSCommands", "SVSCommandBuffer", "AgentConnector", "CommandSchema", "SoarClient", "TimeConnector",
+        "SMemLoader", "RealtimePacer", "RunWatchdog", "KernelConnectionManager", "AgentMetrics", "MetricsExporter", "StatsSampler", "WMChurnTracker", "EpisodeRecorder", "ReplayConnector",
+        "MessageBus", "MessageBusConnector", "OutputLinkCollector",
+        "SharedMemoryConnector", "ProductionProfiler"]
 
+from ._lazy import make_lazy
 
+# SVSScene requires numpy, so it can be accessed but is not part of __all__
+__getattr__, __dir__ = make_lazy(__name__, {
+    "WMInterface": ".WMInterface",
+    "SoarWME": ".SoarWME",
+    "SVSCommands": ".SVSCommands",
+    "SVSCommandBuffer": ".SVSCommandBuffer",
+    "SVSScene": ".SVSScene",
+    "AgentConnector": ".AgentConnector",
+    "CommandSchema": ".CommandSchema",
+    "CommandSchemaError": ".CommandSchema",
+    "SoarClient": ".SoarClient",
+    "TimeConnector": ".TimeConnector",
+    "SMemLoader": ".SMemLoader",
+    "RealtimePacer": ".RealtimePacer",
+    "RunWatchdog": ".RunWatchdog",
+    "KernelConnectionManager": ".KernelConnectionManager",
+    "AgentMetrics": ".AgentMetrics",
+    "MetricsExporter": ".MetricsExporter",
+    "StatsSampler": ".StatsSampler",
+    "ProductionProfiler": ".ProductionProfiler",
+    "WMChurnTracker": ".WMChurnTracker",
+    "EpisodeRecorder": ".EpisodeRecorder",
+    "ReplayConnector": ".ReplayConnector",
+    "MessageBus": ".MessageBus",
+    "MessageBusConnector": ".MessageBusConnector",
+    "OutputLinkCollector": ".OutputLinkCollector",
+    "SharedMemoryConnector": ".SharedMemoryConnector",
+})
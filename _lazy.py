@@ -0,0 +1,44 @@
+"""
+Lets a package import its submodules only when one of their names is first used (PEP 562)
+
+This module is not intended to be imported directly, it is used by pysoarlib/__init__.py and util/__init__.py
+"""
+import importlib
+import sys
+import types
+
+class _LazyPackage(types.ModuleType):
+    """ The module type of a lazy package
+
+        Importing a submodule normally sets the package attribute with its name to the submodule,
+        instead it is set to the submodule's member of the same name (e.g. pysoarlib.SoarClient is the class)
+    """
+    def __setattr__(self, name, value):
+        if isinstance(value, types.ModuleType) and name in self._lazy_names \
+                and value.__name__ == self.__name__ + "." + name and hasattr(value, name):
+            value = getattr(value, name)
+        types.ModuleType.__setattr__(self, name, value)
+
+def make_lazy(package_name, lazy_names):
+    """ Makes the package load each name from its submodule the first time it is accessed
+
+    :param package_name: The __name__ of the package
+    :param lazy_names: A dict mapping each name to the relative name of the submodule defining it (e.g. '.SoarWME')
+    Returns the (__getattr__, __dir__) functions to define in the package
+    """
+    package = sys.modules[package_name]
+    types.ModuleType.__setattr__(package, "_lazy_names", lazy_names)
+    package.__class__ = _LazyPackage
+
+    def __getattr__(name):
+        module_name = lazy_names.get(name)
+        if module_name is None:
+            raise AttributeError("module '{}' has no attribute '{}'".format(package_name, name))
+        value = getattr(importlib.import_module(module_name, package_name), name)
+        setattr(package, name, value)
+        return value
+
+    def __dir__():
+        return sorted(set(package.__dict__) | set(lazy_names))
+
+    return __getattr__, __dir__
@@ -0,0 +1,42 @@
+""" Compares decoding an output command with 200 numeric arguments using
+GetChildFloat calls vs a CommandSchema (into a dict, a namedtuple, and a numpy array)
+
+The command is built on the input-link (the Identifier API is the same as on the output-link)
+Run from the directory containing pysoarlib (needs SML and numpy)
+"""
+from collections import namedtuple
+from time import perf_counter
+
+from pysoarlib import SoarClient, CommandSchema
+
+NUM_ARGS = 200
+REPEATS = 200
+
+attrs = [ "p" + str(i) for i in range(NUM_ARGS) ]
+Trajectory = namedtuple("Trajectory", attrs)
+
+client = SoarClient(agent_name="bench", source_output="none", watch_level=0)
+root_id = client.agent.GetInputLink().CreateIdWME("trajectory")
+for i, attr in enumerate(attrs):
+    root_id.CreateFloatWME(attr, i * 0.5)
+client.agent.Commit()
+
+def accessors():
+    return [ root_id.GetChildFloat(attr) for attr in attrs ]
+
+methods = [
+    ("GetChildFloat per argument", accessors),
+    ("CommandSchema -> dict", CommandSchema(dict, [ (attr, float) for attr in attrs ]).decode),
+    ("CommandSchema -> namedtuple", CommandSchema(Trajectory, [ (attr, float) for attr in attrs ]).decode),
+    ("CommandSchema.array -> numpy", CommandSchema.array(attrs).decode),
+]
+for name, method in methods:
+    start = perf_counter()
+    for r in range(REPEATS):
+        if method is accessors:
+            method()
+        else:
+            method(root_id)
+    elapsed = (perf_counter() - start) / REPEATS
+    print("{:32s} {:10.1f} us/command".format(name, elapsed * 1e6))
+client.kill()
@@ -0,0 +1,37 @@
+""" Measures how long it takes to import parts of pysoarlib in a fresh interpreter
+
+Run from the directory containing pysoarlib
+The full import needs SML (Python_sml_ClientInterface) and is skipped if it isn't installed
+"""
+import subprocess
+import sys
+
+REPEATS = 10
+
+STATEMENTS = [
+    ("python startup only", "pass"),
+    ("import pysoarlib", "import pysoarlib"),
+    ("from pysoarlib.util import parse_wm_printout",
+        "from pysoarlib.util import parse_wm_printout, PrintoutIdentifier"),
+    ("from pysoarlib import SoarWME, SVSCommands", "from pysoarlib import SoarWME, SVSCommands"),
+    ("from pysoarlib import * (loads SML)", "from pysoarlib import *"),
+]
+
+def time_import(statement):
+    """ Returns the best time in ms to run the statement in a new interpreter (or None if it fails) """
+    code = "import time; start = time.perf_counter(); {}; print(time.perf_counter() - start)".format(statement)
+    best = None
+    for r in range(REPEATS):
+        result = subprocess.run([ sys.executable, "-c", code ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if result.returncode != 0:
+            return None
+        elapsed = float(result.stdout.decode().strip()) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+for name, statement in STATEMENTS:
+    elapsed = time_import(statement)
+    if elapsed is None:
+        print("{:50s} failed (is SML installed?)".format(name))
+    else:
+        print("{:50s} {:8.2f} ms".format(name, elapsed))
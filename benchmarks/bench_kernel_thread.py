@@ -0,0 +1,37 @@
+""" Compares the latency of short steps (run 1) with the kernel in a new thread vs the current thread
+
+Each decision runs one connector's on_input_phase that updates a wme
+Run from the directory containing pysoarlib (needs SML on the PYTHONPATH)
+"""
+from time import perf_counter
+
+from pysoarlib import SoarClient, AgentConnector, SoarWME
+
+NUM_STEPS = 5000
+
+class CounterConnector(AgentConnector):
+    def __init__(self, client):
+        AgentConnector.__init__(self, client)
+        self.counter = SoarWME("counter", 0)
+
+    def on_input_phase(self, input_link):
+        self.counter.set_value(self.counter.get_value() + 1)
+        self.counter.update_wm(input_link)
+
+def time_steps(client):
+    times = []
+    for i in range(NUM_STEPS):
+        start = perf_counter()
+        client.step(1)
+        times.append(perf_counter() - start)
+    times.sort()
+    return sum(times) / len(times), times[len(times) // 2], times[int(len(times) * 0.99)]
+
+for mode in [ "new", "current" ]:
+    client = SoarClient(agent_name="bench", source_output="none", watch_level=0, kernel_thread=mode)
+    client.add_connector("counter", CounterConnector(client))
+    client.connect()
+    mean, median, p99 = time_steps(client)
+    print("kernel_thread={:8s} step(1): mean {:8.1f} us   median {:8.1f} us   p99 {:8.1f} us".format(
+        mode, mean * 1e6, median * 1e6, p99 * 1e6))
+    client.kill()
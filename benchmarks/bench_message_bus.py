@@ -0,0 +1,88 @@
+""" Measures MessageBus throughput for 100 agents exchanging messages
+
+Each of the 100 connectors sends one direct message to the next agent and one topic message
+    (to 10 subscribers) every cycle, then every connector adds its messages to working memory
+    and consumes them the next cycle.
+To keep the benchmark to one kernel, the connectors share one agent and each uses its own
+    identifier on the input-link, so the time includes creating and removing the message wmes
+Then the agent itself sends messages with ^send-message commands, which go through the output handler
+Run from the directory containing pysoarlib (needs SML on the PYTHONPATH)
+"""
+from time import perf_counter
+
+from pysoarlib import SoarClient, MessageBus, MessageBusConnector
+
+NUM_AGENTS = 100
+NUM_SUBSCRIBERS = 10
+NUM_CYCLES = 200
+PAYLOAD = { "type": "position", "x": 1.5, "y": -2.25, "heading": 90, "tags": [ "moving", "visible" ],
+            "target": { "name": "box", "distance": 3.5 } }
+
+client = SoarClient(agent_name="bench", source_output="none", watch_level=0)
+bus = MessageBus()
+connectors = []
+for i in range(NUM_AGENTS):
+    topics = [ "team" ] if i < NUM_SUBSCRIBERS else []
+    connector = MessageBusConnector(client, bus, name="agent" + str(i), topics=topics)
+    bus.register(connector.name, connector)
+    for topic in topics:
+        bus.subscribe(connector.name, topic)
+    connectors.append(connector)
+
+input_link = client.agent.GetInputLink()
+roots = [ input_link.CreateIdWME("agent" + str(i)) for i in range(NUM_AGENTS) ]
+client.agent.Commit()
+
+send_time = deliver_time = 0.0
+for cycle in range(NUM_CYCLES):
+    start = perf_counter()
+    for i, connector in enumerate(connectors):
+        connector.send(PAYLOAD, to=[ "agent" + str((i + 1) % NUM_AGENTS) ])
+        connector.send(PAYLOAD, topic="team")
+    send_time += perf_counter() - start
+
+    start = perf_counter()
+    for connector, root in zip(connectors, roots):
+        for message_id in list(connector.message_ids.keys()):
+            connector.consume(message_id)
+        connector.on_input_phase(root)
+    client.agent.Commit()
+    deliver_time += perf_counter() - start
+
+print("{} agents, {} cycles: {} messages sent, {} delivered".format(NUM_AGENTS, NUM_CYCLES, bus.num_sent, bus.num_delivered))
+print("send:    {:10.0f} messages/s".format(bus.num_sent / send_time))
+print("deliver: {:10.0f} deliveries/s (including adding/removing the wmes)".format(bus.num_delivered / deliver_time))
+
+# The agent sends a message with ^send-message, and removes the command once it has a ^status
+for rule in [
+    """sp {propose*send
+        (state <s> ^superstate nil ^io.output-link <out>)
+        (<out> -^send-message)
+        -->
+        (<s> ^operator <o> +) (<o> ^name send)}""",
+    """sp {apply*send
+        (state <s> ^operator.name send ^io.output-link <out>)
+        -->
+        (<out> ^send-message <m>) (<m> ^to agent1 ^topic team ^payload hello)}""",
+    """sp {propose*clear
+        (state <s> ^superstate nil ^io.output-link.send-message.status)
+        -->
+        (<s> ^operator <o> +) (<o> ^name clear)}""",
+    """sp {apply*clear
+        (state <s> ^operator.name clear ^io.output-link <out>)
+        (<out> ^send-message <m>)
+        -->
+        (<out> ^send-message <m> -)}""" ]:
+    client.execute_command(rule)
+
+sender = MessageBusConnector(client, bus, name="sender")
+client.add_connector("sender", sender)
+client.connect()
+num_sent = bus.num_sent
+summary = client.run_for(decisions=2 * NUM_CYCLES)
+agent_sent = bus.num_sent - num_sent
+print("agent:   {} ^send-message commands handled in {} decisions ({:.0f} commands/s)".format(
+    agent_sent, summary.decisions, agent_sent / (summary.elapsed_ms / 1000.0)))
+if agent_sent == 0:
+    print("ERROR: no ^send-message command was handled")
+client.kill()
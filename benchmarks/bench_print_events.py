@@ -0,0 +1,30 @@
+""" Measures decision cycles per second with different print event consumers
+
+An agent with no rules (a chain of state no-change impasses) prints a line every decision at watch level 1
+Run from the directory containing pysoarlib (needs SML on the PYTHONPATH)
+"""
+from time import perf_counter
+
+from pysoarlib import SoarClient
+
+NUM_DECISIONS = 20000
+
+CONFIGS = [
+    ("no consumers (print event unregistered)", dict(), False),
+    ("no-op print event handler", dict(), True),
+    ("write_to_stdout to a no-op print_handler", dict(write_to_stdout=True), False),
+    ("write_to_stdout, print_sample_every=100", dict(write_to_stdout=True, print_sample_every=100), False),
+    ("write_to_stdout, print_filter=impasse", dict(write_to_stdout=True, print_filter="impasse"), False),
+]
+
+for name, settings, add_handler in CONFIGS:
+    client = SoarClient(print_handler=lambda message: None, agent_name="bench", source_output="none",
+            watch_level=1, **settings)
+    if add_handler:
+        client.add_print_event_handler(lambda message: None)
+    client.connect()
+    start = perf_counter()
+    client.agent.RunSelf(NUM_DECISIONS)
+    elapsed = perf_counter() - start
+    print("{:45s} {:10.0f} decisions/s".format(name, NUM_DECISIONS / elapsed))
+    client.kill()
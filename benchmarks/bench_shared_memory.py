@@ -0,0 +1,57 @@
+""" Measures the latency from a frame being published by another process to it being on the input-link
+
+A producer process publishes a frame (pose + a 360 value range scan) every PERIOD seconds through a SharedMemoryFeed,
+and the agent runs one decision at a time with a SharedMemoryConnector reading the latest frame each input phase
+Run from the directory containing pysoarlib (needs SML on the PYTHONPATH)
+"""
+import math
+import multiprocessing
+import time
+
+from pysoarlib import SoarClient, SharedMemoryConnector
+from pysoarlib.util import FrameLayout, SharedMemoryFeed
+
+SHM_NAME = "pysoarlib-bench"
+NUM_RANGES = 360
+PERIOD = 0.002
+NUM_FRAMES = 2000
+
+LAYOUT = FrameLayout([ ("x", "d"), ("y", "d"), ("heading", "d"), ("ranges", "f", NUM_RANGES) ])
+
+def produce():
+    feed = SharedMemoryFeed(LAYOUT, name=SHM_NAME, create=False)
+    for i in range(NUM_FRAMES):
+        # Only part of the scan changes each frame, as with a real sensor
+        ranges = [ 5.0 + math.sin((r + i // 10) * 0.1) for r in range(NUM_RANGES) ]
+        feed.publish({ "x": i * 0.01, "y": 2.0, "heading": (i % 360) * 1.0, "ranges": ranges })
+        time.sleep(PERIOD)
+    feed.close()
+
+if __name__ == "__main__":
+    feed = SharedMemoryFeed(LAYOUT, name=SHM_NAME, create=True)
+    client = SoarClient(agent_name="bench", source_output="none", watch_level=0)
+    connector = SharedMemoryConnector(client, LAYOUT, name=SHM_NAME)
+    client.add_connector("sensors", connector)
+    client.connect()
+
+    producer = multiprocessing.Process(target=produce)
+    producer.start()
+    latencies = []
+    last_frames = 0
+    while producer.is_alive():
+        client.step(1)
+        if connector.num_frames != last_frames:
+            last_frames = connector.num_frames
+            latencies.append(connector.last_latency_ms)
+    producer.join()
+
+    latencies.sort()
+    print("{} frames put on the input-link, {} skipped, {} torn reads".format(
+        connector.num_frames, connector.num_skipped_frames, connector.reader.num_torn_reads))
+    print("publish -> input-link latency: median {:.3f} ms   p99 {:.3f} ms   max {:.3f} ms".format(
+        latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)], latencies[-1]))
+
+    client.kill()
+    connector.close()
+    feed.close()
+    feed.unlink()
@@ -0,0 +1,29 @@
+""" Measures the smem load rate of SMemLoader for different chunk sizes
+
+Loads a random graph of NUM_NODES nodes (each with 3 attributes and 2 edges) into a fresh agent for each chunk size
+Run from the directory containing pysoarlib (needs SML on the PYTHONPATH)
+"""
+import random
+
+from pysoarlib import SoarClient, SMemLoader
+
+NUM_NODES = 20000
+CHUNK_SIZES = [ 10, 100, 500, 1000, 5000 ]
+
+def make_nodes():
+    for n in range(NUM_NODES):
+        yield (n, { "name": "node" + str(n), "value": n, "weight": n * 0.5 })
+
+def make_edges(seed=0):
+    rand = random.Random(seed)
+    for n in range(NUM_NODES):
+        for e in range(2):
+            yield (n, "link", rand.randrange(NUM_NODES))
+
+for chunk_size in CHUNK_SIZES:
+    client = SoarClient(agent_name="bench", source_output="none")
+    loader = SMemLoader(client, chunk_size=chunk_size)
+    result = loader.load(make_nodes(), make_edges())
+    print("chunk size {:6d}: {:8d} clauses in {:7.2f} s = {:10.0f} clauses/s  ({} errors)".format(
+        chunk_size, result.clauses, result.elapsed, result.rate, result.errors))
+    client.kill()
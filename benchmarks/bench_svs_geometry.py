@@ -0,0 +1,37 @@
+""" Compares building the svs commands for a 10k-object scene one object at a time vs with add_objects
+
+Run from the directory containing pysoarlib (does not need a kernel)
+"""
+import random
+from time import perf_counter
+
+from pysoarlib import SVSCommands
+
+NUM_OBJECTS = 10000
+
+obj_ids = [ "obj" + str(i) for i in range(NUM_OBJECTS) ]
+positions = [ [ random.uniform(-10, 10) for j in range(3) ] for i in range(NUM_OBJECTS) ]
+scales = [ [ random.uniform(0.1, 2) for j in range(3) ] for i in range(NUM_OBJECTS) ]
+SVSCommands.register_geometry("cylinder", SVSCommands.cylinder_verts(16))
+
+def time_it(name, fn, repeats=5):
+    best = None
+    for r in range(repeats):
+        start = perf_counter()
+        text = fn()
+        elapsed = perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print("{:40s} {:8.2f} ms  ({:d} chars)".format(name, best*1000, len(text)))
+
+time_it("add_box per object", lambda: "\n".join(
+    SVSCommands.add_box(obj_id, pos=pos, scl=scl) for obj_id, pos, scl in zip(obj_ids, positions, scales)))
+time_it("add_objects (box)", lambda: SVSCommands.add_objects(obj_ids, "box", positions=positions, scales=scales))
+time_it("add_objects (16 sided cylinder)", lambda: SVSCommands.add_objects(obj_ids, "cylinder", positions=positions, scales=scales))
+
+try:
+    import numpy as np
+    pos_array = np.array(positions)
+    scl_array = np.array(scales)
+    time_it("add_objects (box, numpy arrays)", lambda: SVSCommands.add_objects(obj_ids, "box", positions=pos_array, scales=scl_array))
+except ImportError:
+    pass
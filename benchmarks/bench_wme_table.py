@@ -0,0 +1,46 @@
+""" Compares update_wm_from_tree with a dict wme_table vs a WMETable on a tree with 10k leaf paths
+
+Run from the directory containing pysoarlib (needs SML on the PYTHONPATH)
+"""
+from time import perf_counter
+
+from pysoarlib import SoarClient
+from pysoarlib.util import update_wm_from_tree, remove_tree_from_wm, WMETable
+
+NUM_OBJECTS = 100
+NUM_ATTRS = 100
+NUM_CYCLES = 20
+
+def make_tree(step):
+    return dict( ("obj" + str(o), dict( ("a" + str(a), (lambda v=o*a+step: v)) for a in range(NUM_ATTRS) ))
+            for o in range(NUM_OBJECTS) )
+
+def time_table(client, wme_table):
+    input_link = client.agent.GetInputLink()
+    update_wm_from_tree(input_link, "objects", make_tree(0), wme_table)
+    client.agent.Commit()
+
+    start = perf_counter()
+    for step in range(NUM_CYCLES):
+        update_wm_from_tree(input_link, "objects", make_tree(step % 2), wme_table)
+        client.agent.Commit()
+    update_time = (perf_counter() - start) / NUM_CYCLES
+
+    start = perf_counter()
+    remove_tree_from_wm(wme_table, "objects.obj0")
+    client.agent.Commit()
+    remove_branch_time = perf_counter() - start
+
+    start = perf_counter()
+    remove_tree_from_wm(wme_table)
+    client.agent.Commit()
+    remove_all_time = perf_counter() - start
+
+    return update_time, remove_branch_time, remove_all_time
+
+client = SoarClient(agent_name="bench", source_output="none")
+for name, table in [ ("dict", dict()), ("WMETable", WMETable()) ]:
+    update_time, branch_time, all_time = time_table(client, table)
+    print("{:10s} update: {:8.2f} ms/cycle   remove branch: {:8.2f} ms   remove all: {:8.2f} ms".format(
+        name, update_time*1000, branch_time*1000, all_time*1000))
+client.kill()
@@ -0,0 +1,113 @@
+"""
+Tests of util/source_report.py on the example agent and the agent in tests/agents
+
+Run from the directory containing pysoarlib:
+    python -m unittest pysoarlib.tests.test_source_report
+"""
+
+import os
+import unittest
+
+from ..util.source_report import split_soar_commands, production_name, source_by_file, _source_filename
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AGENTS = os.path.join(ROOT, "tests", "agents")
+
+def read_commands(*path):
+    with open(os.path.join(*path), "r") as fin:
+        return list(split_soar_commands(fin.read()))
+
+def production_names(commands):
+    return [ production_name(command.split(None, 1)[1]) for command in commands if command.split(None, 1)[0] in ("sp", "gp") ]
+
+class FakeAgent:
+    """ Records the commands given to ExecuteCommandLine and answers the way soar would """
+    def __init__(self):
+        self.commands = []
+
+    def ExecuteCommandLine(self, command):
+        self.commands.append(command)
+        name = command.split(None, 1)[0]
+        if name in ("sp", "gp"):
+            return "*"
+        if name == "source":
+            return "*\nTotal: 1 production sourced."
+        return ""
+
+    def GetLastCommandLineResult(self):
+        return True
+
+class TestSplitSoarCommands(unittest.TestCase):
+    def test_example_agent(self):
+        commands = read_commands(ROOT, "example", "test-agent.soar")
+        self.assertEqual(production_names(commands), [
+            "topstate*propose*init-agent",
+            "topstate*apply*init-agent",
+            "topstate*propose*update-number",
+            "top-state*apply*update-number",
+            "topstate*propose*increase-number",
+            "topstate*apply*increase-number",
+            "topstate*apply*anything*clean-ol" ])
+        self.assertEqual(len(commands), 7)
+        self.assertTrue(all(command.endswith("}") for command in commands))
+
+    def test_load_file(self):
+        commands = read_commands(AGENTS, "load.soar")
+        self.assertEqual(commands, [ "pushd elaborations", "source _firstload.soar", "popd",
+            "source operators.soar", "source -v symbols.soar", "source -r rules" ])
+
+    def test_symbols_with_braces(self):
+        commands = read_commands(AGENTS, "operators.soar")
+        self.assertEqual(production_names(commands), [
+            "blocks*propose*move-block",
+            "blocks*apply*move-block*write",
+            "blocks*elaborate*brace-symbols",
+            "blocks*apply*move-block*clear" ])
+        self.assertTrue(commands[1].endswith("|\"; done|)\n}"))
+        self.assertEqual(commands[4], "watch 1")
+        self.assertEqual(commands[5].split(), [ "echo", "Loaded", "\\", "operators" ])
+
+    def test_comment_characters_in_symbols(self):
+        commands = read_commands(AGENTS, "symbols.soar")
+        self.assertEqual(production_names(commands), [ "blocks*elaborate*name-symbols", "elaborate*top-state*name" ])
+
+    def test_negated_conjunction(self):
+        commands = read_commands(AGENTS, "rules", "clear.soar")
+        self.assertEqual(production_names(commands), [ "blocks*elaborate*clear" ])
+
+class TestProductionName(unittest.TestCase):
+    def test_bodies(self):
+        self.assertEqual(production_name("{name (state <s>) --> (<s> ^a b)}"), "name")
+        self.assertEqual(production_name("  {\n  name\n  (state <s>)}"), "name")
+        self.assertEqual(production_name("\"name (state <s>) --> (<s> ^a b)\""), "name")
+        self.assertIsNone(production_name("name"))
+        self.assertIsNone(production_name(""))
+
+class TestSourceByFile(unittest.TestCase):
+    def test_source_filename(self):
+        self.assertEqual(_source_filename("file.soar"), "file.soar")
+        self.assertEqual(_source_filename("-v -a {file.soar}"), "file.soar")
+        self.assertIsNone(_source_filename("-r rules"))
+        self.assertIsNone(_source_filename(""))
+
+    def test_agent(self):
+        agent = FakeAgent()
+        report = source_by_file(agent, os.path.join(AGENTS, "load.soar"))
+        self.assertIsNone(report.error)
+        self.assertEqual([ os.path.relpath(f.filename, AGENTS) for f in report.files ], [
+            "load.soar",
+            os.path.join("elaborations", "_firstload.soar"),
+            os.path.join("elaborations", "top-state.soar"),
+            "operators.soar",
+            "symbols.soar" ])
+        self.assertEqual([ f.depth for f in report.files ], [ 0, 1, 2, 1, 1 ])
+        # source -r isn't followed, soar sources the directory and only the count is kept
+        self.assertIn("source -r rules", agent.commands)
+        self.assertEqual(report.files[0].num_productions, 1)
+        self.assertEqual(report.num_productions, 9)
+        self.assertEqual(report.num_excised, 1)
+        self.assertEqual(report.files[4].excised, [ "elaborate*top-state*name" ])
+        self.assertEqual(report.file_of("elaborate*top-state*name"), report.files[4].filename)
+
+if __name__ == "__main__":
+    unittest.main()
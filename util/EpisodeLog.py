@@ -0,0 +1,244 @@
+"""
+Defines the binary format for input/output episode logs (written by EpisodeRecorder)
+and a reader with random access to the cycles in a log
+
+A log is a sequence of records (see binary_format), one section per decision cycle:
+    the output commands from the previous output phase, the input-link changes made
+    during the input phase, and then an END_CYCLE record
+Each output command is a COMMAND record, any changes made by its handler, and then a RESPONSE record
+
+Identifiers are referred to by the symbols they had when recorded
+and SoarWME's are referred to by a handle (an int assigned when the wme was added)
+"""
+
+import mmap
+import struct
+
+from .binary_format import BinaryWriter, BinaryReader, encode_varint
+
+EPISODE_MAGIC = b"PSEP1\n"
+
+ROOT_RECORD = 1         # input_link_symbol
+ID_RECORD = 2           # parent_symbol attr child_symbol
+ADD_RECORD = 3          # handle parent_symbol attr value
+UPDATE_RECORD = 4       # handle value
+REMOVE_RECORD = 5       # handle
+COMMAND_RECORD = 6      # command_name root_symbol num_children (attr value)*
+RESPONSE_RECORD = 7     # root_symbol num_added (attr value)*
+END_CYCLE_RECORD = 8    # cycle_number
+INIT_RECORD = 9         # (init-soar happened)
+ID_REMOVE_RECORD = 10   # symbol (the identifier and everything under it was removed)
+
+class EpisodeWriter(BinaryWriter):
+    """ Writes the records of an episode log to a binary file object (see EpisodeRecorder) """
+
+    def __init__(self, fout):
+        BinaryWriter.__init__(self, fout)
+        fout.write(EPISODE_MAGIC)
+
+    def root(self, symbol):
+        self.write_record(ROOT_RECORD, encode_varint(self.symbol(symbol)))
+
+    def identifier(self, parent, attr, child):
+        self.write_record(ID_RECORD, encode_varint(self.symbol(parent)) +
+                encode_varint(self.symbol(attr)) + encode_varint(self.symbol(child)))
+
+    def add(self, handle, parent, attr, value):
+        self.write_record(ADD_RECORD, encode_varint(handle) + encode_varint(self.symbol(parent)) +
+                encode_varint(self.symbol(attr)) + self.encode_value(value))
+
+    def update(self, handle, value):
+        self.write_record(UPDATE_RECORD, encode_varint(handle) + self.encode_value(value))
+
+    def remove(self, handle):
+        self.write_record(REMOVE_RECORD, encode_varint(handle))
+
+    def remove_identifier(self, symbol):
+        self.write_record(ID_REMOVE_RECORD, encode_varint(self.symbol(symbol)))
+
+    def command(self, command_name, root, children):
+        """ children is a list of (attr, value, is_id) """
+        self.write_record(COMMAND_RECORD, encode_varint(self.symbol(command_name)) +
+                encode_varint(self.symbol(root)) + self._encode_children(children))
+
+    def response(self, root, children):
+        """ children is a list of (attr, value, is_id) added to the command by its handler """
+        self.write_record(RESPONSE_RECORD, encode_varint(self.symbol(root)) + self._encode_children(children))
+
+    def end_cycle(self, cycle):
+        self.write_record(END_CYCLE_RECORD, encode_varint(cycle))
+
+    def init_soar(self):
+        self.write_record(INIT_RECORD, b"")
+
+    def _encode_children(self, children):
+        data = [ encode_varint(len(children)) ]
+        for (attr, value, is_id) in children:
+            data.append(encode_varint(self.symbol(attr)))
+            data.append(self.encode_value(value, is_id))
+        return b"".join(data)
+
+
+class EpisodeLog:
+    """ Reads an episode log written by EpisodeRecorder
+
+        The file is memory mapped and indexed once when opened,
+        after which any cycle can be read directly with get_cycle
+
+        Each record is returned as a tuple starting with its record type:
+            (ROOT_RECORD, input_link_symbol)
+            (ID_RECORD, parent_symbol, attr, child_symbol)
+            (ADD_RECORD, handle, parent_symbol, attr, value)
+            (UPDATE_RECORD, handle, value)
+            (REMOVE_RECORD, handle)
+            (ID_REMOVE_RECORD, symbol)
+            (COMMAND_RECORD, command_name, root_symbol, [ (attr, value, is_id) ])
+            (RESPONSE_RECORD, root_symbol, [ (attr, value, is_id) ])
+            (END_CYCLE_RECORD, cycle_number)
+            (INIT_RECORD,)
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.fin = open(filename, "rb")
+        if len(self.fin.read(len(EPISODE_MAGIC))) == 0:
+            self.data = b""
+        else:
+            self.data = mmap.mmap(self.fin.fileno(), 0, access=mmap.ACCESS_READ)
+        if bytes(self.data[:len(EPISODE_MAGIC)]) != EPISODE_MAGIC:
+            self.close()
+            raise ValueError(filename + " is not an episode log")
+
+        self.symbols = []
+        self.cycle_offsets = []     # offset in the file where each cycle starts
+        self.cycle_numbers = []     # decision cycle number recorded at the end of each cycle
+        self.command_names = set()
+        self._build_index()
+
+    def close(self):
+        if not isinstance(self.data, bytes):
+            self.data.close()
+        self.fin.close()
+
+    def __len__(self):
+        """ The number of (complete) cycles in the log """
+        return len(self.cycle_numbers)
+
+    def get_cycle(self, index):
+        """ Returns a list of the records in the cycle with the given index (not including the END_CYCLE) """
+        reader = BinaryReader(self.data, self.cycle_offsets[index], self.symbols)
+        records = []
+        while True:
+            record = _read_record(reader)
+            if record is None or record[0] == END_CYCLE_RECORD:
+                return records
+            records.append(record)
+
+    def __iter__(self):
+        """ Yields the list of records for each cycle in order """
+        for i in range(len(self)):
+            yield self.get_cycle(i)
+
+    def _build_index(self):
+        reader = BinaryReader(self.data, len(EPISODE_MAGIC), self.symbols)
+        self.cycle_offsets.append(reader.offset)
+        while True:
+            try:
+                record = _read_record(reader)
+            except (IndexError, struct.error, UnicodeDecodeError):
+                # The last record was only partly written (e.g. the run crashed)
+                break
+            if record is None:
+                break
+            if record[0] == COMMAND_RECORD:
+                self.command_names.add(record[1])
+            elif record[0] == END_CYCLE_RECORD:
+                self.cycle_numbers.append(record[1])
+                self.cycle_offsets.append(reader.offset)
+        # The last offset is the start of a cycle that wasn't finished
+        self.cycle_offsets.pop()
+
+def _read_record(reader):
+    """ Reads the next record from the BinaryReader as a tuple (or None at the end) """
+    record_type = reader.next_record()
+    if record_type is None:
+        return None
+    if record_type == ROOT_RECORD:
+        return (ROOT_RECORD, reader.symbol())
+    if record_type == ID_RECORD:
+        return (ID_RECORD, reader.symbol(), reader.symbol(), reader.symbol())
+    if record_type == ADD_RECORD:
+        return (ADD_RECORD, reader.varint(), reader.symbol(), reader.symbol(), reader.value()[0])
+    if record_type == UPDATE_RECORD:
+        return (UPDATE_RECORD, reader.varint(), reader.value()[0])
+    if record_type == REMOVE_RECORD:
+        return (REMOVE_RECORD, reader.varint())
+    if record_type == ID_REMOVE_RECORD:
+        return (ID_REMOVE_RECORD, reader.symbol())
+    if record_type == COMMAND_RECORD:
+        return (COMMAND_RECORD, reader.symbol(), reader.symbol(), _read_children(reader))
+    if record_type == RESPONSE_RECORD:
+        return (RESPONSE_RECORD, reader.symbol(), _read_children(reader))
+    if record_type == END_CYCLE_RECORD:
+        return (END_CYCLE_RECORD, reader.varint())
+    if record_type == INIT_RECORD:
+        return (INIT_RECORD,)
+    raise ValueError("Unknown record type " + str(record_type))
+
+def _read_children(reader):
+    children = []
+    for i in range(reader.varint()):
+        attr = reader.symbol()
+        value, is_id = reader.value()
+        children.append( (attr, value, is_id) )
+    return children
+
+def get_wme_children(identifier):
+    """ Returns a list of (attr, value, is_id) for the children of an sml Identifier
+        (identifier values are given as their symbol) """
+    children = []
+    for index in range(identifier.GetNumberChildren()):
+        wme = identifier.GetChild(index)
+        if wme.IsIdentifier():
+            children.append( (wme.GetAttribute(), wme.GetValueAsString(), True) )
+        elif wme.GetValueType() == "int":
+            children.append( (wme.GetAttribute(), wme.ConvertToIntElement().GetValue(), False) )
+        elif wme.GetValueType() == "double":
+            children.append( (wme.GetAttribute(), wme.ConvertToFloatElement().GetValue(), False) )
+        else:
+            children.append( (wme.GetAttribute(), wme.GetValueAsString(), False) )
+    return children
+
+
+def descendant_ids(id_sym, id_parents):
+    """ Returns the symbols of the identifiers below id_sym, given a dict of child -> parent symbol """
+    children = {}
+    for child, parent in id_parents.items():
+        children.setdefault(parent, []).append(child)
+    found = []
+    stack = [ id_sym ]
+    while len(stack) > 0:
+        for child in children.get(stack.pop(), ()):
+            found.append(child)
+            stack.append(child)
+    return found
+
+def split_cycle(records):
+    """ Splits the records of one cycle into its output commands and its input changes
+
+        Returns (commands, inputs), where commands is a list of (command_record, [ handler_records ], response_record)
+    """
+    commands = []
+    inputs = []
+    command = None
+    for record in records:
+        if record[0] == COMMAND_RECORD:
+            command = (record, [])
+        elif record[0] == RESPONSE_RECORD and command is not None:
+            commands.append( (command[0], command[1], record) )
+            command = None
+        elif command is not None:
+            command[1].append(record)
+        else:
+            inputs.append(record)
+    return (commands, inputs)
@@ -0,0 +1,149 @@
+from collections import OrderedDict
+
+from .parse_wm_printout import parse_wm_printout
+
+class PrintoutCache:
+    """ Caches parsed working memory printouts so that PrintoutIdentifier.create
+        does not re-print and re-parse overlapping structures while working memory hasn't changed
+
+        Pinned roots (e.g. the state or io links) are printed once to a large depth
+        the first time they are needed, and any request for an identifier
+        inside that printout (with enough remaining depth) is served from it.
+        Other requests are printed directly, but are also remembered until the cache is cleared.
+
+        Everything is invalidated when the agent's decision cycle counter or current phase changes,
+        so a printout is never used after the phase it was made in (e.g. in run_for's until after the output phase).
+        The client also clears the cache at the start of each input phase, before each output command
+        is handled, on init-soar, and when it sends a command other than print (see SoarClient.execute_command).
+        So while the agent is stopped, printouts are kept until it runs again or a command changes working memory.
+        Pinned roots are evicted least-recently-used first once there are more than max_roots of them.
+    """
+
+    def __init__(self, client, max_roots=8):
+        """ client should be an instance of SoarClient
+            max_roots is the maximum number of pinned roots to keep """
+        self.client = client
+        self.max_roots = max_roots
+        self.pinned_roots = OrderedDict()   # root_id -> depth, least recently used first
+        self.snapshots = {}                 # root_id -> (wmes, depths), since the cache was last cleared
+        self.key = None                     # (decision cycle, phase) the snapshots were made in
+
+        self.num_hits = 0
+        self.num_misses = 0
+
+    def pin_root(self, root_id, depth):
+        """ Will print the given root_id to the given depth (at most once until the cache is cleared)
+            and use that printout to answer requests for any identifier inside it """
+        self.pinned_roots[root_id] = depth
+        self.pinned_roots.move_to_end(root_id)
+        self.snapshots.pop(root_id, None)
+        while len(self.pinned_roots) > self.max_roots:
+            old_root, _ = self.pinned_roots.popitem(last=False)
+            self.snapshots.pop(old_root, None)
+
+    def unpin_root(self, root_id):
+        """ Stops caching printouts of the given root_id """
+        self.pinned_roots.pop(root_id, None)
+        self.snapshots.pop(root_id, None)
+
+    def clear(self):
+        """ Discards all cached printouts (pinned roots are kept) """
+        self.snapshots = {}
+        self.key = None
+
+    def get_wmes(self, id, depth):
+        """ Returns a parse_wm_printout dict containing the given id printed to at least the given depth,
+            or None if the id does not exist in working memory """
+        self._check_key()
+
+        # First look through the pinned roots (most recently used first)
+        for root_id in reversed(list(self.pinned_roots.keys())):
+            snapshot = self._get_snapshot(root_id, self.pinned_roots[root_id])
+            if snapshot is None:
+                continue
+            if _covers(snapshot, id, depth):
+                self.pinned_roots.move_to_end(root_id)
+                self.num_hits += 1
+                return snapshot[0]
+
+        # Then any direct requests made since the cache was cleared
+        snapshot = self.snapshots.get(id)
+        if snapshot is not None and _covers(snapshot, id, depth):
+            self.num_hits += 1
+            return snapshot[0]
+
+        self.num_misses += 1
+        snapshot = self._print_snapshot(id, depth)
+        if snapshot is None:
+            return None
+        if id not in self.pinned_roots:
+            self.snapshots[id] = snapshot
+        return snapshot[0]
+
+    ### Internal Methods
+
+    def _check_key(self):
+        """ Clears the snapshots if the agent has moved on to another phase since they were made """
+        agent = self.client.agent
+        key = (agent.GetDecisionCycleCounter(), agent.GetCurrentPhase())
+        if key != self.key:
+            self.snapshots = {}
+            self.key = key
+
+    def _get_snapshot(self, root_id, depth):
+        if root_id not in self.snapshots:
+            self.snapshots[root_id] = self._print_snapshot(root_id, depth)
+        return self.snapshots[root_id]
+
+    def _print_snapshot(self, root_id, depth):
+        """ Prints and parses the given root, returns (wmes, depths) or None if it doesn't exist """
+        printout = self.client.agent.ExecuteCommandLine("p " + root_id + " -d " + str(depth))
+        if printout.strip().startswith("There is no identifier"):
+            return None
+        wmes = parse_wm_printout(printout)
+        return (wmes, _printed_depths(wmes, root_id, depth))
+
+def _printed_depths(wmes, root_id, depth):
+    """ Returns a dict mapping each identifier in the printout to the depth its children were printed to
+
+        Soar prints each identifier only once, the first time its depth-first traversal reaches it,
+        so this replays that traversal over the parsed printout
+    """
+    depths = {}
+    stack = [ (root_id, depth) ]
+    while len(stack) > 0:
+        cur_id, cur_depth = stack.pop()
+        if cur_id in depths:
+            continue
+        depths[cur_id] = cur_depth
+        if cur_depth <= 1:
+            continue
+        # Reversed so that children are visited in the order they were printed
+        for wme in reversed(wmes.get(cur_id, [])):
+            if wme[2] in wmes and wme[2] not in depths:
+                stack.append( (wme[2], cur_depth - 1) )
+    return depths
+
+def _covers(snapshot, id, depth):
+    """ Returns True if printing the given id to the given depth would show nothing
+        that is missing from the snapshot (every identifier within reach was printed deeply enough) """
+    wmes, depths = snapshot
+    if depths.get(id, -1) < depth:
+        return False
+    visited = set([ id ])
+    level = [ id ]
+    remaining = depth - 1
+    while remaining > 0 and len(level) > 0:
+        next_level = []
+        for cur_id in level:
+            for wme in wmes[cur_id]:
+                child_id = wme[2]
+                if child_id not in wmes or child_id in visited:
+                    continue
+                if depths.get(child_id, -1) < remaining:
+                    return False
+                visited.add(child_id)
+                next_level.append(child_id)
+        level = next_level
+        remaining -= 1
+    return True
@@ -1,11 +1,20 @@
-from pysoarlib.util import parse_wm_printout
+from .parse_wm_printout import parse_wm_printout
 
 class PrintoutIdentifier:
     """ Represents an identifier that was parsed from a soar print command via parse_wm_printout
         and implements the IdentifierExtensions interface for it """
 
     def create(client, id, depth):
-        """ Will print the given identifier to the given depth and wrap the result in a PrintoutIdentifier """
+        """ Will print the given identifier to the given depth and wrap the result in a PrintoutIdentifier
+
+            If the client has a printout_cache, the result may come from a printout made earlier in the same cycle """
+        cache = getattr(client, "printout_cache", None)
+        if cache is not None:
+            wmes = cache.get_wmes(id, depth)
+            if wmes is None:
+                return None
+            return PrintoutIdentifier(wmes, id)
+
         printout = client.execute_command("p " + id + " -d " + str(depth))
         if printout.strip().startswith("There is no identifier"):
             return None
@@ -0,0 +1,153 @@
+from ..SoarWME import SoarWME
+
+class _TableNode:
+    """ A node in the WMETable trie, either an identifier (id) or a leaf (wme) """
+    __slots__ = ("id", "wme", "children")
+
+    def __init__(self, id=None, wme=None):
+        self.id = id            # sml Identifier for an intermediate node
+        self.wme = wme          # SoarWME for a leaf
+        self.children = {}      # attr -> _TableNode
+
+    def value(self):
+        return self.wme if self.wme is not None else self.id
+
+class WMETable:
+    """ Stores the wmes created by update_wm_from_tree as a trie keyed by attribute,
+        so a branch can be removed (or listed) without scanning the whole table
+
+        Paths can be given as a dotted string ('root_name.attr1.attr2') or a tuple of attributes,
+        where the first element is the root_name used in update_wm_from_tree
+        Intermediate paths map to sml Identifiers, and leaves map to SoarWME's
+    """
+
+    def __init__(self):
+        self.roots = {}     # root_name -> _TableNode (has no identifier, it is given to update)
+
+    def update(self, root_id, root_name, input_dict, remove_stale=False):
+        """ Updates the wmes under root_id to match the input_dict (see update_wm_from_tree)
+
+            If remove_stale is True, any branch in the table that is no longer in input_dict is removed
+        """
+        root = self.roots.get(root_name)
+        if root is None:
+            root = _TableNode()
+            self.roots[root_name] = root
+
+        stack = [ (root_id, root, input_dict) ]
+        while len(stack) > 0:
+            parent_id, node, inputs = stack.pop()
+            assert isinstance(inputs, dict), "Should only recurse on dicts!"
+            for attribute, input_val in inputs.items():
+                child = node.children.get(attribute)
+                if not callable(input_val):
+                    if child is not None and child.id is None:
+                        # Was a value, is now a sub-tree
+                        _remove_nodes(child)
+                        child = None
+                    if child is None:
+                        child = _TableNode(id=parent_id.CreateIdWME(attribute))
+                        node.children[attribute] = child
+                    stack.append( (child.id, child, input_val) )
+                    continue
+
+                value = input_val()
+                if child is not None and child.wme is None:
+                    # Was a sub-tree, is now a value
+                    _remove_nodes(child)
+                    child = None
+                if child is None:
+                    child = _TableNode(wme=SoarWME(att=attribute, val=value))
+                    node.children[attribute] = child
+                child.wme.set_value(value)
+                child.wme.update_wm(parent_id)
+
+            if remove_stale and len(node.children) > len(inputs):
+                for attribute in [ a for a in node.children if a not in inputs ]:
+                    _remove_nodes(node.children.pop(attribute))
+
+    def remove(self, path=None):
+        """ Removes the wmes at the given path (and everything below it) from working memory and the table
+            If no path is given, everything in the table is removed """
+        if path is None:
+            for root in self.roots.values():
+                _remove_nodes(root)
+            self.roots = {}
+            return
+
+        path = _split_path(path)
+        if len(path) == 1:
+            root = self.roots.pop(path[0], None)
+            if root is not None:
+                _remove_nodes(root)
+            return
+
+        parent = self._find(path[:-1])
+        if parent is not None and path[-1] in parent.children:
+            _remove_nodes(parent.children.pop(path[-1]))
+
+    def get(self, path, default=None):
+        """ Returns the Identifier or SoarWME at the given path (or default if there isn't one) """
+        node = self._find(_split_path(path))
+        if node is None or (node.id is None and node.wme is None):
+            return default
+        return node.value()
+
+    def items(self, prefix=None):
+        """ Yields (path, Identifier or SoarWME) for every entry at or below the given prefix (defaults to all)
+            Paths are yielded as dotted strings """
+        if prefix is None:
+            stack = [ (name, root) for name, root in self.roots.items() ]
+        else:
+            node = self._find(_split_path(prefix))
+            if node is None:
+                return
+            stack = [ (prefix if isinstance(prefix, str) else ".".join(prefix), node) ]
+
+        while len(stack) > 0:
+            path, node = stack.pop()
+            if node.id is not None or node.wme is not None:
+                yield (path, node.value())
+            for attr, child in node.children.items():
+                stack.append( (path + "." + attr, child) )
+
+    def __contains__(self, path):
+        return self.get(path) is not None
+
+    def __getitem__(self, path):
+        value = self.get(path)
+        if value is None:
+            raise KeyError(path)
+        return value
+
+    def __len__(self):
+        return sum(1 for item in self.items())
+
+    def _find(self, path):
+        """ Returns the _TableNode at the given path (tuple), or None """
+        node = self.roots.get(path[0])
+        for attr in path[1:]:
+            if node is None:
+                return None
+            node = node.children.get(attr)
+        return node
+
+def _split_path(path):
+    if isinstance(path, str):
+        return tuple(path.split("."))
+    return tuple(path)
+
+def _remove_nodes(node):
+    """ Removes the given node and everything below it from working memory (children before parents) """
+    nodes = [ node ]
+    i = 0
+    while i < len(nodes):
+        nodes.extend(nodes[i].children.values())
+        i += 1
+    for n in reversed(nodes):
+        if n.wme is not None:
+            n.wme.remove_from_wm()
+        elif n.id is not None:
+            n.id.DestroyWME()
+            n.id = None
+        n.children = {}
@@ -1,4 +1,4 @@
-import Python_sml_ClientInterface as sml
+from collections import deque
 
 ### Note: Helper class used by extract_wm_graph
 
@@ -12,15 +12,61 @@ class WMNode:
         node['attr'] = [ val1, val2, ... ] # for multi-valued attributes (values can be constants or WMNodes)
     """
 
+    __slots__ = ("id", "symbol", "children", "_timetags", "_node_map", "_max_depth")
+
     def __init__(self, soar_id):
         self.id = soar_id
         self.symbol = soar_id.GetValueAsString()
         self.children = {}
+        self._timetags = None   # timetags of the child wmes when the children were last extracted
+        self._node_map = None   # symbol -> WMNode for the whole graph (only set on the root)
+        self._max_depth = -1
+
+    def refresh(self):
+        """ Updates the graph rooted at this node (as returned by extract_wm_graph) to match working memory
+
+            Only identifiers whose child wmes have changed since the last extraction are re-read,
+            the WMNodes for everything else are reused """
+        if self._node_map is None:
+            self._node_map = { self.symbol: self }
+        self._node_map = _extract_graph(self, self._max_depth, self._node_map)
 
     def attributes(self):
         """ Returns a list of all child wme attribute strings """
         return list(self.children.keys())
 
+    def to_wme_dict(self):
+        """ Returns all wmes in the graph rooted at this node in the same format as parse_wm_printout:
+            a dict mapping identifier symbols to lists of (id, attr, value) triples
+            (child identifiers are given by their symbol, constants keep their int/float/str type) """
+        wmes = dict()
+        for node in self.iter_nodes():
+            wmes[node.symbol] = [ (node.symbol, attr, (v.symbol if isinstance(v, WMNode) else v))
+                    for attr, v in node.iter_children() ]
+        return wmes
+
+    def iter_nodes(self):
+        """ Yields every WMNode reachable from this one (including itself) once, depth first """
+        visited = set([ self.symbol ])
+        stack = [ self ]
+        while len(stack) > 0:
+            node = stack.pop()
+            yield node
+            children = [ v for attr, v in node.iter_children() if isinstance(v, WMNode) and v.symbol not in visited ]
+            for child in reversed(children):
+                if child.symbol not in visited:
+                    visited.add(child.symbol)
+                    stack.append(child)
+
+    def iter_children(self):
+        """ Yields an (attr, value) pair for each child wme, with multi-valued attributes flattened """
+        for attr, val in self.children.items():
+            if isinstance(val, list):
+                for v in val:
+                    yield (attr, v)
+            else:
+                yield (attr, val)
+
     # Supports dictionary syntax (read only)
     def __getitem__(self, attr):
         """ Returns the value of the wme (node, attr, val)
@@ -31,41 +77,76 @@ class WMNode:
     def __str__(self):
         """ Returns a nicely formatted string representation of the node and all its children 
             (Warning: will be a lot of text for large graphs) """
-        return self.__str_helper__("", set())
+        parts = []
+        self.__str_helper__("", set(), parts)
+        return "".join(parts)
 
-    def __str_helper__(self, indent, ignore_ids):
-        var = "<" + self.symbol + ">"
-        if self.symbol in ignore_ids or len(self.children) == 0:
-            return var
+    def __str_helper__(self, indent, ignore_ids, parts):
+        """ Appends the strings making up the representation of this node to parts """
+        _wm_value_to_str(self, indent, ignore_ids, parts)
 
-        ignore_ids.add(self.symbol)
-
-        s = var + " {\n"
-        for a, v in self.children.items():
-            s += indent + "  " + a + ": " + _wm_value_to_str(v, indent + "  ", ignore_ids) + "\n"
-        s += indent + "}"
-        return s
+    def _add_child_wme(self, attr, value):
+        """ Adds the child wme to the children dictionary
+            If there are multiple values for a given attr, move them into a list instead of replacing """
+        if attr in self.children:
+            cur_val = self.children[attr]
+            if isinstance(cur_val, list):
+                # Child is already a list, just append
+                cur_val.append(value)
+            else:
+                # This is the second value for the attr, replace current value with a list
+                self.children[attr] = [ cur_val, value ]
+        else:
+            # First time we've seen this attr, just add to dictionary
+            self.children[attr] = value
 
-    def _extract_children(self, max_depth, node_map):
-        """ Internal helper method to recursively extract graph structure for a node's children """
-        if max_depth == 0:
-            return
+def _extract_graph(root_node, max_depth, old_node_map):
+    """ Crawls the working memory graph breadth-first starting at root_node (without recursion)
 
-        for index in range(self.id.GetNumberChildren()):
-            wme = self.id.GetChild(index)
+        Nodes in old_node_map are reused, and their children are only re-read
+        if the number or timetags of their child wmes have changed
+        Returns the new node_map (symbol -> WMNode) of all nodes reached
+    """
+    node_map = { root_node.symbol: root_node }
+    queue = deque([ (root_node, max_depth) ])
+    while len(queue) > 0:
+        node, depth = queue.popleft()
+        if depth == 0:
+            # At the depth limit, the node's children are not extracted
+            node.children = {}
+            node._timetags = None
+            continue
+
+        soar_id = node.id
+        wmes = [ soar_id.GetChild(index) for index in range(soar_id.GetNumberChildren()) ]
+        timetags = [ wme.GetTimeTag() for wme in wmes ]
+
+        if timetags == node._timetags:
+            # Nothing changed, but the child nodes still need to be checked
+            for val in node.children.values():
+                for child in (val if isinstance(val, list) else (val, )):
+                    if isinstance(child, WMNode) and child.symbol not in node_map:
+                        node_map[child.symbol] = child
+                        queue.append( (child, depth-1) )
+            continue
+
+        node.children = {}
+        node._timetags = timetags
+        for wme in wmes:
             attr = wme.GetAttribute()
             if wme.IsIdentifier():
                 child_id = wme.ConvertToIdentifier()
                 child_sym = child_id.GetValueAsString()
-                # First check if the child id is already in the node map
                 if child_sym in node_map:
                     wme_val = node_map[child_sym]
                 else:
-                    # If not, recursively create and extract the children
-                    wme_val = WMNode(child_id)
-                    node_map[wme_val.symbol] = wme_val
-                    wme_val._extract_children(max_depth-1, node_map)
-
+                    wme_val = old_node_map.get(child_sym, None)
+                    if wme_val is None:
+                        wme_val = WMNode(child_id)
+                    else:
+                        wme_val.id = child_id
+                    node_map[child_sym] = wme_val
+                    queue.append( (wme_val, depth-1) )
             elif wme.GetValueType() == "int":
                 wme_val = wme.ConvertToIntElement().GetValue()
             elif wme.GetValueType() == "double":
@@ -73,41 +154,48 @@ class WMNode:
             else:
                 wme_val = wme.GetValueAsString()
 
-            self._add_child_wme(attr, wme_val)
+            node._add_child_wme(attr, wme_val)
 
-    def _add_child_wme(self, attr, value):
-        """ Adds the child wme to the children dictionary
-            If there are multiple values for a given attr, move them into a list instead of replacing """
-        if attr in self.children:
-            cur_val = self.children[attr]
-            if isinstance(cur_val, list):
-                # Child is already a list, just append
-                cur_val.append(value)
-            else:
-                # This is the second value for the attr, replace current value with a list
-                self.children[attr] = [ cur_val, value ]
-        else:
-            # First time we've seen this attr, just add to dictionary
-            self.children[attr] = value
+    return node_map
 
-def _wm_value_to_str(val, indent, ignore_ids):
+def _wm_value_to_str(val, indent, ignore_ids, parts):
     """
-    recursive helper function which returns a string representation of any given value type
+    helper function which appends a string representation of any given value type to parts
+    (walks the graph with an explicit stack instead of recursion, so deep graphs can be printed)
 
     :param val: The value to convert to a string (can be str, int, float, list, WMNode)
     :param indent: a string of spaces to indent the current level
     :param ignore_ids: A set of Identifier symbols to not print
+    :param parts: A list of strings to append to
     """
-    if isinstance(val, str):
-        return val
-    if isinstance(val, int):
-        return str(val)
-    if isinstance(val, float):
-        return str(val)
-    if isinstance(val, list):
-        return "[ " + ", ".join(_wm_value_to_str(i, indent, ignore_ids) for i in val) + " ]"
-    if isinstance(val, WMNode):
-        return val.__str_helper__(indent, ignore_ids)
-    return ""
-
-
+    # Each entry is (value, indent), or (text, None) for text to append as is
+    stack = [ (val, indent) ]
+    while len(stack) > 0:
+        val, indent = stack.pop()
+        if indent is None or isinstance(val, str):
+            parts.append(val)
+        elif isinstance(val, int):
+            parts.append(str(val))
+        elif isinstance(val, float):
+            parts.append(str(val))
+        elif isinstance(val, list):
+            items = [ ("[ ", None) ]
+            for i, v in enumerate(val):
+                if i > 0:
+                    items.append( (", ", None) )
+                items.append( (v, indent) )
+            items.append( (" ]", None) )
+            stack.extend(reversed(items))
+        elif isinstance(val, WMNode):
+            parts.append("<" + val.symbol + ">")
+            if val.symbol in ignore_ids or len(val.children) == 0:
+                continue
+            ignore_ids.add(val.symbol)
+
+            items = [ (" {\n", None) ]
+            for a, v in val.children.items():
+                items.append( (indent + "  " + a + ": ", None) )
+                items.append( (v, indent + "  ") )
+                items.append( ("\n", None) )
+            items.append( (indent + "}", None) )
+            stack.extend(reversed(items))
@@ -1,8 +1,39 @@
 
-__all__ = ["extract_wm_graph", "parse_wm_printout", "PrintoutIdentifier", "update_wm_from_tree", "remove_tree_from_wm" ]
+__all__ = ["extract_wm_graph", "parse_wm_printout", "PrintoutIdentifier", "PrintoutCache", "update_wm_from_tree", "remove_tree_from_wm", "WMETable", "diff_wm",
+        "write_wm_jsonl", "read_wm_jsonl", "write_wm_dot", "write_wm_binary", "read_wm_binary", "EpisodeLog", "parse_stats",
+        "parse_memory_stats", "parse_smem_stats", "parse_epmem_stats", "walk_identifiers",
+        "read_wm_tree", "add_tree_to_wm", "FrameLayout", "SharedMemoryFeed",
+        "parse_production_counts", "parse_source_output", "source_by_file", "SourceReport" ]
 
-from .extract_wm_graph import extract_wm_graph
-from .parse_wm_printout import parse_wm_printout
-from .update_wm_from_tree import update_wm_from_tree
-from .remove_tree_from_wm import remove_tree_from_wm
-from .PrintoutIdentifier import PrintoutIdentifier
+from .._lazy import make_lazy
+
+# None of these load SML, submodules are imported the first time one of their names is used
+__getattr__, __dir__ = make_lazy(__name__, {
+    "extract_wm_graph": ".extract_wm_graph",
+    "parse_wm_printout": ".parse_wm_printout",
+    "update_wm_from_tree": ".update_wm_from_tree",
+    "remove_tree_from_wm": ".remove_tree_from_wm",
+    "WMETable": ".WMETable",
+    "PrintoutIdentifier": ".PrintoutIdentifier",
+    "PrintoutCache": ".PrintoutCache",
+    "diff_wm": ".diff_wm",
+    "write_wm_jsonl": ".export_wm",
+    "read_wm_jsonl": ".export_wm",
+    "write_wm_dot": ".export_wm",
+    "write_wm_binary": ".export_wm",
+    "read_wm_binary": ".export_wm",
+    "EpisodeLog": ".EpisodeLog",
+    "parse_stats": ".parse_soar_stats",
+    "parse_memory_stats": ".parse_soar_stats",
+    "parse_smem_stats": ".parse_soar_stats",
+    "parse_epmem_stats": ".parse_soar_stats",
+    "parse_production_counts": ".parse_soar_stats",
+    "parse_source_output": ".parse_source_output",
+    "source_by_file": ".source_report",
+    "SourceReport": ".source_report",
+    "walk_identifiers": ".walk_identifiers",
+    "read_wm_tree": ".wm_tree",
+    "add_tree_to_wm": ".wm_tree",
+    "FrameLayout": ".shared_frame",
+    "SharedMemoryFeed": ".shared_frame",
+})
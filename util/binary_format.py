@@ -0,0 +1,125 @@
+"""
+Helpers for reading/writing the compact binary format used for working memory snapshots and logs
+
+Integers are written as (zigzag) varints, and every string is interned:
+    the first time a string is written it is defined with a SYMBOL record,
+    and after that it is referred to by its index in the symbol table
+"""
+
+import struct
+
+SYMBOL_RECORD = 0
+
+INT_VALUE = 0
+FLOAT_VALUE = 1
+STRING_VALUE = 2
+ID_VALUE = 3
+
+_float_struct = struct.Struct("<d")
+
+class BinaryWriter:
+    """ Writes records to a binary file object, interning strings as it goes """
+
+    def __init__(self, fout):
+        self.fout = fout
+        self.symbols = dict()   # string -> index
+
+    def symbol(self, string):
+        """ Returns the index for the given string, writing a SYMBOL record if it is new """
+        index = self.symbols.get(string)
+        if index is None:
+            index = len(self.symbols)
+            self.symbols[string] = index
+            data = string.encode("utf-8")
+            self.fout.write(encode_varint(SYMBOL_RECORD) + encode_varint(len(data)) + data)
+        return index
+
+    def encode_value(self, value, is_id=False):
+        """ Returns the bytes for a typed value (interning it first if it is a string) """
+        if is_id:
+            return bytes(bytearray([ ID_VALUE ])) + encode_varint(self.symbol(value))
+        if isinstance(value, bool):
+            value = str(value)
+        if isinstance(value, int):
+            return bytes(bytearray([ INT_VALUE ])) + encode_varint(_zigzag(value))
+        if isinstance(value, float):
+            return bytes(bytearray([ FLOAT_VALUE ])) + _float_struct.pack(value)
+        return bytes(bytearray([ STRING_VALUE ])) + encode_varint(self.symbol(str(value)))
+
+    def write_record(self, record_type, data):
+        """ Writes a record with the given type (> 0) and pre-encoded data """
+        self.fout.write(encode_varint(record_type) + data)
+
+
+class BinaryReader:
+    """ Reads records from a bytes-like object (e.g. the contents of a file or an mmap) """
+
+    def __init__(self, data, offset=0, symbols=None):
+        """ To start reading in the middle of the data, give the full symbol table read earlier
+            (symbol definitions already in the table are skipped) """
+        self.data = data
+        self.offset = offset
+        self.symbols = [] if symbols is None else symbols
+        self.num_defined = 0    # number of symbol records read so far
+
+    def at_end(self):
+        return self.offset >= len(self.data)
+
+    def next_record(self):
+        """ Returns the type of the next non-symbol record (reading any symbol definitions before it),
+            or None at the end of the data """
+        while self.offset < len(self.data):
+            record_type = self.varint()
+            if record_type != SYMBOL_RECORD:
+                return record_type
+            length = self.varint()
+            if self.offset + length > len(self.data):
+                raise IndexError("The symbol record is cut off")
+            if self.num_defined >= len(self.symbols):
+                self.symbols.append(bytes(self.data[self.offset:self.offset+length]).decode("utf-8"))
+            self.num_defined += 1
+            self.offset += length
+        return None
+
+    def varint(self):
+        result = 0
+        shift = 0
+        data = self.data
+        while True:
+            b = data[self.offset]
+            self.offset += 1
+            result |= (b & 0x7f) << shift
+            if b < 0x80:
+                return result
+            shift += 7
+
+    def symbol(self):
+        return self.symbols[self.varint()]
+
+    def value(self):
+        """ Reads a typed value, returns (value, is_id) """
+        value_type = self.data[self.offset]
+        self.offset += 1
+        if value_type == INT_VALUE:
+            return (_unzigzag(self.varint()), False)
+        if value_type == FLOAT_VALUE:
+            val = _float_struct.unpack_from(self.data, self.offset)[0]
+            self.offset += 8
+            return (val, False)
+        return (self.symbol(), value_type == ID_VALUE)
+
+
+def encode_varint(n):
+    """ Returns the bytes encoding the given non-negative integer as a varint """
+    out = bytearray()
+    while n >= 0x80:
+        out.append((n & 0x7f) | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+def _zigzag(n):
+    return (n << 1) if n >= 0 else ((-n << 1) - 1)
+
+def _unzigzag(n):
+    return (n >> 1) if (n & 1) == 0 else -((n + 1) >> 1)
@@ -0,0 +1,183 @@
+from collections import Counter, deque
+
+from .WMNode import WMNode
+
+class WMDiff:
+    """ The result of diff_wm, describing how working memory changed between two snapshots
+
+        diff.added = [ (id, attr, value) ]   # wmes only in the new snapshot
+        diff.removed = [ (id, attr, value) ] # wmes only in the old snapshot
+        diff.changed = [ (id, attr, old_value, new_value) ] # single-valued attributes whose value changed
+        diff.renamed = { old_symbol: new_symbol } # identifiers matched to a structurally identical one
+
+        All identifiers are given using the symbols of the new snapshot
+        (except in removed wmes whose identifier has no match in the new snapshot)
+    """
+
+    def __init__(self, added, removed, changed, renamed):
+        self.added = added
+        self.removed = removed
+        self.changed = changed
+        self.renamed = renamed
+
+    def is_empty(self):
+        """ Returns True if there are no differences between the snapshots (ignoring renaming) """
+        return len(self.added) == 0 and len(self.removed) == 0 and len(self.changed) == 0
+
+    def __str__(self):
+        lines = []
+        lines.extend("+ ({} ^{} {})".format(*wme) for wme in self.added)
+        lines.extend("- ({} ^{} {})".format(*wme) for wme in self.removed)
+        lines.extend("~ ({} ^{} {} -> {})".format(*wme) for wme in self.changed)
+        lines.extend("= {} -> {}".format(old, new) for old, new in self.renamed.items())
+        return "\n".join(lines)
+
+
+def diff_wm(old, new, refine_rounds=3):
+    """ Compares two snapshots of working memory and returns a WMDiff describing the changes
+
+    :param old: The earlier snapshot, either a parse_wm_printout dict or a WMNode (from extract_wm_graph)
+    :param new: The later snapshot, in either format
+    :param refine_rounds: How many levels of structure to use when matching renamed identifiers
+    :returns WMDiff
+
+    Identifiers with the same symbol in both snapshots are the same identifier.
+    When Soar gives a new symbol to a structure (e.g. it was removed and re-created),
+    identifiers are aligned by following matching attributes from already aligned parents,
+    and by comparing the shape of their substructure (to refine_rounds levels).
+    This takes time roughly linear in the size of the snapshots.
+    """
+    old_wmes = _as_wme_dict(old)
+    new_wmes = _as_wme_dict(new)
+
+    old_sigs = _structure_signatures(old_wmes, refine_rounds)
+    new_sigs = _structure_signatures(new_wmes, refine_rounds)
+    mapping = _align_identifiers(old_wmes, new_wmes, old_sigs, new_sigs)
+
+    old_counts = Counter()
+    for wmes in old_wmes.values():
+        for (id, attr, val) in wmes:
+            old_counts[(mapping.get(id, id), attr, mapping.get(val, val) if val in old_wmes else val)] += 1
+
+    new_counts = Counter()
+    for wmes in new_wmes.values():
+        new_counts.update(wmes)
+
+    added = list((new_counts - old_counts).elements())
+    removed = list((old_counts - new_counts).elements())
+
+    # An attribute that lost one value and gained one is reported as a change
+    added_by_key = Counter((wme[0], wme[1]) for wme in added)
+    removed_by_key = Counter((wme[0], wme[1]) for wme in removed)
+    changed_keys = set(key for key, n in added_by_key.items() if n == 1 and removed_by_key.get(key, 0) == 1)
+
+    old_vals = dict(((wme[0], wme[1]), wme[2]) for wme in removed if (wme[0], wme[1]) in changed_keys)
+    changed = [ (wme[0], wme[1], old_vals[(wme[0], wme[1])], wme[2]) for wme in added if (wme[0], wme[1]) in changed_keys ]
+    added = [ wme for wme in added if (wme[0], wme[1]) not in changed_keys ]
+    removed = [ wme for wme in removed if (wme[0], wme[1]) not in changed_keys ]
+
+    renamed = dict((o, n) for o, n in mapping.items() if o != n)
+    return WMDiff(added, removed, changed, renamed)
+
+
+def _as_wme_dict(snapshot):
+    """ Converts a snapshot to the parse_wm_printout format (if it isn't already),
+        with every value written the way soar prints it, so both formats can be compared """
+    if isinstance(snapshot, WMNode):
+        snapshot = snapshot.to_wme_dict()
+    return dict((id, [ (wme[0], wme[1], _value_as_printed(wme[2])) for wme in wmes ]) for id, wmes in snapshot.items())
+
+def _value_as_printed(val):
+    """ Returns a constant as soar prints it (floats as %f, strings without the |quotes| around them) """
+    if isinstance(val, float):
+        return "%f" % val
+    if isinstance(val, int):
+        return str(val)
+    if len(val) >= 2 and val[0] == '|' and val[-1] == '|':
+        return val[1:-1]
+    return val
+
+def _structure_signatures(wmes, rounds):
+    """ Returns a dict mapping each identifier to a hash of its substructure (to the given number of levels)
+        Identifiers are treated as opaque, so structurally identical subtrees get the same signature """
+    sigs = dict((id, 0) for id in wmes)
+    for i in range(rounds):
+        next_sigs = dict()
+        for id, id_wmes in wmes.items():
+            parts = sorted((attr, 1, sigs[val]) if val in sigs else (attr, 0, hash(val)) for (_, attr, val) in id_wmes)
+            next_sigs[id] = hash(tuple(parts))
+        sigs = next_sigs
+    return sigs
+
+def _align_identifiers(old_wmes, new_wmes, old_sigs, new_sigs):
+    """ Returns a dict mapping identifiers in old_wmes to their matching identifier in new_wmes """
+    mapping = dict()
+    matched_new = set()
+    queue = deque()
+
+    def match(old_id, new_id):
+        mapping[old_id] = new_id
+        matched_new.add(new_id)
+        queue.append( (old_id, new_id) )
+
+    # Anchors: identifiers that kept their symbol
+    for id in old_wmes:
+        if id in new_wmes:
+            match(id, id)
+
+    while True:
+        # Propagate from matched parents to their children through the same attribute
+        while len(queue) > 0:
+            old_id, new_id = queue.popleft()
+            old_children = _unmatched_children(old_wmes, old_id, mapping)
+            new_children = _unmatched_children(new_wmes, new_id, matched_new)
+            for attr, old_ids in old_children.items():
+                new_ids = new_children.get(attr)
+                if new_ids is None:
+                    continue
+                for old_child, new_child in _pair_by_signature(old_ids, new_ids, old_sigs, new_sigs):
+                    if old_child not in mapping and new_child not in matched_new:
+                        match(old_child, new_child)
+
+        # Then match any unmatched identifiers whose structure is unique in both snapshots
+        old_left = _group_by_signature((id for id in old_wmes if id not in mapping), old_sigs)
+        new_left = _group_by_signature((id for id in new_wmes if id not in matched_new), new_sigs)
+        for sig, old_ids in old_left.items():
+            new_ids = new_left.get(sig)
+            if len(old_ids) == 1 and new_ids is not None and len(new_ids) == 1:
+                match(old_ids[0], new_ids[0])
+        if len(queue) == 0:
+            return mapping
+
+def _unmatched_children(wmes, id, matched):
+    """ Returns a dict of attr -> [ child identifiers ] for children of id that are not in matched """
+    children = dict()
+    for (_, attr, val) in wmes.get(id, []):
+        if val in wmes and val not in matched:
+            children.setdefault(attr, []).append(val)
+    return children
+
+def _pair_by_signature(old_ids, new_ids, old_sigs, new_sigs):
+    """ Returns a list of (old_id, new_id) pairs, pairing identifiers with the same signature first,
+        and then a single leftover on each side (the value of that attribute changed) """
+    if len(old_ids) == 1 and len(new_ids) == 1:
+        return [ (old_ids[0], new_ids[0]) ]
+    pairs = []
+    new_by_sig = _group_by_signature(new_ids, new_sigs)
+    old_left = []
+    for old_id in old_ids:
+        candidates = new_by_sig.get(old_sigs[old_id])
+        if candidates:
+            pairs.append( (old_id, candidates.pop()) )
+        else:
+            old_left.append(old_id)
+    new_left = [ id for ids in new_by_sig.values() for id in ids ]
+    if len(old_left) == 1 and len(new_left) == 1:
+        pairs.append( (old_left[0], new_left[0]) )
+    return pairs
+
+def _group_by_signature(ids, sigs):
+    groups = dict()
+    for id in ids:
+        groups.setdefault(sigs[id], []).append(id)
+    return groups
@@ -0,0 +1,162 @@
+"""
+Functions for streaming working memory snapshots to files and loading them back
+
+A snapshot is either a parse_wm_printout dict or a WMNode (from extract_wm_graph)
+The writers go straight to the given file object wme by wme, so large snapshots
+are never turned into one big string
+"""
+
+import json
+from collections import deque
+
+from .WMNode import WMNode
+from .binary_format import BinaryWriter, BinaryReader, encode_varint
+
+BINARY_MAGIC = b"PSWM1\n"
+WME_RECORD = 1
+
+def iter_wmes(snapshot, root_id=None, max_depth=-1, follow=None):
+    """ Yields an (id, attr, value, is_id) tuple for each wme in the snapshot
+
+    :param snapshot: A parse_wm_printout dict or a WMNode
+    :param root_id: If given, only wmes reachable from this identifier symbol are included
+        (For a WMNode, defaults to the node itself)
+    :param max_depth: The maximum depth below the root to include (defaults to unlimited)
+    :param follow: A function taking an attribute, only wmes where it returns True are included
+    """
+    if isinstance(snapshot, WMNode):
+        root = snapshot
+        if root_id is not None and root_id != snapshot.symbol:
+            root = (snapshot._node_map or {}).get(root_id)
+            if root is None:
+                return
+        children = lambda node: node.iter_children()
+        symbol = lambda node: node.symbol
+        is_node = lambda val: isinstance(val, WMNode)
+    elif root_id is None:
+        # Every wme in the dict, no traversal needed
+        for id_wmes in snapshot.values():
+            for (id, attr, val) in id_wmes:
+                if follow is None or follow(attr):
+                    yield (id, attr, val, val in snapshot)
+        return
+    else:
+        root = root_id
+        children = lambda id: ( (wme[1], wme[2]) for wme in snapshot.get(id, []) )
+        symbol = lambda id: id
+        is_node = lambda val: val in snapshot
+
+    visited = set([ symbol(root) ])
+    queue = deque([ (root, max_depth) ])
+    while len(queue) > 0:
+        node, depth = queue.popleft()
+        if depth == 0:
+            continue
+        node_sym = symbol(node)
+        for attr, val in children(node):
+            if follow is not None and not follow(attr):
+                continue
+            if is_node(val):
+                val_sym = symbol(val)
+                if val_sym not in visited:
+                    visited.add(val_sym)
+                    queue.append( (val, depth-1) )
+                yield (node_sym, attr, val_sym, True)
+            else:
+                yield (node_sym, attr, val, False)
+
+def write_wm_jsonl(snapshot, fout, root_id=None, max_depth=-1):
+    """ Writes each wme in the snapshot as a JSON list [ id, attr, value, is_id ] on its own line
+        Returns the number of wmes written """
+    count = 0
+    for (id, attr, val, is_id) in iter_wmes(snapshot, root_id, max_depth):
+        fout.write(json.dumps([ id, attr, val, is_id ]))
+        fout.write("\n")
+        count += 1
+    return count
+
+def read_wm_jsonl(fin):
+    """ Reads a file written by write_wm_jsonl into a dict in the parse_wm_printout format """
+    wmes = dict()
+    for line in fin:
+        if len(line.strip()) == 0:
+            continue
+        wme = json.loads(line)
+        id, attr, val = wme[0], wme[1], wme[2]
+        wmes.setdefault(id, []).append( (id, attr, val) )
+        # Child identifiers get an entry even when they have no wmes of their own (older files have no is_id)
+        if len(wme) > 3 and wme[3]:
+            wmes.setdefault(val, [])
+    return wmes
+
+def write_wm_dot(snapshot, fout, root_id=None, max_depth=-1, attrs=None, ignore_attrs=None, include_constants=True):
+    """ Writes the snapshot as a graphviz dot digraph (identifiers are ellipses, constants are boxes)
+
+    :param root_id: If given, only wmes reachable from this identifier are drawn
+    :param max_depth: The maximum depth below the root to draw
+    :param attrs: If given, only wmes with these attributes are drawn (and followed)
+    :param ignore_attrs: wmes with these attributes are not drawn (or followed)
+    :param include_constants: If False, only draws the links between identifiers
+    Returns the number of wmes written
+    """
+    follow = None
+    if attrs is not None or ignore_attrs is not None:
+        attrs = None if attrs is None else set(attrs)
+        ignore_attrs = set() if ignore_attrs is None else set(ignore_attrs)
+        follow = lambda attr: (attrs is None or attr in attrs) and attr not in ignore_attrs
+
+    count = 0
+    fout.write("digraph wm {\n")
+    for (id, attr, val, is_id) in iter_wmes(snapshot, root_id, max_depth, follow):
+        if is_id:
+            fout.write("  {} -> {} [label={}];\n".format(_dot_str(id), _dot_str(val), _dot_str(attr)))
+        elif include_constants:
+            const_node = _dot_str(id + "#" + str(count))
+            fout.write("  {} [label={}, shape=box];\n".format(const_node, _dot_str(str(val))))
+            fout.write("  {} -> {} [label={}];\n".format(_dot_str(id), const_node, _dot_str(attr)))
+        else:
+            continue
+        count += 1
+    fout.write("}\n")
+    return count
+
+def write_wm_binary(snapshot, fout, root_id=None, max_depth=-1):
+    """ Writes the snapshot to the binary file object fout in a compact format
+        (strings are written once into a symbol table, values keep their int/float/str/id types)
+        Returns the number of wmes written """
+    fout.write(BINARY_MAGIC)
+    writer = BinaryWriter(fout)
+    count = 0
+    for (id, attr, val, is_id) in iter_wmes(snapshot, root_id, max_depth):
+        data = encode_varint(writer.symbol(id)) + encode_varint(writer.symbol(attr)) + writer.encode_value(val, is_id)
+        writer.write_record(WME_RECORD, data)
+        count += 1
+    return count
+
+def read_wm_binary(source):
+    """ Reads a snapshot written by write_wm_binary into a dict in the parse_wm_printout format
+
+    :param source: A binary file object, or a bytes-like object such as an mmap of the file
+    """
+    data = source.read() if hasattr(source, "read") else source
+    if bytes(data[:len(BINARY_MAGIC)]) != BINARY_MAGIC:
+        raise ValueError("Not a binary working memory snapshot")
+
+    wmes = dict()
+    reader = BinaryReader(data, len(BINARY_MAGIC))
+    while True:
+        record_type = reader.next_record()
+        if record_type is None:
+            return wmes
+        if record_type != WME_RECORD:
+            raise ValueError("Unknown record type " + str(record_type))
+        id = reader.symbol()
+        attr = reader.symbol()
+        val, is_id = reader.value()
+        wmes.setdefault(id, []).append( (id, attr, val) )
+        if is_id:
+            wmes.setdefault(val, [])
+
+def _dot_str(s):
+    """ Returns s as a quoted graphviz string """
+    return '"' + s.replace('\\', '\\\\').replace('"', '\\"') + '"'
@@ -1,8 +1,12 @@
-from .WMNode import WMNode
+from .WMNode import WMNode, _extract_graph
 
 def extract_wm_graph(root_id, max_depth=-1):
     """ Given a soar identifier (root_id), crawls over the children and builds a graph rep for them
         This will handle cycles, where the same node will be used for each reference to an identifier
+        The graph is crawled breadth-first (no recursion), so each node is extracted at its shortest distance from the root
+
+        Call refresh() on the returned node to update the graph later,
+        which only re-reads identifiers whose child wmes have changed
 
         :param root_id: The sml identifier of the root of the sub-graph
         :param max_depth: The maximum depth to extract (defaults to unlimited depth)
@@ -26,8 +30,7 @@ def extract_wm_graph(root_id, max_depth=-1):
                 ['predicate'] = [ 'red', 'cube', 'block' ]
     """
     root_node = WMNode(root_id)
-    node_map = dict()
-    node_map[root_node.symbol] = root_node
-    root_node._extract_children(max_depth, node_map)
+    root_node._max_depth = max_depth
+    root_node._node_map = _extract_graph(root_node, max_depth, dict())
     return root_node
 
@@ -0,0 +1,176 @@
+"""
+Functions for parsing the text output of soar's stats commands into records
+"""
+
+import re
+from collections import namedtuple
+
+SoarStats = namedtuple("SoarStats", [
+    "num_productions",          # number of productions loaded
+    "num_chunks",               # number of chunks learned
+    "decisions",                # number of decision cycles
+    "msec_per_decision",        # mean kernel time per decision (0 if timers are off)
+    "elaboration_cycles",
+    "production_firings",
+    "wme_changes",
+    "wme_additions",
+    "wme_removals",
+    "wm_size",                  # current number of wmes
+    "wm_mean",
+    "wm_max",
+    "kernel_time",              # kernel cpu seconds (None if timers are off)
+    "total_time",               # total cpu seconds (None if timers are off)
+])
+
+_INT = r"(\d+)"
+_FLOAT = r"([\d.]+)"
+
+_STATS_PATTERNS = [
+    (re.compile(_INT + r" productions \(\d+ default, \d+ user, " + _INT + r" chunks\)"), ("num_productions", "num_chunks")),
+    (re.compile(_INT + r" decisions \(" + _FLOAT + r" msec/decision\)"), ("decisions", "msec_per_decision")),
+    (re.compile(_INT + r" decisions"), ("decisions",)),
+    (re.compile(_INT + r" elaboration cycles"), ("elaboration_cycles",)),
+    (re.compile(_INT + r" production firings"), ("production_firings",)),
+    (re.compile(_INT + r" wme changes \(" + _INT + " additions, " + _INT + r" removals\)"),
+        ("wme_changes", "wme_additions", "wme_removals")),
+    (re.compile(r"WM size:\s+" + _INT + r" current,\s+" + _FLOAT + r" mean,\s+" + _INT + " maximum"),
+        ("wm_size", "wm_mean", "wm_max")),
+    (re.compile(r"Kernel CPU Time:\s+" + _FLOAT), ("kernel_time",)),
+    (re.compile(r"Total\s+CPU Time:\s+" + _FLOAT), ("total_time",)),
+]
+
+def parse_stats(text):
+    """ Parses the output of the soar stats command into a SoarStats namedtuple
+        (any values that are not in the text are None)
+
+    :param text: The output of soar's stats command
+    :type text: str
+
+    :returns SoarStats
+    """
+    values = dict()
+    for pattern, fields in _STATS_PATTERNS:
+        if fields[0] in values:
+            continue
+        match = pattern.search(text)
+        if match is None:
+            continue
+        for field, value in zip(fields, match.groups()):
+            values[field] = _number(value)
+    return SoarStats(**dict( (field, values.get(field)) for field in SoarStats._fields ))
+
+def _number(value):
+    return float(value) if "." in value else int(value)
+
+_COUNT_LINE = re.compile(r"^\s*(\d+):\s+(\S+)\s*$")
+
+def parse_production_counts(text):
+    """ Parses the per-production output of 'firing-counts' or 'memories' (production memory-usage)
+        into a dict of production name -> count (the firings or the number of rete tokens)
+
+    :param text: The output of soar's firing-counts or memories command
+    :type text: str
+
+    :returns dict[ str, int ]
+    """
+    counts = dict()
+    for line in text.splitlines():
+        match = _COUNT_LINE.match(line)
+        if match is not None:
+            counts[match.group(2)] = int(match.group(1))
+    return counts
+
+MemoryPool = namedtuple("MemoryPool", [ "name", "used_items", "free_items", "item_size", "items_per_block", "blocks", "total_bytes" ])
+
+_POOL_COLUMNS = {
+    "used items": "used_items",
+    "free items": "free_items",
+    "item size": "item_size",
+    "itm/blk": "items_per_block",
+    "blocks": "blocks",
+    "total bytes": "total_bytes",
+}
+
+def parse_memory_stats(text):
+    """ Parses the output of 'stats -m' into a list of MemoryPool namedtuples, one per memory pool
+        (columns that this version of soar doesn't print are None)
+
+    :param text: The output of soar's stats -m command
+    :type text: str
+
+    :returns list[ MemoryPool ]
+    """
+    pools = []
+    columns = None
+    for line in text.splitlines():
+        if "Pool Name" in line:
+            columns = [ _POOL_COLUMNS.get(col.strip().lower()) for col in _split_columns(line)[1:] ]
+            continue
+        if columns is None:
+            continue
+        cols = _split_columns(line)
+        if len(cols) != len(columns) + 1 or not all(col.isdigit() for col in cols[1:]):
+            continue
+        values = dict( (field, int(col)) for field, col in zip(columns, cols[1:]) if field is not None )
+        pools.append(MemoryPool(name=cols[0], **dict( (field, values.get(field)) for field in MemoryPool._fields[1:] )))
+    return pools
+
+SMemStats = namedtuple("SMemStats", [
+    "retrieves", "queries", "stores", "activation_updates", "mirrors", "nodes", "edges",
+    "memory_usage", "memory_highwater",     # bytes
+    "query_time", "retrieve_time", "store_time", "total_time",  # seconds (only if timers were given)
+])
+
+EpMemStats = namedtuple("EpMemStats", [
+    "time",                                 # the current episode
+    "queries", "nexts", "prevs", "last_retrieval_wmes", "last_query_positive", "last_query_negative",
+    "memory_usage", "memory_highwater",     # bytes
+    "query_time", "retrieve_time", "store_time", "total_time",  # seconds (only if timers were given)
+])
+
+def parse_smem_stats(text, timers_text=None):
+    """ Parses the output of 'smem --stats' (and optionally 'smem --timers') into an SMemStats namedtuple """
+    values = parse_key_values(text)
+    if timers_text is not None:
+        timers = parse_key_values(timers_text)
+        values["query_time"] = timers.get("smem_query")
+        values["retrieve_time"] = timers.get("smem_ncb_retrieval")
+        values["store_time"] = timers.get("smem_storage")
+        values["total_time"] = timers.get("total")
+    return SMemStats(**dict( (field, values.get(field)) for field in SMemStats._fields ))
+
+def parse_epmem_stats(text, timers_text=None):
+    """ Parses the output of 'epmem --stats' (and optionally 'epmem --timers') into an EpMemStats namedtuple """
+    values = parse_key_values(text)
+    if timers_text is not None:
+        timers = parse_key_values(timers_text)
+        values["query_time"] = timers.get("epmem_query")
+        values["retrieve_time"] = timers.get("epmem_ncb_retrieval")
+        values["store_time"] = timers.get("epmem_storage")
+        values["total_time"] = timers.get("total")
+    return EpMemStats(**dict( (field, values.get(field)) for field in EpMemStats._fields ))
+
+def parse_key_values(text):
+    """ Parses lines of the form 'Some Name: 123 [units]' into a dict { 'some_name': 123 }
+        (only numeric values are kept) """
+    values = dict()
+    for line in text.splitlines():
+        key, sep, value = line.partition(":")
+        if len(sep) == 0:
+            continue
+        words = value.split()
+        if len(words) == 0:
+            continue
+        try:
+            number = _number(words[0])
+        except ValueError:
+            continue
+        key = re.sub(r"[^a-z0-9]+", "_", key.strip().lower()).strip("_")
+        values[key] = number
+    return values
+
+def _split_columns(line):
+    """ Splits a table row on '|' if it has them, otherwise on runs of 2+ spaces """
+    if "|" in line:
+        return [ col.strip() for col in line.split("|") ]
+    return [ col.strip() for col in re.split(r"\s{2,}", line.strip()) ]
@@ -0,0 +1,61 @@
+"""
+Functions for parsing the output of soar's source command into records
+"""
+
+import re
+from collections import namedtuple
+
+SourceSummary = namedtuple("SourceSummary", [
+    "files",                    # list of (filename, num_productions) for each file soar reported (source -a)
+    "num_productions",          # total productions sourced (None if soar didn't print a total)
+    "num_excised",              # productions replaced by one with the same name
+    "excised",                  # names of the excised productions (source -v)
+    "warnings",                 # warning and duplicate production lines
+])
+
+_FILE_PATTERN = re.compile(r"^(.+?):\s+(\d+) productions? sourced\.")
+_TOTAL_PATTERN = re.compile(r"^Total:\s+(\d+) productions? sourced\.(?:\s+(\d+) productions? excised\.)?")
+
+def parse_source_output(lines):
+    """ Parses the output of soar's source command (with -v, and optionally -a) into a SourceSummary
+
+    :param lines: The output of the source command, as a string or an iterable of lines
+    :type lines: str or iterable(str)
+
+    :returns SourceSummary
+    """
+    if isinstance(lines, str):
+        lines = lines.splitlines()
+    files = []
+    num_productions = None
+    num_excised = 0
+    excised = []
+    warnings = []
+    in_excised = False
+    for line in lines:
+        stripped = line.strip()
+        if in_excised:
+            # The names of the excised productions are indented under the 'Excised productions:' line
+            if len(stripped) > 0 and line[0] in " \t":
+                excised.append(stripped)
+                continue
+            in_excised = False
+        if len(stripped) == 0:
+            continue
+        if stripped.startswith("Excised productions"):
+            in_excised = True
+            continue
+        match = _TOTAL_PATTERN.match(stripped)
+        if match is not None:
+            num_productions = int(match.group(1))
+            if match.group(2) is not None:
+                num_excised = int(match.group(2))
+            continue
+        match = _FILE_PATTERN.match(stripped)
+        if match is not None:
+            files.append( (match.group(1), int(match.group(2))) )
+            continue
+        if stripped.lower().startswith("warning") or "duplicate of" in stripped:
+            warnings.append(stripped)
+    return SourceSummary(files=files, num_productions=num_productions,
+            num_excised=max(num_excised, len(excised)), excised=excised, warnings=warnings)
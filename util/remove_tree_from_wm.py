@@ -1,18 +1,31 @@
+from ..SoarWME import SoarWME
+from .WMETable import WMETable
 
-def remove_tree_from_wm(wme_table):
+def remove_tree_from_wm(wme_table, path=None):
     """
     Given a wme_table filled by SoarUtils.update_wm_from_tree, removes all wmes from working memory 
 
-    Intermediate nodes are sml.Identifiers, which are removed from the table
-    Leaves are SoarWME's which are kept in the table but .remove_from_wm() is called on them
+    If path is given, only the wmes at or below that path are removed (e.g. 'root_name.obj1')
+
+    For a WMETable, the removed entries are also dropped from the table
+    For a dict, intermediate nodes are sml.Identifiers, which are removed from the table
+        Leaves are SoarWME's which are kept in the table but .remove_from_wm() is called on them
     """
-    items_to_remove = set()
-    for path, wme in wme_table.items():
-        if isinstance(wme, sml.Identifier):
-            items_to_remove.add(path)
-        else:
-            wme.remove_from_wm()
-    for path in items_to_remove:
-        del wme_table[path]
+    if isinstance(wme_table, WMETable):
+        wme_table.remove(path)
+        return
 
+    ids_to_remove = []
+    for key, wme in wme_table.items():
+        if path is not None and key != path and not key.startswith(path + "."):
+            continue
+        if isinstance(wme, SoarWME):
+            wme.remove_from_wm()
+        else:
+            ids_to_remove.append(key)
 
+    # Destroy the deepest identifiers first
+    ids_to_remove.sort(key=lambda key: key.count("."), reverse=True)
+    for key in ids_to_remove:
+        wme_table[key].DestroyWME()
+        del wme_table[key]
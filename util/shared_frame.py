@@ -0,0 +1,174 @@
+""" Frames of numeric fields in shared memory, published by one process and read by another without locks
+
+The region starts with a header of three uint64s: a sequence number, the frame number, and the publish time (time.monotonic_ns).
+The writer makes the sequence number odd while it writes a frame and even again once it is done,
+so a reader knows a frame is consistent if the sequence number was even and unchanged across its read (a seqlock)
+"""
+
+from array import array
+import mmap
+import os
+import struct
+import time
+
+_HEADER_SIZE = 24
+_SEQ = 0
+_FRAME = 1
+_TIME = 2
+
+class FrameLayout:
+    """ The fields of a frame: a list of (name, format) or (name, format, count)
+
+        format is a struct/array type code (e.g. 'd' float64, 'f' float32, 'i' int32, 'q' int64, 'B' uint8)
+        and count (default 1) makes the field an array.
+        Each field is aligned to its item size.
+
+        Example:
+            FrameLayout([ ("x", "d"), ("y", "d"), ("heading", "f"), ("ranges", "f", 360) ])
+    """
+    def __init__(self, fields):
+        self.fields = []            # (name, format, count, offset)
+        offset = _HEADER_SIZE
+        for field in fields:
+            name, fmt = field[0], field[1]
+            count = field[2] if len(field) > 2 else 1
+            item_size = struct.calcsize(fmt)
+            offset = (offset + item_size - 1) // item_size * item_size
+            self.fields.append( (name, fmt, count, offset) )
+            offset += item_size * count
+        self.size = offset
+
+    def names(self):
+        return [ field[0] for field in self.fields ]
+
+class _SharedFrame:
+    """ Maps the region for a layout, either a multiprocessing SharedMemory block (name) or a file (filename) """
+    def __init__(self, layout, name=None, filename=None, create=False):
+        if (name is None) == (filename is None):
+            raise ValueError("Give either a shared memory name or a filename")
+        self.layout = layout
+        self.filename = filename
+        self.shm = None
+        self.mmap = None
+        if name is not None:
+            from multiprocessing import shared_memory
+            self.shm = shared_memory.SharedMemory(name=name, create=create, size=layout.size if create else 0)
+            buf = self.shm.buf
+        else:
+            if create:
+                with open(filename, "wb") as fout:
+                    fout.write(b"\0" * layout.size)
+            with open(filename, "r+b") as fin:
+                self.mmap = mmap.mmap(fin.fileno(), layout.size)
+            buf = self.mmap
+
+        self.view = memoryview(buf)
+        self.header = self.view[0:_HEADER_SIZE].cast("Q")
+        # A view of each field's values straight into the shared region
+        self.field_views = [ self.view[offset:offset + struct.calcsize(fmt) * count].cast(fmt)
+                for (name, fmt, count, offset) in layout.fields ]
+
+    def close(self):
+        for view in self.field_views:
+            view.release()
+        self.field_views = []
+        self.header.release()
+        self.view.release()
+        if self.shm is not None:
+            self.shm.close()
+        if self.mmap is not None:
+            self.mmap.close()
+
+class SharedMemoryFeed(_SharedFrame):
+    """ Publishes frames to the shared region (used by the producer, e.g. a simulator process)
+
+        Usage:
+            feed = SharedMemoryFeed(layout, name="robot-sensors", create=True)
+            feed.publish({ "x": 1.0, "y": 2.0, "ranges": ranges })
+    """
+    def __init__(self, layout, name=None, filename=None, create=True):
+        _SharedFrame.__init__(self, layout, name, filename, create)
+        self.frame = self.header[_FRAME]
+
+    def publish(self, values):
+        """ Writes a frame, values is a dict of field name -> value (or sequence for arrays)
+            Fields that are not given keep their previous values
+            Values are checked against their field's format before anything is written,
+                so a bad value raises without changing the frame """
+        writes = []
+        for (name, fmt, count, offset), view in zip(self.layout.fields, self.field_views):
+            value = values.get(name)
+            if value is None:
+                continue
+            if count == 1:
+                struct.pack(fmt, value)
+                writes.append( (view, value, False) )
+            else:
+                # Buffers of the right type (e.g. a float32 numpy array for 'f') are copied directly
+                buf = memoryview(value) if _is_buffer(value) else None
+                if buf is None or buf.format != fmt:
+                    buf = memoryview(array(fmt, value))
+                # The whole shape has to match (len() of a 2-D array is only its first dimension)
+                if buf.nbytes != view.nbytes:
+                    raise ValueError("{} has {} values, not {}".format(name, buf.nbytes // view.itemsize, count))
+                if buf.ndim != 1:
+                    if not buf.c_contiguous:
+                        raise ValueError("{} is not a contiguous array".format(name))
+                    buf = buf.cast("B").cast(fmt)
+                writes.append( (view, buf, True) )
+
+        header = self.header
+        header[_SEQ] += 1
+        try:
+            for view, value, is_array in writes:
+                if is_array:
+                    view[:] = value
+                else:
+                    view[0] = value
+            self.frame += 1
+            header[_FRAME] = self.frame
+            header[_TIME] = time.monotonic_ns()
+        finally:
+            # Always leave the sequence number even, or readers would wait on this frame forever
+            header[_SEQ] += 1
+
+    def unlink(self):
+        """ Deletes the shared memory block (or file) once no process needs it """
+        if self.shm is not None:
+            self.shm.unlink()
+        else:
+            os.remove(self.filename)
+
+class SharedFrameReader(_SharedFrame):
+    """ Reads consistent frames from the shared region (used by SharedMemoryConnector) """
+    def __init__(self, layout, name=None, filename=None):
+        _SharedFrame.__init__(self, layout, name, filename, create=False)
+        self.num_torn_reads = 0
+
+    def frame_number(self):
+        return self.header[_FRAME]
+
+    def read(self, handler, max_retries=100):
+        """ Calls handler(field_views) while the frame can't change underneath it, and returns (frame number, publish time)
+            field_views are memoryviews into the region (in layout order), so handler should read
+            but not keep them. If the frame changes during the read, handler is called again.
+            Returns None if no consistent frame could be read in max_retries tries """
+        header = self.header
+        for attempt in range(max_retries):
+            seq = header[_SEQ]
+            if seq & 1:
+                continue
+            frame = header[_FRAME]
+            publish_time = header[_TIME]
+            handler(self.field_views)
+            if header[_SEQ] == seq:
+                return frame, publish_time
+            self.num_torn_reads += 1
+        return None
+
+def _is_buffer(value):
+    try:
+        memoryview(value)
+        return True
+    except TypeError:
+        return False
@@ -0,0 +1,285 @@
+"""
+Sources soar files one file at a time (following their source commands) and reports the time and productions of each file
+"""
+
+from collections import namedtuple
+import os
+import re
+import time
+
+from .parse_source_output import parse_source_output
+
+SourcedFile = namedtuple("SourcedFile", [
+    "filename",
+    "depth",            # how many source commands deep it was (0 for the file given to source_by_file)
+    "time_ms",          # time spent on the file's own commands
+    "total_ms",         # time including the files it sourced
+    "num_productions",
+    "productions",      # names of the productions it loaded, in order (None if only the count is known)
+    "excised",          # names of the productions it replaced (ones with the same name were already loaded)
+    "warnings",         # warning and error lines printed while sourcing it
+    "includes",         # the files it sourced
+])
+
+_WARNING_PATTERN = re.compile(r"warning|error|ignoring|duplicate", re.IGNORECASE)
+_DIRECTORY_COMMANDS = ("pushd", "popd", "cd")
+
+class SourceReport:
+    """ The result of sourcing an agent: a SourcedFile for each file, in the order they were sourced """
+    def __init__(self, files=None, time_ms=None, error=None):
+        self.files = files if files is not None else []
+        self.time_ms = time_ms          # total time (None if it wasn't timed)
+        self.error = error              # the error that stopped sourcing, if any
+
+    @property
+    def num_productions(self):
+        return sum(f.num_productions for f in self.files)
+
+    @property
+    def num_excised(self):
+        return sum(len(f.excised) for f in self.files)
+
+    @property
+    def warnings(self):
+        return [ warning for f in self.files for warning in f.warnings ]
+
+    def file_of(self, production):
+        """ Returns the name of the file the production was (last) loaded from, or None """
+        for f in reversed(self.files):
+            if f.productions is not None and production in f.productions:
+                return f.filename
+        return None
+
+    def slowest(self, n=10):
+        """ Returns the n files that took the longest to source (by their own time) """
+        timed = [ f for f in self.files if f.time_ms is not None ]
+        return sorted(timed, key=lambda f: f.time_ms, reverse=True)[:n]
+
+    def format(self, n=10):
+        """ Returns a printable summary with the n slowest files and every warning and excised production """
+        lines = [ "Sourced {} files: {} productions, {} excised{}".format(len(self.files), self.num_productions, self.num_excised,
+            "" if self.time_ms is None else " in {:.1f} ms".format(self.time_ms)) ]
+        slowest = self.slowest(n)
+        if len(slowest) > 0:
+            lines.append("{:60s} {:>10s} {:>10s} {:>12s}".format("slowest files", "ms", "total ms", "productions"))
+            for f in slowest:
+                lines.append("{:60s} {:10.1f} {:10.1f} {:12d}".format(f.filename, f.time_ms, f.total_ms, f.num_productions))
+        for f in self.files:
+            for name in f.excised:
+                lines.append("Excised {} ({})".format(name, f.filename))
+            for warning in f.warnings:
+                lines.append("{}: {}".format(f.filename, warning))
+        if self.error is not None:
+            lines.append("ERROR: " + self.error)
+        return "\n".join(lines)
+
+    def __str__(self):
+        return self.format()
+
+    @staticmethod
+    def from_summary(summary, time_ms=None):
+        """ Makes a report from the SourceSummary of a single source command (see parse_source_output)
+            (soar only gives the production count of each file, so productions is None and there are no times) """
+        files = [ SourcedFile(filename, 0, None, None, num_productions, None, [], [], [])
+                for filename, num_productions in summary.files ]
+        if len(files) > 0:
+            # The excised productions and warnings aren't given by file
+            files[-1] = files[-1]._replace(excised=list(summary.excised), warnings=list(summary.warnings))
+        return SourceReport(files, time_ms)
+
+def source_by_file(agent, filename, on_output=None):
+    """ Sources a soar file one command at a time, following its source commands, and returns a SourceReport
+
+        Each file's source commands are followed in python (relative to the file's directory and any pushd/cd),
+            so the time, productions, and warnings of every file are known.
+        As with soar's source command, sourcing stops at the first command that fails.
+        Source commands that can't be followed (like source -r) are run by soar, and only their production count is kept.
+
+    :param agent: The sml Agent to source into
+    :param filename: The soar file to source
+    :param on_output: If given, called as on_output(filename, text) with each command's (non-empty) output
+    :returns SourceReport
+    """
+    report = SourceReport()
+    loaded = set()
+    start = time.perf_counter()
+    agent.ExecuteCommandLine("pushd .")
+    try:
+        _source_file(agent, os.path.abspath(filename), 0, report, loaded, on_output)
+    finally:
+        agent.ExecuteCommandLine("popd")
+    report.time_ms = (time.perf_counter() - start) * 1000.0
+    return report
+
+def _source_file(agent, filename, depth, report, loaded, on_output):
+    """ Sources one file, adding its SourcedFile to the report (before those of the files it includes) """
+    index = len(report.files)
+    report.files.append(None)
+    start = time.perf_counter()
+    include_ms = 0.0
+    productions = []
+    excised = []
+    warnings = []
+    includes = []
+    num_sourced = 0             # productions loaded by source commands that weren't followed
+
+    try:
+        with open(filename, "r") as fin:
+            text = fin.read()
+    except IOError as e:
+        report.error = "Cannot read {}: {}".format(filename, e)
+        text = ""
+
+    directories = [ os.path.dirname(filename) ]
+    agent.ExecuteCommandLine("cd " + _quote(directories[-1]))
+    for command in split_soar_commands(text):
+        if report.error is not None:
+            break
+        words = command.split(None, 1)
+        name = words[0]
+        args = words[1] if len(words) > 1 else ""
+
+        if name == "source":
+            include = _source_filename(args)
+            if include is not None:
+                path = os.path.normpath(os.path.join(directories[-1], include))
+                includes.append(path)
+                include_start = time.perf_counter()
+                _source_file(agent, path, depth + 1, report, loaded, on_output)
+                include_ms += (time.perf_counter() - include_start) * 1000.0
+                # The included file changed soar's directory
+                agent.ExecuteCommandLine("cd " + _quote(directories[-1]))
+                continue
+
+        output = agent.ExecuteCommandLine(command)
+        succeeded = agent.GetLastCommandLineResult()
+        if not succeeded:
+            report.error = "{}: {}".format(filename, output.strip() or command.split("\n", 1)[0])
+        elif len(output) > 0:
+            for line in iter_lines(output):
+                if _WARNING_PATTERN.search(line) is not None:
+                    warnings.append(line.strip())
+        if output and on_output is not None:
+            on_output(filename, output)
+
+        if not succeeded:
+            continue
+        if name in ("sp", "gp"):
+            production = production_name(args)
+            if production is not None:
+                # Only productions replaced during this source are known to be excised
+                #   (replacing one loaded before isn't reported)
+                if production in loaded:
+                    excised.append(production)
+                loaded.add(production)
+                productions.append(production)
+        elif name == "source":
+            # A source command that isn't followed (e.g. source -r), only its production count is known
+            num_sourced += parse_source_output(output).num_productions or 0
+        elif name in _DIRECTORY_COMMANDS:
+            _change_directory(directories, name, args)
+
+    total_ms = (time.perf_counter() - start) * 1000.0
+    report.files[index] = SourcedFile(filename, depth, total_ms - include_ms, total_ms,
+            len(productions) + num_sourced, productions, excised, warnings, includes)
+
+def _change_directory(directories, name, args):
+    """ Follows soar's pushd/popd/cd commands so relative source paths resolve the same way """
+    path = args.strip().strip("\"{}")
+    if name == "popd":
+        if len(directories) > 1:
+            directories.pop()
+    elif name == "pushd":
+        directories.append(os.path.normpath(os.path.join(directories[-1], path)))
+    elif len(path) > 0:
+        directories[-1] = os.path.normpath(os.path.join(directories[-1], path))
+
+def _source_filename(args):
+    """ The file given to a source command (skipping the -v, -a, and -d options),
+        or None if the command can't be followed in python (e.g. source -r sources every file in a directory) """
+    filename = None
+    for word in args.split():
+        if word.startswith("-"):
+            if any(c not in "vad" for c in word[1:]):
+                return None
+        elif filename is None:
+            filename = word.strip("\"{}")
+        else:
+            return None
+    return filename
+
+def _quote(path):
+    return "\"" + path + "\""
+
+def production_name(body):
+    """ The name of the production in the body of an sp command ('{name ...}' or '"name ..."') """
+    body = body.lstrip()
+    if len(body) == 0 or body[0] not in "{\"":
+        return None
+    words = body[1:].split(None, 1)
+    return words[0] if len(words) > 0 else None
+
+def iter_lines(text):
+    """ Yields the lines of a string one at a time (without splitting the whole string into a list) """
+    start = 0
+    while start < len(text):
+        end = text.find("\n", start)
+        if end == -1:
+            end = len(text)
+        yield text[start:end]
+        start = end + 1
+
+def split_soar_commands(text):
+    """ Yields the commands in the text of a soar file, in order
+
+        Commands end at a newline or ; outside of braces and quotes,
+        lines starting with # are comments, and a backslash escapes the next character (including a newline)
+        Inside braces, |...| is a soar symbol, so braces in it (e.g. |{|) aren't counted
+    """
+    i = 0
+    n = len(text)
+    while i < n:
+        c = text[i]
+        if c in " \t\r\n;":
+            i += 1
+            continue
+        if c == "#":
+            end = text.find("\n", i)
+            i = n if end == -1 else end + 1
+            continue
+
+        start = i
+        depth = 0
+        in_quotes = False
+        while i < n:
+            c = text[i]
+            if c == "\\":
+                i += 2
+                continue
+            if c == "|" and depth > 0 and not in_quotes:
+                i = _skip_symbol(text, i)
+                continue
+            if c == "{" and not in_quotes:
+                depth += 1
+            elif c == "}" and not in_quotes:
+                depth -= 1
+            elif c == "\"" and depth == 0:
+                in_quotes = not in_quotes
+            elif c in "\n;" and depth <= 0 and not in_quotes:
+                break
+            i += 1
+        command = text[start:i].strip()
+        if len(command) > 0:
+            yield command
+
+def _skip_symbol(text, i):
+    """ The index after the |...| symbol starting at text[i] (a backslash escapes a | in it) """
+    i += 1
+    while i < len(text):
+        if text[i] == "\\":
+            i += 2
+            continue
+        if text[i] == "|":
+            return i + 1
+        i += 1
+    return i
@@ -1,6 +1,7 @@
-from pysoarlib import SoarWME
+from ..SoarWME import SoarWME
+from .WMETable import WMETable
 
-def update_wm_from_tree(root_id, root_name, input_dict, wme_table):
+def update_wm_from_tree(root_id, root_name, input_dict, wme_table, remove_stale=False):
     """
     Recursively update WMEs that have a sub-tree structure rooted at the given identifier.
 
@@ -10,9 +11,16 @@ def update_wm_from_tree(root_id, root_name, input_dict, wme_table):
     :param root_id: The sml identifier of the root of the sub-tree
     :param root_name: The attribute which is the root of this sub-tree
     :param input_dict: A dict mapping attributes to getter functions
-    :param wme_table: A table to lookup and store wme's and identifiers
+    :param wme_table: A table to lookup and store wme's and identifiers,
+        either a WMETable (recommended) or a dict keyed by dotted path strings
+    :param remove_stale: If True (and wme_table is a WMETable), branches of the table
+        that are no longer in input_dict are removed from working memory
     :return: None
     """
+    if isinstance(wme_table, WMETable):
+        wme_table.update(root_id, root_name, input_dict, remove_stale)
+        return
+
     assert isinstance(input_dict, dict), "Should only recurse on dicts!"
 
     for attribute in input_dict.keys():
@@ -23,7 +31,7 @@ def update_wm_from_tree(root_id, root_name, input_dict, wme_table):
             if child_name not in wme_table:
                 wme_table[child_name] = root_id.CreateIdWME(attribute)
             child_id = wme_table[child_name]
-            SoarUtils.update_wm_from_tree(child_id, child_name, input_val, wme_table)
+            update_wm_from_tree(child_id, child_name, input_val, wme_table)
             continue
 
         value = input_val()
@@ -32,4 +40,3 @@ def update_wm_from_tree(root_id, root_name, input_dict, wme_table):
         wme = wme_table[child_name]
         wme.set_value(value)
         wme.update_wm(root_id)
-
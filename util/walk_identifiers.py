@@ -0,0 +1,26 @@
+from collections import deque
+
+def walk_identifiers(root_id):
+    """ Yields (parent_symbol, attr, child_id) for every identifier reachable from root_id
+
+        The graph is walked breadth-first and each identifier is only yielded once,
+        so parents are always yielded before their children
+
+        :param root_id: The sml identifier to start from (e.g. the input-link)
+    """
+    visited = set([ root_id.GetIdentifierSymbol() ])
+    queue = deque([ root_id ])
+    while len(queue) > 0:
+        parent = queue.popleft()
+        parent_sym = parent.GetIdentifierSymbol()
+        for index in range(parent.GetNumberChildren()):
+            wme = parent.GetChild(index)
+            if not wme.IsIdentifier():
+                continue
+            child = wme.ConvertToIdentifier()
+            child_sym = child.GetIdentifierSymbol()
+            if child_sym in visited:
+                continue
+            visited.add(child_sym)
+            yield (parent_sym, wme.GetAttribute(), child)
+            queue.append(child)
@@ -0,0 +1,73 @@
+def read_wm_tree(root_id):
+    """ Reads the working memory structure under root_id into nested python values in one sweep
+
+        Each identifier becomes a dict of attribute -> value (int, float, str, or dict),
+            attributes with multiple values map to a list of them (as in WMNode.children).
+        An identifier reached a second time (a shared or cyclic structure) is given as its symbol string
+
+        :param root_id: The sml identifier to read from
+    """
+    visited = set([ root_id.GetIdentifierSymbol() ])
+    tree = dict()
+    stack = [ (root_id, tree) ]
+    while len(stack) > 0:
+        soar_id, node = stack.pop()
+        for index in range(soar_id.GetNumberChildren()):
+            wme = soar_id.GetChild(index)
+            value_type = wme.GetValueType()
+            if wme.IsIdentifier():
+                child_id = wme.ConvertToIdentifier()
+                child_sym = child_id.GetIdentifierSymbol()
+                if child_sym in visited:
+                    value = child_sym
+                else:
+                    visited.add(child_sym)
+                    value = dict()
+                    stack.append( (child_id, value) )
+            elif value_type == "int":
+                value = wme.ConvertToIntElement().GetValue()
+            elif value_type == "double":
+                value = wme.ConvertToFloatElement().GetValue()
+            else:
+                value = wme.GetValueAsString()
+
+            attr = wme.GetAttribute()
+            cur_val = node.get(attr)
+            if cur_val is None:
+                node[attr] = value
+            elif isinstance(cur_val, list):
+                cur_val.append(value)
+            else:
+                node[attr] = [ cur_val, value ]
+    return tree
+
+def add_tree_to_wm(parent_id, attr, tree):
+    """ Creates (parent_id ^attr <id>) with the structure of the given tree under it, returns <id>
+
+        tree is a dict of attribute -> value, where a value can be an int, float, str, bool (as true/false),
+            dict (a child identifier), or list/tuple (several values for the attribute)
+        The whole structure can be removed with <id>.DestroyWME()
+        If tree is not a dict, creates (parent_id ^attr tree) and returns the wme instead
+    """
+    if not isinstance(tree, dict):
+        return _create_value_wme(parent_id, attr, tree)
+    root_id = parent_id.CreateIdWME(attr)
+    stack = [ (root_id, tree) ]
+    while len(stack) > 0:
+        soar_id, node = stack.pop()
+        for child_attr, value in node.items():
+            for val in (value if isinstance(value, (list, tuple)) else (value, )):
+                if isinstance(val, dict):
+                    stack.append( (soar_id.CreateIdWME(child_attr), val) )
+                elif val is not None:
+                    _create_value_wme(soar_id, child_attr, val)
+    return root_id
+
+def _create_value_wme(soar_id, attr, val):
+    if isinstance(val, bool):
+        return soar_id.CreateStringWME(attr, "true" if val else "false")
+    elif isinstance(val, int):
+        return soar_id.CreateIntWME(attr, val)
+    elif isinstance(val, float):
+        return soar_id.CreateFloatWME(attr, val)
+    return soar_id.CreateStringWME(attr, str(val))